@@ -0,0 +1,65 @@
+""" Micro-benchmark for date parsing while loading CSV rows.
+
+Compares parsing every date with SuperDate against daybook's memoized
+parse_date, both in isolation and as rows/sec through Ledger.load.
+
+Usage:
+
+    python3 benchmarks/bench_dates.py [rows]
+"""
+
+import random
+import sys
+import time
+
+from superdate import SuperDate
+
+import daybook.Ledger
+import daybook.Transaction
+from daybook.Ledger import Ledger
+from daybook.util.dates import parse_date
+
+
+def make_dates(rows):
+    """ Dates in the formats banks export, drawn from ~3 years.
+    """
+    random.seed(0)
+    fmts = ['{y}-{m:02d}-{d:02d}', '{y}/{m:02d}/{d:02d}', '{m:02d}/{d:02d}/{y}']
+    days = [(y, m, d) for y in range(2020, 2023) for m in range(1, 13) for d in range(1, 29)]
+
+    return [
+        random.choice(fmts).format(y=y, m=m, d=d)
+        for y, m, d in (random.choice(days) for _ in range(rows))]
+
+
+def make_csv(dates):
+    lines = ['date,src,dest,amount']
+    lines.extend('{},asset.checking,expense.food,-{}'.format(d, i + 1) for i, d in enumerate(dates))
+    return '\n'.join(lines)
+
+
+def bench(label, rows, fun):
+    start = time.perf_counter()
+    fun()
+    elapsed = time.perf_counter() - start
+    print('{:<28} {:>12,.0f} rows/sec'.format(label, rows / elapsed))
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    dates = make_dates(rows)
+    csv = make_csv(dates)
+
+    bench('SuperDate', rows, lambda: [SuperDate(x) for x in dates])
+    bench('parse_date', rows, lambda: [parse_date(x) for x in dates])
+
+    # Ledger.load without duplicate detection, before and after.
+    daybook.Ledger.parse_date = daybook.Transaction.parse_date = SuperDate
+    bench('Ledger.load with SuperDate', rows, lambda: Ledger('usd', False).load(csv))
+
+    daybook.Ledger.parse_date = daybook.Transaction.parse_date = parse_date
+    bench('Ledger.load with parse_date', rows, lambda: Ledger('usd', False).load(csv))
+
+
+if __name__ == '__main__':
+    main()
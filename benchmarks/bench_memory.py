@@ -0,0 +1,133 @@
+""" Memory benchmark for transactions held by a ledger.
+
+Reports bytes allocated per transaction, measured with tracemalloc, for
+Transaction objects on their own and for a ledger loaded from CSV, which
+also holds accounts, duplicate groups and columns.
+
+Each figure is printed next to a baseline from before transactions,
+accounts, amounts and duplicate groups had __slots__. Transactions are
+measured against a copy of the old layout, and Ledger.load against
+LOAD_BASELINE, which was measured at that commit. The old ledger can't be
+rebuilt here, so the benchmark only runs with the rows it was measured
+with.
+
+Amounts remembered by to_units are cleared before each measurement, and
+the transactions share a few amounts, so both layouts are measured the
+same way.
+
+Usage:
+
+    python3 benchmarks/bench_memory.py [rows]
+"""
+
+import copy
+import gc
+import random
+import sys
+import tracemalloc
+
+import daybook.Amount
+from daybook.Account import Account
+from daybook.Amount import Amount
+from daybook.Ledger import Ledger
+from daybook.Transaction import Transaction
+from daybook.util.dates import parse_date
+
+
+# Bytes per transaction of Ledger.load before __slots__, for LOAD_ROWS.
+LOAD_BASELINE = 2500
+LOAD_ROWS = 50000
+
+
+class DictAmount:
+    """ Amount as laid out before __slots__, with float amounts.
+    """
+
+    def __init__(self, src_currency, src_amount, dest_currency, dest_amount):
+        self.src_currency = src_currency
+        self.src_amount = float(src_amount)
+        self.dest_currency = dest_currency
+        self.dest_amount = float(dest_amount)
+
+
+class DictTransaction:
+    """ Transaction as laid out before __slots__.
+    """
+
+    def __init__(self, date, src, dest, amount, tags=None, notes=''):
+        self.date = parse_date(date)
+        self.src = src
+        self.dest = dest
+        self.amount = copy.copy(amount)
+        self.tags = set(tags) if tags else set()
+        self.notes = notes
+        self.accounts = f'{src.name} {dest.name}'
+        self.quantity = max(abs(self.amount.src_amount), abs(self.amount.dest_amount))
+        self._hash = hash('{}{}{}{}'.format(self.date, src.name, dest.name, self.amount))
+
+
+def make_csv(rows):
+    """ Rows across a few dozen accounts and ~3 years, like a real ledger.
+    """
+    random.seed(0)
+    dests = ['expense.{}'.format(x) for x in range(40)]
+    lines = ['date,src,dest,amount,tags,notes']
+    for i in range(rows):
+        lines.append('{}-{:02d}-{:02d},asset.checking,{},-{:.2f},{},{}'.format(
+            random.randint(2020, 2022), random.randint(1, 12), random.randint(1, 28),
+            random.choice(dests), random.random() * 100,
+            random.choice(['', 'food', 'food:fun']), random.choice(['', 'note {}'.format(i % 100)])))
+
+    return '\n'.join(lines)
+
+
+def measure(rows, fun):
+    """ Bytes still allocated by fun's return value per row.
+    """
+    daybook.Amount._memo.clear()
+    gc.collect()
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    ret = fun()
+    gc.collect()
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del ret
+
+    return (end - start) / rows
+
+
+def report(label, current, baseline):
+    print('{:<16} {:>8,.0f} bytes/transaction, {:>8,.0f} before __slots__ ({:+.0%})'.format(
+        label, current, baseline, current / baseline - 1))
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else LOAD_ROWS
+    if rows != LOAD_ROWS:
+        sys.exit('The Ledger.load baseline was measured with {} rows.'.format(LOAD_ROWS))
+
+    csv = make_csv(rows)
+
+    src = Account('asset.checking')
+    dest = Account('expense.food')
+
+    quantities = [1.5, 2, 10.25, 99.99]
+
+    def transactions(transaction=Transaction, amount=Amount):
+        return [
+            transaction('2021-01-01', src, dest, amount('usd', -x, 'usd', x), {'food'}, 'note')
+            for x in (quantities[i % len(quantities)] for i in range(rows))]
+
+    def ledger():
+        ledger = Ledger('usd')
+        ledger.load(csv, 'asset.checking')
+        return ledger
+
+    report('Transaction', measure(rows, transactions),
+           measure(rows, lambda: transactions(DictTransaction, DictAmount)))
+    report('Ledger.load', measure(rows, ledger), LOAD_BASELINE)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,13 @@
 """ Account classes
 """
 
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
+from datetime import datetime
+
+from daybook.Amount import add_units, from_units
+from daybook.util.dates import date_key, day_span, parse_date
 
 
 class Account:
@@ -27,6 +33,9 @@ class Account:
         'void',
     ]
 
+    __slots__ = ('type', 'name', 'transactions', 'balances', 'last_currency', '_totals', '_history',
+                 '_nodes')
+
     def __init__(self, name):
         """ Initialize a new account instance.
 
@@ -60,11 +69,123 @@ class Account:
         self.transactions = []
 
         # once balance per currency
-        self.balances = defaultdict(lambda: 0)
+        self.balances = defaultdict(int)
+
+        # Exact (units, scale) balance per currency. balances holds the
+        # nearest floats. See Amount.to_units.
+        self._totals = {}
 
         # most recent currency used in a transaction
         self.last_currency = None
 
+        # currency => (date keys, running balances) in date order. Built
+        # by balanceAsOf.
+        self._history = None
+
+        # Nodes of the AccountTree the account was added to, from the root
+        # down. Balances added to the account are added to them too.
+        self._nodes = ()
+
+    def __getstate__(self):
+        """ Pickle without transaction references.
+
+        An account's transactions reference other accounts, which reference
+        still more transactions, so pickling them here would recurse through
+        the whole ledger. Ledger re-attaches them when it is unpickled.
+        """
+        state = {k: getattr(self, k) for k in self.__slots__}
+        state['transactions'] = []
+        state['_history'] = None
+        return state
+
+    def __setstate__(self, state):
+        for k, v in state.items():
+            setattr(self, k, v)
+
+    def addUnits(self, currency, units, scale):
+        """ Add to the balance of a currency, exactly.
+
+        Args:
+            currency: Currency of the units.
+            units: Integer count of 10 ** -scale. See Amount.
+            scale: Decimal places of the units.
+        """
+        total = self._totals.get(currency, (0, scale))
+        if total[1] == scale:
+            total = total[0] + units, scale
+        else:
+            total = add_units(total, units, scale)
+
+        self._totals[currency] = total
+        self.balances[currency] = from_units(*total)
+        for node in self._nodes:
+            total = node._totals.get(currency)
+            if total is not None and total[1] == scale:
+                node._totals[currency] = total[0] + units, scale
+            else:
+                node.addUnits(currency, units, scale)
+
+    def balanceAsOf(self, date):
+        """ Balances as they were at the end of a date.
+
+        The first call adds up the account's transactions in date order
+        into a running balance per currency. Calls after that are binary
+        searches of it, until a transaction is added.
+
+        Args:
+            date: date, datetime or date str. Dates include the whole
+                day, datetimes include transactions up to that time.
+
+        Returns:
+            A dict of currency => balance, of the currencies used by then.
+        """
+        if self._history is None:
+            self._history = self._buildHistory()
+
+        d = parse_date(date)._date
+        if type(d) is datetime:
+            bound = date_key(d)
+            search = bisect_right
+        else:
+            bound = date_key(d) + day_span
+            search = bisect_left
+
+        ret = {}
+        for currency, (keys, balances) in self._history.items():
+            i = search(keys, bound)
+            if i:
+                ret[currency] = balances[i - 1]
+
+        return ret
+
+    def _buildHistory(self):
+        """ Running balances for balanceAsOf.
+        """
+        keys = [date_key(t.date._date) for t in self.transactions]
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+
+        totals = {}
+        history = {}
+        for i in order:
+            t = self.transactions[i]
+            amount = t.amount
+            sides = []
+            if self is t.src:
+                sides.append((amount.src_currency, amount.src_units))
+            if self is t.dest:
+                sides.append((amount.dest_currency, amount.dest_units))
+
+            for currency, units in sides:
+                total = totals[currency] = add_units(totals.get(currency, (0, amount.scale)), units, amount.scale)
+                ks, balances = history.setdefault(currency, (array('q'), array('d')))
+                if ks and ks[-1] == keys[i]:
+                    balances[-1] = from_units(*total)
+                else:
+                    ks.append(keys[i])
+                    balances.append(from_units(*total))
+
+        return history
+
     def addTransactions(self, transactions):
         """ Add transactions to this account.
 
@@ -85,10 +206,48 @@ class Account:
         dcurr = t.amount.dest_currency
 
         if self is t.src:
-            self.balances[scurr] = self.balances[scurr] + t.amount.src_amount
+            self.addUnits(scurr, amount.src_units, amount.scale)
             self.last_currency = scurr
         if self is t.dest:
-            self.balances[dcurr] = self.balances[dcurr] + t.amount.dest_amount
+            self.addUnits(dcurr, amount.dest_units, amount.scale)
             self.last_currency = dcurr
 
         self.transactions.append(t)
+        self._history = None
+
+    def removeTransactions(self, transactions):
+        """ Reverse the balances of transactions and remove them.
+
+        Currencies that none of the remaining transactions use are removed
+        from the balances.
+
+        Args:
+            transactions: Transactions of this account to remove.
+        """
+        ids = set()
+        for t in transactions:
+            amount = t.amount
+            if self is t.src:
+                self.addUnits(amount.src_currency, -amount.src_units, amount.scale)
+            if self is t.dest:
+                self.addUnits(amount.dest_currency, -amount.dest_units, amount.scale)
+            ids.add(id(t))
+
+        self.transactions = [t for t in self.transactions if id(t) not in ids]
+        self._history = None
+
+        used = set()
+        for t in self.transactions:
+            if self is t.src:
+                used.add(t.amount.src_currency)
+            if self is t.dest:
+                used.add(t.amount.dest_currency)
+
+        for currency in set(self._totals) - used:
+            del self._totals[currency]
+            self.balances.pop(currency, None)
+
+        self.last_currency = None
+        if self.transactions:
+            t = self.transactions[-1]
+            self.last_currency = t.amount.dest_currency if self is t.dest else t.amount.src_currency
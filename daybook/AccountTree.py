@@ -0,0 +1,162 @@
+""" AccountTree class for balances rolled up by account hierarchy.
+"""
+
+from daybook.Amount import add_units, from_units
+
+
+class AccountTree:
+    """ A prefix tree of dot-separated account names.
+
+    Each node is a field of a name, eg. 'expense.food.grocery' is the
+    node 'grocery' under 'food' under 'expense' under the root, and holds
+    the summed balances of every account at or below it. Accounts add to
+    the balances of their nodes as their own balances change, see
+    Account.addUnits, so subtotals never need to scan accounts or
+    transactions.
+    """
+
+    __slots__ = ('name', 'children', 'account', '_totals')
+
+    def __init__(self, name=''):
+        """ Initialize an empty node.
+
+        Args:
+            name: Full name of the node, eg. 'expense.food'. The root's
+                is empty.
+        """
+        self.name = name
+
+        # field => AccountTree
+        self.children = {}
+
+        # The account named name, if it was added.
+        self.account = None
+
+        # Exact (units, scale) balance per currency. See Account.addUnits.
+        self._totals = {}
+
+    def add(self, account):
+        """ Add an account and link it to its nodes.
+
+        The account's current balances are added to the nodes.
+
+        Args:
+            account: Account to add. Its balances are added to this tree
+                from now on.
+
+        Returns:
+            The account's node.
+        """
+        nodes = [self]
+        node = self
+        for field in account.name.split('.'):
+            try:
+                node = node.children[field]
+            except KeyError:
+                name = '{}.{}'.format(node.name, field) if node.name else field
+                node.children[field] = AccountTree(name)
+                node = node.children[field]
+            nodes.append(node)
+
+        node.account = account
+        account._nodes = tuple(nodes)
+        for currency, (units, scale) in account._totals.items():
+            for x in nodes:
+                x.addUnits(currency, units, scale)
+
+        return node
+
+    def remove(self, account):
+        """ Remove an account and subtract its balances from its nodes.
+
+        Nodes left with no accounts at or under them are removed.
+
+        Args:
+            account: Account that was added with add.
+        """
+        nodes = account._nodes
+        for currency, (units, scale) in account._totals.items():
+            for x in nodes:
+                x.addUnits(currency, -units, scale)
+
+        nodes[-1].account = None
+        account._nodes = ()
+
+        for parent, node in reversed(list(zip(nodes, nodes[1:]))):
+            if node.account is not None or node.children:
+                break
+            del parent.children[node.name.rpartition('.')[2]]
+
+    def addUnits(self, currency, units, scale):
+        """ Add to the balance of a currency, exactly. See Account.addUnits.
+        """
+        total = self._totals.get(currency, (0, scale))
+        if total[1] == scale:
+            self._totals[currency] = total[0] + units, scale
+        else:
+            self._totals[currency] = add_units(total, units, scale)
+
+    @property
+    def balances(self):
+        """ Dict of currency => balance of every account under this node.
+        """
+        return {k: from_units(*v) for k, v in self._totals.items()}
+
+    def get(self, name, default=None):
+        """ Find a node.
+
+        Args:
+            name: Full, dot-separated name of the node, eg. 'expense' or
+                'expense.food'. A trailing '.*' is ignored.
+            default: Returned if there's no such node.
+
+        Returns:
+            The node named name, or default.
+        """
+        if name.endswith('.*'):
+            name = name[:-2]
+
+        node = self
+        for field in name.split('.'):
+            try:
+                node = node.children[field]
+            except KeyError:
+                return default
+
+        return node
+
+    def __getitem__(self, name):
+        """ Find a node like get, but raise KeyError if it doesn't exist.
+        """
+        ret = self.get(name)
+        if ret is None:
+            raise KeyError(name)
+
+        return ret
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def __iter__(self):
+        """ Iterate over this node and every node under it, depth first and
+        sorted by name.
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(node.children[k] for k in sorted(node.children, reverse=True))
+
+    def accounts(self):
+        """ Accounts at or under this node, sorted by name.
+        """
+        return [x.account for x in self if x.account is not None]
+
+    def rollup(self):
+        """ Balances of every node at or under this one.
+
+        Returns:
+            A dict of node name => {currency: balance}, with a node per
+            prefix of every account name. The root's name is ''.
+        """
+        return {x.name: x.balances for x in self}
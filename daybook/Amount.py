@@ -2,48 +2,253 @@
 """
 
 import shlex
+from decimal import Decimal, InvalidOperation
+
+
+# Most decimal places kept. Finer amounts are rounded.
+max_scale = 18
+
+# Maximum number of numbers remembered by to_units.
+memo_size = 1 << 16
+
+_memo = {}
+
+_pow10 = [10 ** i for i in range(max_scale + 1)]
+
+_max_units = (1 << 63) - 1
+
+
+def to_units(x):
+    """ Convert a number to an integer count of its smallest decimal place.
+
+    Floats are converted through their shortest repr, so 0.1 is exactly
+    one tenth. Trailing zeros are dropped, so equal numbers always
+    convert to the same units.
+
+    eg.
+
+        to_units('-12.50') => (-125, 1)
+        to_units(3) => (3, 0)
+
+    Args:
+        x: int, float or numeric str.
+
+    Returns:
+        A pair of (units, scale) such that x == units / 10 ** scale.
+        units fits in 64 bits and scale is between 0 and max_scale.
+
+    Raises:
+        ValueError if x isn't a finite number, or is too large.
+    """
+    try:
+        ret = _memo.get(x)
+    except TypeError:
+        raise ValueError('{!r} is not a number.'.format(x))
+
+    if ret is not None:
+        return ret
+
+    if type(x) is int:
+        units, scale = x, 0
+    else:
+        s = x if type(x) is str else repr(x) if type(x) is float else str(x)
+        whole, _, frac = s.partition('.')
+        try:
+            if frac and not frac.isdigit():
+                raise ValueError
+            units, scale = int(whole + frac), len(frac)
+        except ValueError:
+            units, scale = _parse_decimal(x, s)
+
+    # Drop as few places as it takes to fit, rounding half to even once.
+    # Rounding one place at a time would round twice, eg. 0.0146 to 0.02.
+    if scale > max_scale or abs(units) > _max_units:
+        exact = units
+        drop = max(scale - max_scale, 0)
+        while True:
+            units = _round(exact, drop)
+            if drop == scale or abs(units) <= _max_units:
+                break
+            drop += 1
+        scale -= drop
+
+    while scale and not units % 10:
+        units //= 10
+        scale -= 1
+
+    if abs(units) > _max_units:
+        raise ValueError('{!r} is too large.'.format(x))
+
+    if len(_memo) >= memo_size:
+        _memo.clear()
+    _memo[x] = units, scale
+
+    return units, scale
+
+
+def _round(units, places):
+    """ Round units to a multiple of 10 ** places, half to even, and
+    divide them by it.
+    """
+    if not places:
+        return units
+
+    units, r = divmod(units, 10 ** places)
+    half = 5 * 10 ** (places - 1)
+    if r > half or (r == half and units % 2):
+        units += 1
+
+    return units
+
+
+def _parse_decimal(x, s):
+    """ to_units for exponents and other numbers int can't parse.
+    """
+    try:
+        d = Decimal(s)
+    except InvalidOperation:
+        raise ValueError('{!r} is not a number.'.format(x))
+
+    if not d.is_finite():
+        raise ValueError('{!r} is not a finite number.'.format(x))
+
+    sign, digits, exp = d.as_tuple()
+    units = int(''.join(map(str, digits)))
+    units = -units if sign else units
+    if exp >= 0:
+        return units * 10 ** exp, 0
+
+    return units, -exp
+
+
+def add_units(total, units, scale):
+    """ Add units at a scale to a (units, scale) total, exactly.
+
+    Returns:
+        The new (units, scale) total, at the larger of the two scales.
+    """
+    tunits, tscale = total
+    if scale > tscale:
+        return tunits * _pow10[scale - tscale] + units, scale
+
+    return tunits + units * _pow10[tscale - scale], tscale
+
+
+def from_units(units, scale):
+    """ Convert (units, scale) to the nearest float.
+    """
+    return units / _pow10[scale]
 
 
 def _cast_list(l_):
-    """ Casts the references in l_ to two lists - floats and strs.
+    """ Casts the references in l_ to two lists - (units, scale) and strs.
     """
-    floats = []
+    amounts = []
     strs = []
     for elem in l_:
         try:
-            x = float(elem)
-            floats.append(x)
+            amounts.append(to_units(elem))
         except ValueError:
             strs.append(elem)
 
-    return floats, strs
+    return amounts, strs
 
 
 class Amount:
+    """ An exchange of src_amount of src_currency for dest_amount of
+    dest_currency.
+
+    Amounts are exact. Both are stored as integer units of the same
+    decimal place (see to_units), and are only converted to floats by the
+    src_amount and dest_amount properties.
+    """
+
+    __slots__ = ('src_currency', 'src_units', 'dest_currency', 'dest_units', 'scale')
+
     def __init__(self, src_currency, src_amount, dest_currency, dest_amount):
 
         try:
-            src_amount = float(src_amount)
-            dest_amount = float(dest_amount)
+            src = to_units(src_amount)
+            dest = to_units(dest_amount)
         except ValueError:
-            raise ValueError('Could not convert amount entries to floats.')
+            raise ValueError('Could not convert amount entries to numbers.')
 
-        src_currency = src_currency
-        dest_currency = dest_currency
+        self._set(src_currency, src, dest_currency, dest)
 
-        if src_amount * dest_amount > 0:
+    def _set(self, src_currency, src, dest_currency, dest):
+        """ Check and set the currencies and (units, scale) of each side.
+        """
+        src_units, src_scale = src
+        dest_units, dest_scale = dest
+        scale = max(src_scale, dest_scale)
+        src_units *= _pow10[scale - src_scale]
+        dest_units *= _pow10[scale - dest_scale]
+
+        if abs(src_units) > _max_units or abs(dest_units) > _max_units:
+            raise ValueError('Amounts are too large at {} decimal places.'.format(scale))
+
+        if src_units * dest_units > 0:
             raise ValueError('One side has to lose while the other gains.')
 
-        if src_currency == dest_currency and src_amount != -dest_amount:
-            raise ValueError('Uneven exchange: {} and {}.'.format(src_amount, dest_amount))
+        if src_currency == dest_currency and src_units != -dest_units:
+            raise ValueError('Uneven exchange: {} and {}.'.format(
+                from_units(src_units, scale), from_units(dest_units, scale)))
 
         if type(src_currency) is not str or type(dest_currency) is not str:
             raise ValueError('Currencies must be strings.')
 
         self.src_currency = src_currency
-        self.src_amount = src_amount
+        self.src_units = src_units
         self.dest_currency = dest_currency
-        self.dest_amount = dest_amount
+        self.dest_units = dest_units
+        self.scale = scale
+
+    @classmethod
+    def fromUnits(cls, src_currency, src_units, dest_currency, dest_units, scale):
+        """ Create an amount from units of another amount, without checks.
+
+        Args:
+            src_currency: Currency of src_units.
+            src_units: Integer count of 10 ** -scale.
+            dest_currency: Currency of dest_units.
+            dest_units: Integer count of 10 ** -scale.
+            scale: Decimal places of the units.
+
+        Returns:
+            New Amount instance.
+        """
+        while scale and not src_units % 10 and not dest_units % 10:
+            src_units //= 10
+            dest_units //= 10
+            scale -= 1
+
+        ret = cls.__new__(cls)
+        ret.src_currency = src_currency
+        ret.src_units = src_units
+        ret.dest_currency = dest_currency
+        ret.dest_units = dest_units
+        ret.scale = scale
+
+        return ret
+
+    def __copy__(self):
+        ret = Amount.__new__(Amount)
+        ret.src_currency = self.src_currency
+        ret.src_units = self.src_units
+        ret.dest_currency = self.dest_currency
+        ret.dest_units = self.dest_units
+        ret.scale = self.scale
+        return ret
+
+    @property
+    def src_amount(self):
+        """ Amount of src_currency as a float. """
+        return self.src_units / _pow10[self.scale]
+
+    @property
+    def dest_amount(self):
+        """ Amount of dest_currency as a float. """
+        return self.dest_units / _pow10[self.scale]
 
     def correct(self):
         """ Ensure src amount is negative.
@@ -52,9 +257,9 @@ class Amount:
         amounts and currencies are swapped to represent value flowing
         from the source.
         """
-        if self.dest_amount < 0:
-            (self.src_currency, self.src_amount, self.dest_currency, self.dest_amount) = (
-                self.dest_currency, self.dest_amount, self.src_currency, self.src_amount)
+        if self.dest_units < 0:
+            (self.src_currency, self.src_units, self.dest_currency, self.dest_units) = (
+                self.dest_currency, self.dest_units, self.src_currency, self.src_units)
 
     def __str__(self):
         return '{}:{} {}:{}'.format(
@@ -66,9 +271,10 @@ class Amount:
     def __eq__(self, other):
         return (
             self.src_currency == other.src_currency
-            and self.src_amount == other.src_amount
+            and self.src_units == other.src_units
             and self.dest_currency == other.dest_currency
-            and self.dest_amount == other.dest_amount)
+            and self.dest_units == other.dest_units
+            and self.scale == other.scale)
 
     @classmethod
     def createFromStr(cls, s, suggestion):
@@ -118,7 +324,7 @@ class Amount:
             except IndexError:
                 raise ValueError('No amount provided for exchange.')
 
-            damount = -samount
+            damount = (-samount[0], samount[1])
             scurr = suggestion
             dcurr = scurr
 
@@ -133,7 +339,7 @@ class Amount:
             except IndexError:
                 raise ValueError('No currency provided for exchange.')
 
-            damount = -samount
+            damount = (-samount[0], samount[1])
             dcurr = scurr
 
         elif len(toks) == 4:
@@ -156,4 +362,6 @@ class Amount:
         else:
             raise ValueError('Invalid amount - too many entries')
 
-        return Amount(scurr, samount, dcurr, damount)
+        ret = cls.__new__(cls)
+        ret._set(scurr, samount, dcurr, damount)
+        return ret
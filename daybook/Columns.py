@@ -0,0 +1,323 @@
+""" Columns class for storing transactions compactly.
+"""
+
+from array import array
+from datetime import date, datetime, timedelta, timezone
+
+from daybook.Account import Account
+from daybook.Amount import Amount
+from daybook.Transaction import Transaction
+
+
+# Offset of dates without a timezone.
+_NAIVE = -(1 << 31)
+
+
+class _Interned(dict):
+    """ Ids of values, assigned in the order the values are first looked up.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.values = []
+
+    def __missing__(self, value):
+        ret = self[value] = len(self.values)
+        self.values.append(value)
+        return ret
+
+
+class Columns:
+    """ Transactions stored as parallel arrays.
+
+    Each transaction is a row across the arrays. Account names, currencies,
+    sets of tags and notes are interned and stored as ids, so a row takes
+    a few dozen bytes rather than several Python objects.
+
+    Columns don't track balances or duplicates. They are built from parsed
+    rows or from a ledger's transactions, and Transaction objects are
+    only created when rows are read back.
+
+    Columns (each an array.array with the typecode in Columns.layout, one
+    entry per row):
+        day: Ordinal of the date.
+        time: Microseconds since midnight, or -1 if the date had no time.
+        offset: UTC offset in seconds of timezone aware dates, or _NAIVE.
+        src, dest: Ids in self.accounts.
+        src_currency, dest_currency: Ids in self.currencies.
+        src_units, dest_units, scale: Exact amounts. See Amount.
+        tags: Ids in self.tagsets.
+        notes: Ids in self.texts.
+    """
+
+    layout = {
+        'day': 'i',
+        'time': 'q',
+        'offset': 'i',
+        'src': 'i',
+        'dest': 'i',
+        'src_currency': 'i',
+        'dest_currency': 'i',
+        'src_units': 'q',
+        'dest_units': 'q',
+        'scale': 'b',
+        'tags': 'i',
+        'notes': 'i',
+    }
+
+    def __init__(self):
+        for name, typecode in self.layout.items():
+            setattr(self, name, array(typecode))
+
+        self._accounts = _Interned()
+        self._currencies = _Interned()
+        self._tagsets = _Interned()
+        self._notes = _Interned()
+
+        # Account references shared by materialized transactions.
+        self._refs = {}
+
+        # Object that owns the memory of columns created by fromBuffers.
+        self._buffer = None
+
+    def __getstate__(self):
+        self._own()
+        state = self.__dict__.copy()
+        state['_refs'] = {}
+        return state
+
+    @property
+    def accounts(self):
+        """ Account names by id. """
+        return self._accounts.values
+
+    @property
+    def currencies(self):
+        """ Currencies by id. """
+        return self._currencies.values
+
+    @property
+    def tagsets(self):
+        """ Frozensets of tags by id. """
+        return self._tagsets.values
+
+    @property
+    def texts(self):
+        """ Notes by id. """
+        return self._notes.values
+
+    @classmethod
+    def fromBuffers(cls, columns, accounts, currencies, tagsets, texts, owner=None):
+        """ Create read-only columns over existing memory, eg. an mmap.
+
+        The columns are copied into arrays the first time a row is
+        appended, and texts is copied into a list.
+
+        Args:
+            columns: Dict of column name => memoryview cast to the column's
+                typecode. See Columns.layout.
+            accounts: List of account names by id.
+            currencies: List of currencies by id.
+            tagsets: List of iterables of tags by id.
+            texts: Sequence of notes by id.
+            owner: Object to keep alive while the columns are in use.
+
+        Returns:
+            A new Columns object.
+        """
+        ret = cls()
+        for name in cls.layout:
+            setattr(ret, name, columns[name])
+
+        for x in accounts:
+            ret._accounts[x]
+        for x in currencies:
+            ret._currencies[x]
+        for x in tagsets:
+            ret._tagsets[frozenset(x)]
+
+        ret._notes.values = texts
+        ret._buffer = owner
+
+        return ret
+
+    def _own(self):
+        """ Copy columns created by fromBuffers into arrays.
+        """
+        if self._buffer is None:
+            return
+
+        for name, typecode in self.layout.items():
+            column = array(typecode)
+            column.frombytes(getattr(self, name).cast('B'))
+            setattr(self, name, column)
+
+        texts = self._notes.values
+        self._notes = _Interned()
+        for x in texts:
+            self._notes[x]
+
+        self._buffer = None
+
+    @classmethod
+    def fromTransactions(cls, transactions):
+        """ Create columns from transactions.
+
+        Args:
+            transactions: Iterable of transactions, eg. Ledger.transactions.
+
+        Returns:
+            A new Columns object.
+        """
+        columns = cls()
+        for t in transactions:
+            columns.append(t.date._date, t.src.name, t.dest.name, t.amount, t.tags, t.notes)
+
+        return columns
+
+    def append(self, date_, src, dest, amount, tags=(), notes=''):
+        """ Append a row.
+
+        The arguments are the fields of a row returned by Ledger.parseRows.
+
+        Args:
+            date_: date or datetime. Timezones are stored as UTC offsets.
+            src: Full name of the source account.
+            dest: Full name of the destination account.
+            amount: Amount.
+            tags: Iterable of tags.
+            notes: Notes str.
+        """
+        self._own()
+
+        offset = _NAIVE
+        if type(date_) is datetime:
+            midnight = datetime(date_.year, date_.month, date_.day)
+            time = (date_.replace(tzinfo=None) - midnight) // timedelta(microseconds=1)
+            if date_.tzinfo is not None:
+                offset = date_.utcoffset() // timedelta(seconds=1)
+        else:
+            time = -1
+
+        self.day.append(date_.toordinal())
+        self.time.append(time)
+        self.offset.append(offset)
+        self.src.append(self._accounts[src])
+        self.dest.append(self._accounts[dest])
+        self.src_currency.append(self._currencies[amount.src_currency])
+        self.dest_currency.append(self._currencies[amount.dest_currency])
+        self.src_units.append(amount.src_units)
+        self.dest_units.append(amount.dest_units)
+        self.scale.append(amount.scale)
+        self.tags.append(self._tagsets[frozenset(tags)])
+        self.notes.append(self._notes[notes])
+
+    def extend(self, rows):
+        """ Append rows returned by Ledger.parseRows.
+        """
+        for row in rows:
+            self.append(*row)
+
+    def updateTags(self, transactions):
+        """ Re-read the tags of the transactions these rows were made from.
+
+        Args:
+            transactions: A transaction per row, in order.
+        """
+        self._own()
+        self.tags = array('i', [self._tagsets[frozenset(t.tags)] for t in transactions])
+
+    def delete(self, rows):
+        """ Delete rows.
+
+        Ids of values that no remaining row uses are kept.
+
+        Args:
+            rows: Ascending indexes of the rows to delete.
+        """
+        self._own()
+
+        starts = [0] + [i + 1 for i in rows]
+        ends = list(rows) + [len(self)]
+        for name, typecode in self.layout.items():
+            column = getattr(self, name)
+            kept = array(typecode)
+            for start, end in zip(starts, ends):
+                kept += column[start:end]
+            setattr(self, name, kept)
+
+    def move(self, start, position):
+        """ Move the rows from start to the end before the row at position.
+
+        Args:
+            start: Index of the first row to move.
+            position: Index of the row to move them before, up to start.
+        """
+        self._own()
+
+        for name in self.layout:
+            column = getattr(self, name)
+            setattr(self, name, column[:position] + column[start:] + column[position:start])
+
+    def __len__(self):
+        return len(self.day)
+
+    def date(self, i):
+        """ The date of row i as a date, or datetime if it had a time.
+        """
+        d = date.fromordinal(self.day[i])
+        time = self.time[i]
+        if time < 0:
+            return d
+
+        ret = datetime(d.year, d.month, d.day) + timedelta(microseconds=time)
+        offset = self.offset[i]
+        if offset != _NAIVE:
+            ret = ret.replace(tzinfo=timezone(timedelta(seconds=offset)))
+
+        return ret
+
+    def amount(self, i):
+        """ The Amount of row i.
+        """
+        return Amount.fromUnits(
+            self.currencies[self.src_currency[i]], self.src_units[i],
+            self.currencies[self.dest_currency[i]], self.dest_units[i],
+            self.scale[i])
+
+    def row(self, i):
+        """ Row i as a tuple like those returned by Ledger.parseRows.
+        """
+        return (
+            self.date(i),
+            self.accounts[self.src[i]],
+            self.accounts[self.dest[i]],
+            self.amount(i),
+            set(self.tagsets[self.tags[i]]),
+            self.texts[self.notes[i]])
+
+    def rows(self):
+        """ Iterate over every row. See Columns.row.
+
+        The rows may be committed to a ledger with Ledger.commitRows.
+        """
+        return (self.row(i) for i in range(len(self)))
+
+    def __getitem__(self, i):
+        """ Materialize row i as a Transaction.
+
+        The transaction's accounts are shared with the other transactions
+        materialized by these columns and don't track balances.
+        """
+        date_, src, dest, amount, tags, notes = self.row(i)
+        return Transaction(date_, self._ref(src), self._ref(dest), amount, tags, notes)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def _ref(self, name):
+        try:
+            return self._refs[name]
+        except KeyError:
+            account = self._refs[name] = Account(name)
+            return account
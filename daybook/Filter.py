@@ -0,0 +1,300 @@
+""" Compile --filter expressions into transaction predicates.
+"""
+
+import ast
+
+from superdate import SuperDate
+
+from daybook.Account import Account
+from daybook.Amount import Amount
+from daybook.NotesIndex import NotesIndex
+from daybook.Transaction import Transaction
+
+
+# Names available to filter expressions besides the builtins and t.
+namespace = {
+    'Account': Account,
+    'Amount': Amount,
+    'SuperDate': SuperDate,
+    'Transaction': Transaction,
+}
+
+
+def compile_filter(expr):
+    """ Compile a filter expression into a predicate.
+
+    The expression is parsed once and compiled into the body of a
+    function of a single argument, t, so evaluating it per transaction
+    costs a single function call.
+
+    eg.
+
+        f = compile_filter("'expense' in t.accounts")
+        transactions = [t for t in ledger.transactions if f(t)]
+
+    Args:
+        expr: Python3 conditional expression referencing the transaction
+            as 't'. If expr is already callable then it is returned as is.
+
+    Returns:
+        A function that accepts a Transaction and returns the value of
+        the expression.
+
+    Raises:
+        ValueError if expr isn't a valid python3 expression.
+    """
+    if callable(expr):
+        return expr
+
+    try:
+        tree = ast.parse(expr.strip(), '<filter>', 'eval')
+    except SyntaxError as se:
+        raise ValueError('Invalid filter "{}": {}.'.format(expr, se.msg))
+
+    args = ast.arguments(
+        posonlyargs=[], args=[ast.arg(arg='t')], vararg=None,
+        kwonlyargs=[], kw_defaults=[], kwarg=None, defaults=[])
+
+    tree = ast.Expression(body=ast.Lambda(args=args, body=tree.body))
+    code = compile(ast.fix_missing_locations(tree), '<filter>', 'eval')
+
+    return eval(code, dict(namespace))
+
+
+def _is_attr(node, *attrs):
+    """ Check if node is an attribute chain of t. eg. t.src.name
+    """
+    for attr in reversed(attrs):
+        if not isinstance(node, ast.Attribute) or node.attr != attr:
+            return False
+        node = node.value
+
+    return isinstance(node, ast.Name) and node.id == 't'
+
+
+def _is_str(node):
+    return isinstance(node, ast.Constant) and type(node.value) is str
+
+
+_ops = {ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>=', ast.Eq: '=='}
+
+# Mirror of comparison operators for when t.date is on the right side.
+_mirrored = {ast.Lt: ast.Gt, ast.LtE: ast.GtE, ast.Gt: ast.Lt, ast.GtE: ast.LtE, ast.Eq: ast.Eq}
+
+
+def _plan_date(op, s, index):
+    """ Candidates for t.date <op> s.
+    """
+    try:
+        day = SuperDate(s).toordinal()
+    except ValueError:
+        return None, []
+
+    first, last = {
+        ast.Lt: (None, day),
+        ast.LtE: (None, day),
+        ast.Gt: (day, None),
+        ast.GtE: (day, None),
+        ast.Eq: (day, day),
+    }[op]
+
+    return set(index().dateRange(first, last)), ['date index for t.date {} {!r}'.format(_ops[op], s)]
+
+
+def _notes_transform(node):
+    """ If node is t.notes or a transform of it, return the transform's
+    name for NotesIndex.search. Otherwise return False.
+    """
+    if _is_attr(node, 'notes'):
+        return None
+
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+            and node.func.attr in NotesIndex.transforms and not node.args and not node.keywords
+            and _is_attr(node.func.value, 'notes')):
+        return node.func.attr
+
+    return False
+
+
+def _plan_compare(left, op, right, index, tags, notes):
+    """ Candidates for a single comparison.
+    """
+    op = type(op)
+
+    if op in _mirrored and _is_attr(right, 'date') and _is_str(left):
+        left, right, op = right, left, _mirrored[op]
+
+    if op in _ops and _is_attr(left, 'date') and _is_str(right):
+        return _plan_date(op, right.value, index)
+
+    if op is ast.In and _is_str(left):
+        s = left.value
+        if _is_attr(right, 'accounts') and ' ' not in s:
+            return index().accounts(s), ['account index for {!r} in t.accounts'.format(s)]
+        elif _is_attr(right, 'tags'):
+            return tags().tagged(s), ['tag index for {!r} in t.tags'.format(s)]
+
+        transform = _notes_transform(right)
+        if transform is not False:
+            used = 't.notes' if transform is None else 't.notes.{}()'.format(transform)
+            return notes().search(s, transform), ['notes index for {!r} in {}'.format(s, used)]
+
+        for side in ['src', 'dest']:
+            if _is_attr(right, side, 'name'):
+                return index().accounts(s, side), ['account index for {!r} in t.{}.name'.format(s, side)]
+
+    if op is ast.NotIn and _is_str(left) and _is_attr(right, 'tags'):
+        return tags().untagged(left.value), ['tag index for {!r} not in t.tags'.format(left.value)]
+
+    if op is ast.Eq:
+        if _is_str(left):
+            left, right = right, left
+
+        for side in ['src', 'dest']:
+            if _is_attr(left, side, 'name') and _is_str(right):
+                return (
+                    index().accountNamed(right.value, side),
+                    ['account index for t.{}.name == {!r}'.format(side, right.value)])
+            if _is_attr(left, side, 'type') and _is_str(right):
+                return (
+                    index().accountTyped(right.value, side),
+                    ['account index for t.{}.type == {!r}'.format(side, right.value)])
+
+    return None, []
+
+
+def _plan(node, index, tags, notes):
+    """ Find candidate positions for a filter expression.
+
+    Candidates are a superset of the positions of the transactions that
+    satisfy the expression. They still have to be checked with the
+    compiled predicate.
+
+    Args:
+        node: Body of the parsed filter expression.
+        index: Function that returns the Index to answer the expression
+            from. It is only called if the expression can use it.
+        tags: Function that returns the TagIndex to answer tag lookups
+            from, like index.
+        notes: Function that returns the NotesIndex to answer substring
+            searches of notes from, like index.
+
+    Returns:
+        A set of candidate positions or None if every transaction is a
+        candidate, and a list of the index lookups that were used.
+    """
+    if isinstance(node, ast.BoolOp):
+        plans = [_plan(x, index, tags, notes) for x in node.values]
+
+        if isinstance(node.op, ast.And):
+            found = [(ps, used) for ps, used in plans if ps is not None]
+            if not found:
+                return None, []
+
+            ps = set.intersection(*[ps for ps, _ in found])
+            return ps, [u for _, used in found for u in used]
+
+        if any(ps is None for ps, _ in plans):
+            return None, []
+
+        return set.union(*[ps for ps, _ in plans]), [u for _, used in plans for u in used]
+
+    if isinstance(node, ast.Compare):
+        found = []
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            ps, used = _plan_compare(left, op, right, index, tags, notes)
+            if ps is not None:
+                found.append((ps, used))
+            left = right
+
+        if not found:
+            return None, []
+
+        return set.intersection(*[ps for ps, _ in found]), [u for _, used in found for u in used]
+
+    # Tag lookups are exact rather than candidates, so they can be negated.
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        node = node.operand
+        if (isinstance(node, ast.Compare) and len(node.ops) == 1
+                and type(node.ops[0]) in (ast.In, ast.NotIn) and _is_attr(node.comparators[0], 'tags')):
+            op = ast.NotIn() if type(node.ops[0]) is ast.In else ast.In()
+            return _plan_compare(node.left, op, node.comparators[0], index, tags, notes)
+
+    return None, []
+
+
+class Query:
+    """ A filter that is answered from a ledger's indexes when possible.
+
+    Date comparisons on t.date and substring and name checks on accounts
+    are looked up in Ledger.index(), tag membership in Ledger.tags() and
+    substrings of t.notes in Ledger.notes(). They are combined with 'and'
+    and 'or', and tag lookups may be negated with 'not'. Only the
+    resulting candidates are checked with the compiled predicate. Filters
+    that can't be looked up check every transaction.
+    """
+
+    def __init__(self, filter=lambda t: True):
+        """ Compile a filter.
+
+        Args:
+            filter: Filter expression or callable. See compile_filter.
+
+        Raises:
+            See compile_filter.
+        """
+        self.filter = filter
+        self.predicate = compile_filter(filter)
+        self.tree = None if callable(filter) else ast.parse(filter.strip(), '<filter>', 'eval').body
+
+        # Statistics about the last run for explain.
+        self.used = []
+        self.scanned = 0
+        self.total = 0
+        self.matched = 0
+
+    def matchesAll(self):
+        """ Check if the filter is a constant that every transaction
+        satisfies, like the default filter 'True'.
+        """
+        return isinstance(self.tree, ast.Constant) and bool(self.tree.value)
+
+    def run(self, ledger):
+        """ Find the transactions in a ledger that satisfy the filter.
+
+        Args:
+            ledger: Ledger to search.
+
+        Returns:
+            List of internal transaction references in ledger order.
+        """
+        ts = ledger.transactions
+        ps, self.used = (None, []) if self.tree is None else _plan(self.tree, ledger.index, ledger.tags, ledger.notes)
+
+        if ps is None:
+            ret = [t for t in ts if self.predicate(t)]
+            self.scanned = len(ts)
+        else:
+            ret = [ts[i] for i in sorted(ps) if self.predicate(ts[i])]
+            self.scanned = len(ps)
+
+        self.total = len(ts)
+        self.matched = len(ret)
+
+        return ret
+
+    def explain(self):
+        """ Describe how the last run was answered.
+
+        Returns:
+            A multi-line str.
+        """
+        lines = ['filter: {}'.format(self.filter if not callable(self.filter) else '<function>')]
+        lines.extend('used: {}'.format(x) for x in self.used)
+        if not self.used:
+            lines.append('used: full scan')
+
+        lines.append('scanned {} of {} transactions, {} matched'.format(self.scanned, self.total, self.matched))
+
+        return '\n'.join(lines)
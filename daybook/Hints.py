@@ -4,6 +4,11 @@
 import string
 
 from daybook.util import colonconf
+from daybook.util.AhoCorasick import AhoCorasick
+
+
+# Maximum number of strings remembered by Hints.suggest.
+memo_size = 1 << 16
 
 
 class Hints:
@@ -14,6 +19,13 @@ class Hints:
             hints: Path to the hints file.
         """
         self.hints = {}
+
+        # Paths of every loaded hints file.
+        self.files = []
+
+        # Every line of every key, compiled by load.
+        self._compile()
+
         if hints:
             self.load(hints)
 
@@ -28,6 +40,7 @@ class Hints:
             couldn't be opened.
         """
         d = colonconf.load(hints)
+        self.files.append(hints)
 
         for k, v in d.items():
             lines = [x.strip() for x in v.splitlines() if x.strip()]
@@ -36,17 +49,37 @@ class Hints:
             else:
                 self.hints[k].extend(lines)
 
+        self._compile()
+
+    def _compile(self):
+        """ Compile every line into a single matcher, ranked by key order.
+        """
+        self._keys = list(self.hints)
+        self._matcher = AhoCorasick(
+            (line, rank) for rank, k in enumerate(self._keys) for line in self.hints[k])
+        self._memo = {}
+
     def suggest(self, s):
         """ Suggest an entry given a string.
 
         Args:
             s: The string to search for within self.hints.
 
+        If values of several keys are substrings of s, then the key that
+        comes first in the hints files wins. Suggestions are memoized.
+
         Returns:
             The key in hints for which a value was a substring of s.
         """
-        for k, v in self.hints.items():
-            if any([line in s for line in v]):
-                return k
+        try:
+            return self._memo[s]
+        except KeyError:
+            pass
+
+        if len(self._memo) >= memo_size:
+            self._memo.clear()
+
+        rank = self._matcher.search(s)
+        ret = self._memo[s] = '' if rank is None else self._keys[rank]
 
-        return ''
+        return ret
@@ -0,0 +1,89 @@
+""" Index class for answering filters without scanning every transaction.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+
+class Index:
+    """ Lookup tables over a list of transactions.
+
+    Every table maps to positions within the list of transactions the
+    index was built from. The index is a snapshot; it has to be rebuilt
+    whenever that list changes. Tags are looked up in a TagIndex instead,
+    which is kept up to date.
+    """
+
+    def __init__(self, transactions):
+        """ Build an index over a list of transactions.
+
+        Args:
+            transactions: List of transactions, eg. Ledger.transactions.
+        """
+        self.size = len(transactions)
+
+        # Positions sorted by the ordinal of the transaction's date.
+        keys = [t.date.toordinal() for t in transactions]
+        self.date_order = sorted(range(self.size), key=keys.__getitem__)
+        self.date_keys = [keys[i] for i in self.date_order]
+
+        # Account name => positions, for src and dest separately.
+        self.src = defaultdict(list)
+        self.dest = defaultdict(list)
+
+        for i, t in enumerate(transactions):
+            self.src[t.src.name].append(i)
+            self.dest[t.dest.name].append(i)
+
+    def dateRange(self, first=None, last=None):
+        """ Positions of transactions dated within a range of days.
+
+        Args:
+            first: Ordinal of the first day in the range, or None.
+            last: Ordinal of the last day in the range, or None.
+
+        Returns:
+            A list of positions.
+        """
+        lo = 0 if first is None else bisect_left(self.date_keys, first)
+        hi = self.size if last is None else bisect_right(self.date_keys, last)
+        return self.date_order[lo:hi]
+
+    def accounts(self, s, side=None):
+        """ Positions of transactions with an account name containing s.
+
+        Args:
+            s: Substring to search account names for.
+            side: 'src' or 'dest' to only search one side of transactions.
+                Both sides are searched by default.
+
+        Returns:
+            A set of positions.
+        """
+        tables = [self.src, self.dest] if side is None else [getattr(self, side)]
+        return {i for table in tables for name, ps in table.items() if s in name for i in ps}
+
+    def accountNamed(self, name, side):
+        """ Positions of transactions where side is exactly name.
+
+        Args:
+            name: Account name.
+            side: 'src' or 'dest'.
+
+        Returns:
+            A set of positions.
+        """
+        return set(getattr(self, side).get(name, []))
+
+    def accountTyped(self, type_, side):
+        """ Positions of transactions where side is of an account type.
+
+        Args:
+            type_: Account type.
+            side: 'src' or 'dest'.
+
+        Returns:
+            A set of positions.
+        """
+        table = getattr(self, side)
+        return {i for name, ps in table.items() if name.split('.')[0] == type_ for i in ps}
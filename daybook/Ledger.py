@@ -2,15 +2,25 @@
 """
 
 import csv
+import hashlib
 import io
 import os
+from bisect import bisect_left
+from itertools import groupby, islice
+from operator import ge, itemgetter, le
 
-from superdate import SuperDate
-
+from daybook import aggregate
 from daybook.Account import Account
+from daybook.AccountTree import AccountTree
 from daybook.Amount import Amount
+from daybook.Columns import Columns
+from daybook.Filter import Query
+from daybook.Index import Index
+from daybook.NotesIndex import NotesIndex
+from daybook.TagIndex import TagIndex
 from daybook.Transaction import Transaction
 from daybook.util.DupeTracker import DupeTracker
+from daybook.util.dates import date_key, parse_date
 
 
 def suggest_notes(src, dest, amount):
@@ -38,6 +48,38 @@ def suggest_notes(src, dest, amount):
     return ' -> '.join(accts if src != dest else currs)
 
 
+def _sort(transactions, batches=()):
+    """ Stable sort of transactions by date_key, in place.
+
+    Batches that are in descending order, like many bank exports, are
+    reversed first. Timsort then merges the batches as presorted runs.
+
+    Args:
+        transactions: List of transactions.
+        batches: Index where each batch of transactions starts.
+
+    Returns:
+        True if the order changed.
+    """
+    keys = [date_key(t.date._date) for t in transactions]
+    if all(map(le, keys, islice(keys, 1, None))):
+        return False
+
+    bounds = sorted(set(batches) | {0, len(keys)})
+    for start, end in zip(bounds, bounds[1:]):
+        if all(map(ge, keys[start:end], islice(keys, start + 1, end))):
+            # Reverse the runs of equal keys, but not the runs themselves.
+            runs = [list(g) for _, g in groupby(zip(keys[start:end], transactions[start:end]), itemgetter(0))]
+            runs.reverse()
+            keys[start:end] = [k for run in runs for k, _ in run]
+            transactions[start:end] = [t for run in runs for _, t in run]
+
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    transactions[:] = [transactions[i] for i in order]
+
+    return True
+
+
 class Ledger:
 
     def __init__(self, primary_currency, duplicate_window=0):
@@ -57,26 +99,195 @@ class Ledger:
         self.accounts = {}
         self.transactions = []
 
+        # Accounts by hierarchy, with rolled up balances.
+        self.tree = AccountTree()
+
         # Detect redundant transactions.
         self.dupes = DupeTracker(self.duplicate_window)
 
         # Number of times "addTransactions" is called.
         self.num_adds = 0
 
+        # Absolute path of each loaded CSV mapped to the number of bytes
+        # loaded from it and the sha256 of those bytes, in the order they
+        # were committed.
+        self.sources = {}
+
+        # Absolute path of each loaded CSV mapped to the range of
+        # self.transactions committed from it, while the transactions are
+        # still in the order the CSVs were committed. See loadCsvTail.
+        self._spans = {}
+
+        # Built on demand by Ledger.index.
+        self._index = None
+
+        # A row per transaction, see Ledger.columns. The tags column is
+        # stale after tags are added to committed transactions.
+        self._columns = Columns()
+        self._stale_tags = False
+
+        # Positions of transactions by tag, see Ledger.tags. Duplicates
+        # that add tags to committed transactions leave them in _retagged
+        # with the tags they added, until the index next finds them.
+        self._tags = TagIndex()
+        self._retagged = []
+
+        # Built on demand by Ledger.notes.
+        self._notes = None
+
+        # Sortedness, see Ledger.sort. Sort key of the last transaction
+        # appended to each account by name, and to the ledger under None.
+        # Names of accounts with transactions out of order, whether the
+        # ledger's are in order, and where in them each batch since the
+        # last sort starts.
+        self._last_keys = {}
+        self._unsorted = set()
+        self._sorted = True
+        self._batches = []
+
+        # (raw account string, thisname, hints, number of hints files)
+        # => account name, or the message of the ValueError it raised.
+        # See Ledger.resolveAccount.
+        self._resolved = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_index'] = None
+        state['_tags'] = None
+        state['_retagged'] = []
+        state['_notes'] = None
+        state['_resolved'] = {}
+        return state
+
+    def __setstate__(self, state):
+        """ Re-attach transactions to accounts after unpickling.
+
+        See Account.__getstate__.
+        """
+        self.__dict__.update(state)
+        for t in self._transactions or []:
+            t.src.transactions.append(t)
+            if t.src is not t.dest:
+                t.dest.transactions.append(t)
+
+    @classmethod
+    def fromColumns(cls, columns, primary_currency, duplicate_window=0):
+        """ Create a ledger from the columns of another ledger.
+
+        Accounts and their balances are created right away, from the
+        columns. The transactions are only created from the columns when
+        they are first used, eg. by a filter or a dump. Account
+        transaction lists and last currencies are filled in then too.
+
+        The ledger has no duplicate history, so transactions added to it
+        are only checked against each other.
+
+        Args:
+            columns: Columns of a ledger, eg. from ledgerfile.open_columns.
+                The rows are committed as they are, in order.
+            primary_currency: Primary currency for the ledger.
+            duplicate_window: See Ledger.
+
+        Returns:
+            A new Ledger that uses columns as its own.
+        """
+        ledger = cls(primary_currency, duplicate_window)
+        ledger._columns = columns
+        ledger._transactions = None
+        ledger._tags = None
+        ledger._sorted = False
+        ledger._unsorted = set(columns.accounts)
+
+        for name in columns.accounts:
+            ledger._account(name)
+
+        for name, totals in aggregate.balances(columns, exact=True).items():
+            account = ledger.accounts[name]
+            for currency, (units, scale) in totals.items():
+                account.addUnits(currency, units, scale)
+
+        return ledger
+
+    @property
+    def transactions(self):
+        """ List of the ledger's transactions in order.
+        """
+        if self._transactions is None:
+            self._materialize()
+
+        return self._transactions
+
+    @transactions.setter
+    def transactions(self, transactions):
+        self._transactions = transactions
+
+    def _materialize(self):
+        """ Create the transactions of a ledger from fromColumns.
+        """
+        self._transactions = []
+        for date, src, dest, amount, tags, notes in self._columns.rows():
+            src = self.accounts[src]
+            dest = self.accounts[dest]
+            t = Transaction(date, src, dest, amount, tags, notes)
+
+            self._transactions.append(t)
+            src.transactions.append(t)
+            src.last_currency = amount.src_currency
+            if dest is not src:
+                dest.transactions.append(t)
+            dest.last_currency = amount.dest_currency
+
+        for account in self.accounts.values():
+            account._history = None
+
     def clear(self):
         """ Clear the ledger and start from scratch.
         """
         self.accounts = {}
         self.transactions = []
+        self.tree = AccountTree()
         self.dupes = DupeTracker(self.duplicate_window)
         self.num_adds = 0
+        self.sources = {}
+        self._spans = {}
+        self._index = None
+        self._columns = Columns()
+        self._stale_tags = False
+        self._tags = TagIndex()
+        self._retagged = []
+        self._notes = None
+        self._last_keys = {}
+        self._unsorted = set()
+        self._sorted = True
+        self._batches = []
+        self._resolved = {}
 
     def sort(self):
         """ Sort the ledger's transactions by date.
+
+        The sort is stable. Only lists that were appended to out of order
+        since the last sort are sorted, see date_key for the order.
         """
-        self.transactions.sort()
-        for key, val in self.accounts.items():
-            val.transactions.sort()
+        if not self._sorted and _sort(self.transactions, self._batches):
+            self._index = None
+            self._columns = None
+            self._tags = None
+            self._retagged = []
+            self._spans = {}
+
+        for name in self._unsorted:
+            if name in self.accounts:
+                _sort(self.accounts[name].transactions)
+
+        for name, account in self.accounts.items():
+            if account.transactions:
+                self._last_keys[name] = date_key(account.transactions[-1].date._date)
+        if self.transactions:
+            self._last_keys[None] = date_key(self.transactions[-1].date._date)
+
+        self._unsorted = set()
+        self._sorted = True
+        self._batches = []
 
     def dump(self, filter=lambda x: True):
         """ Dump contents of ledger as csv string.
@@ -99,19 +310,151 @@ class Ledger:
 
         Args:
             func: Function that returns True or False when provided
-                with a Transaction.
+                with a Transaction, a filter expression string, or a
+                Query. See compile_filter.
 
         Returns:
             List of internal transaction references.
+
+        Raises:
+            ValueError if the filter was an invalid expression.
+        """
+        if type(filter) is not Query:
+            filter = Query(filter)
+
+        return filter.run(self)
+
+    def index(self):
+        """ Index of this ledger's transactions for answering filters.
+
+        The index is built on first use and rebuilt after the ledger's
+        transactions change.
+
+        Returns:
+            An Index over self.transactions.
+        """
+        if self._index is None:
+            self._index = Index(self.transactions)
+
+        return self._index
+
+    def tags(self):
+        """ Index of this ledger's transactions by tag.
+
+        Unlike Ledger.index, the index is kept up to date as transactions
+        are committed, and only rebuilt after Ledger.sort reorders the
+        ledger.
+
+        eg. all transactions tagged 'tax-deductible' but not 'refund':
+
+            ts = ledger.transactions
+            found = [ts[i] for i in ledger.tags().select(['tax-deductible'], none=['refund'])]
+
+        Returns:
+            A TagIndex over self.transactions.
+        """
+        if self._tags is None:
+            self._tags = TagIndex.fromColumns(self.columns())
+            self._retagged = []
+        elif self._retagged:
+            retagged = {}
+            for t, tags in self._retagged:
+                retagged.setdefault(id(t), set()).update(tags)
+
+            for i, t in enumerate(self.transactions):
+                tags = retagged.pop(id(t), None)
+                if tags is not None:
+                    self._tags.addTags(i, tags)
+                    if not retagged:
+                        break
+
+            self._retagged = []
+
+        return self._tags
+
+    def notes(self):
+        """ Trigram index of this ledger's notes for substring searches.
+
+        The index is built on first use, from Ledger.columns. Transactions
+        committed after that are added to it, and it's rebuilt after
+        Ledger.sort reorders the ledger.
+
+        Returns:
+            A NotesIndex whose rows are positions in self.transactions.
+        """
+        columns = self.columns()
+        if self._notes is None or self._notes.columns is not columns:
+            self._notes = NotesIndex(columns)
+        else:
+            self._notes.update()
+
+        return self._notes
+
+    def columns(self, filter=None):
+        """ This ledger's transactions as columns.
+
+        The ledger keeps a row per transaction as they're committed, so
+        aggregations over columns don't have to visit every transaction.
+        See daybook.aggregate.
+
+        Args:
+            filter: See getTransactions. If given, the matching transactions
+                are copied into new columns instead.
+
+        Returns:
+            A Columns object with a row per transaction, in ledger order.
+            Unless filtered, it belongs to the ledger and must not be
+            modified.
+
+        Raises:
+            ValueError if the filter was invalid.
         """
-        if type(filter) is str:
-            return [t for t in self.transactions if eval(filter)]
-        elif callable(filter):
-            return [t for t in self.transactions if filter(t)]
+        if filter is not None:
+            return Columns.fromTransactions(self.getTransactions(filter))
+
+        if self._columns is None:
+            self._columns = Columns.fromTransactions(self.transactions)
+        elif self._stale_tags:
+            self._columns.updateTags(self.transactions)
+
+        self._stale_tags = False
+
+        return self._columns
+
+    def balancesAsOf(self, date):
+        """ Balances of every account at the end of a date.
+
+        eg. the month end balances of a year are 12 binary searches per
+        account, see Account.balanceAsOf.
+
+        Args:
+            date: See Account.balanceAsOf.
+
+        Returns:
+            A dict of account name => {currency: balance}, of accounts
+            with transactions by then.
+        """
+        # Ledgers from fromColumns fill in account transactions on demand.
+        self.transactions
+
+        ret = {}
+        for name, account in self.accounts.items():
+            balances = account.balanceAsOf(date)
+            if balances:
+                ret[name] = balances
+
+        return ret
 
     def filtered(self, filter=lambda x: True):
         """ Return a ledger consisting only of filtered transactions.
 
+        The sub-ledger is built directly from this ledger's transactions
+        rather than by dumping and re-parsing them. Each transaction is
+        copied onto the sub-ledger's own accounts, so balances are computed
+        from scratch and transaction order is preserved.
+
+        The sub-ledger starts with no duplicate history of its own.
+
         Args:
             func: Expression to be evaluated per each transaction.
 
@@ -119,7 +462,12 @@ class Ledger:
             A ledger loaded only with transactions that
         """
         subledger = Ledger(self.primary_currency)
-        subledger.load(self.dump(filter))
+
+        for t in self.getTransactions(filter):
+            src = subledger.addAccount(t.src)
+            dest = subledger.addAccount(t.dest)
+            subledger._commit(Transaction(t.date, src, dest, t.amount, t.tags, t.notes))
+
         return subledger
 
     def reportDupes(self, transactions):
@@ -176,12 +524,186 @@ class Ledger:
             ValueError and the CSV name and line number will indicate
             where the error ocurred.
         """
+        rows, source = self.parseCsv(csvfile, hints, skipinvals)
+        return self.commitCsv(csvfile, rows, source)
+
+    def parseCsv(self, csvfile, hints=None, skipinvals=False):
+        """ Parse a CSV without committing any of its transactions.
+
+        Parsing doesn't touch the ledger's state, so CSVs may be parsed in
+        any order, or in other processes, as long as they are committed
+        with commitCsv in the order they should be loaded.
+
+        Args:
+            csvfile: csv file to parse.
+
+        Returns:
+            The rows of the CSV as returned by parseRows, and the length
+            and sha256 of the CSV's content as a tuple.
+
+        Raises:
+            See loadCsv.
+        """
+        with open(csvfile, 'rb') as f:
+            data = f.read()
+
+        rows = self._parseCsvBytes(csvfile, data, hints, skipinvals)
+        return rows, (len(data), hashlib.sha256(data).hexdigest())
+
+    def commitCsv(self, csvfile, rows, source):
+        """ Commit rows parsed by parseCsv.
+
+        Args:
+            csvfile: csv file the rows were parsed from.
+            rows: Rows returned by parseCsv.
+            source: Length and sha256 returned by parseCsv.
+
+        Returns:
+            A list of internal references to the new transactions.
+        """
+        path = os.path.abspath(csvfile)
         thisname = os.path.splitext(os.path.basename(csvfile))[0]
-        with open(csvfile, 'r') as f:
-            try:
-                return self.load(f, thisname, hints, skipinvals)
-            except ValueError as ve:
-                raise ValueError('CSV {}: {}'.format(csvfile, ve))
+        start = len(self.transactions)
+        ret = self.commitRows(rows, thisname)
+
+        self.sources.pop(path, None)
+        self.sources[path] = source
+        self._spans.pop(path, None)
+        self._spans[path] = [start, len(self.transactions)]
+
+        return ret
+
+    def loadCsvTail(self, csvfile, hints=None, skipinvals=False):
+        """ Load only the rows appended to a CSV since it was last loaded.
+
+        The ledger ends up as if the CSVs were loaded from scratch in the
+        order they were first committed. If the CSV was the last one
+        committed, then the new rows are committed after every transaction
+        already in the ledger, and are checked for duplicates as usual.
+
+        Otherwise they're moved to the end of the CSV's transactions. That
+        is only possible if no transaction of a later CSV could be a
+        duplicate of them, since the later transactions would have been
+        checked against them instead, see DupeTracker.isolated.
+
+        Args:
+            csvfile: csv file that was previously loaded with loadCsv.
+
+        Returns:
+            A list of internal references to the new transactions, or None
+            if the CSV wasn't previously loaded, its previously loaded
+            content was modified rather than appended to, or its new rows
+            may be duplicates of other CSVs' transactions. The ledger should
+            then be loaded from scratch.
+
+        Raises:
+            See loadCsv.
+        """
+        path = os.path.abspath(csvfile)
+        if path not in self.sources or path not in self._spans:
+            return None
+
+        with open(csvfile, 'rb') as f:
+            data = f.read()
+
+        offset, digest = self.sources[path]
+        prefix = data[:offset]
+
+        if (not prefix.endswith(b'\n') or len(data) < offset
+                or hashlib.sha256(prefix).hexdigest() != digest):
+            return None
+
+        if len(data) == offset:
+            return []
+
+        header = data[:data.index(b'\n') + 1]
+        rows = self._parseCsvBytes(csvfile, header + data[offset:], hints, skipinvals)
+        source = len(data), hashlib.sha256(data).hexdigest()
+
+        position = self._spans[path][1]
+        if position < len(self.transactions):
+            for date, src, dest, amount, _, _ in rows:
+                if not self.dupes.isolated(Transaction(date, Account(src), Account(dest), amount)):
+                    return None
+
+        start = len(self.transactions)
+        thisname = os.path.splitext(os.path.basename(csvfile))[0]
+        ret = self.commitRows(rows, thisname)
+        self.sources[path] = source
+
+        # The rows continue the CSV's batch.
+        self._batches.pop()
+
+        if position == start:
+            self._spans[path][1] = len(self.transactions)
+        else:
+            self._moveTail(path, start)
+
+        return ret
+
+    def _moveTail(self, path, start):
+        """ Move the transactions committed from start on to the end of a
+        CSV's transactions. See loadCsvTail.
+        """
+        first, position = self._spans[path]
+
+        moved = self.transactions[start:]
+        count = len(moved)
+        if not count:
+            return
+
+        later = self.transactions[position:start]
+        self.transactions[position:] = moved + later
+
+        if self._columns is not None:
+            self._columns.move(start, position)
+
+        self._batches = ([x for x in self._batches if x < position] + [position] * (first == position) +
+                         [x + count for x in self._batches if x >= position])
+
+        sources = list(self.sources)
+        self._spans[path][1] += count
+        for x in sources[sources.index(path) + 1:]:
+            if x in self._spans:
+                self._spans[x] = [i + count for i in self._spans[x]]
+
+        # Account lists are in commit order too. Their new transactions go
+        # before their transactions from later CSVs.
+        later = {id(t) for t in later}
+        accounts = {}
+        for t in moved:
+            accounts.setdefault(t.src.name, (t.src, []))[1].append(t)
+            if t.dest is not t.src:
+                accounts.setdefault(t.dest.name, (t.dest, []))[1].append(t)
+
+        for name, (account, added) in accounts.items():
+            ts = account.transactions[:-len(added)]
+            i = len(ts)
+            while i and id(ts[i - 1]) in later:
+                i -= 1
+            account.transactions = ts[:i] + added + ts[i:]
+
+            t = account.transactions[-1]
+            account.last_currency = t.amount.dest_currency if account is t.dest else t.amount.src_currency
+            self._last_keys[name] = date_key(t.date._date)
+            self._unsorted.add(name)
+
+        self._last_keys[None] = date_key(self.transactions[-1].date._date)
+        self._sorted = False
+
+        self._index = None
+        self._tags = None
+        self._retagged = []
+        self._notes = None
+
+    def _parseCsvBytes(self, csvfile, data, hints, skipinvals):
+        """ Parse the raw content of a CSV. See parseCsv.
+        """
+        thisname = os.path.splitext(os.path.basename(csvfile))[0]
+        try:
+            return self.parseRows(io.TextIOWrapper(io.BytesIO(data)), thisname, hints, skipinvals)
+        except ValueError as ve:
+            raise ValueError('CSV {}: {}'.format(csvfile, ve))
 
     def load(self, lines, thisname='', hints=None, skipinvals=False):
         """ Loads transactions into this ledger from csv-lines.
@@ -203,13 +725,31 @@ class Ledger:
         Raises:
             ValueError: A row from the CSV was invalid.
         """
-        perspective = thisname
+        return self.commitRows(self.parseRows(lines, thisname, hints, skipinvals), thisname)
+
+    def parseRows(self, lines, thisname='', hints=None, skipinvals=False):
+        """ Parse csv-lines into plain row tuples.
+
+        Nothing is committed to the ledger. The rows are plain data and
+        can be pickled, so they may be parsed in another process.
+
+        Args:
+            See load.
+
+        Returns:
+            A list of (date, src, dest, amount, tags, notes) tuples. date
+            is a date or datetime, src and dest are full account names,
+            amount is an Amount and tags is a set.
+
+        Raises:
+            ValueError: A row from the CSV was invalid.
+        """
         thisname = thisname or 'void.void'
 
         if type(lines) is str:
             lines = io.StringIO(lines)
 
-        newtrans = []
+        rows = []
         reader = csv.DictReader(lines)
         if 'date' not in reader.fieldnames:
             raise ValueError('No "date" fieldname found.')
@@ -218,7 +758,7 @@ class Ledger:
         line_num = 2
         for row in reader:
             try:
-                date = SuperDate(row['date'])
+                date = parse_date(row['date'])
 
                 notes = ''
                 if 'notes' in row:
@@ -233,13 +773,13 @@ class Ledger:
 
                 # will raise ValueError if invalid.
                 if src_line is not None:
-                    src = self.suggestAccount(src_line, thisname, hints)
+                    src = self.resolveAccount(src_line, thisname, hints)
 
                 if dest_line is not None:
-                    dest = self.suggestAccount(dest_line, thisname, hints)
+                    dest = self.resolveAccount(dest_line, thisname, hints)
 
-                src = src or self.suggestAccount('this', thisname, hints)
-                dest = dest or self.suggestAccount('this', thisname, hints)
+                src = src or self.resolveAccount('this', thisname, hints)
+                dest = dest or self.resolveAccount('this', thisname, hints)
 
                 # determine what currencies to use and validate amount
                 suggestion = self.primary_currency
@@ -260,20 +800,40 @@ class Ledger:
                 if 'tags' in row and row['tags']:
                     tags = {x.strip() for x in row['tags'].split(':') if x.strip()}
 
-                # will raise ValueError if invalid.
-                t = Transaction(date, src, dest, amount, tags, notes)
-
             except ValueError as ve:
                 if skipinvals:
                     continue
 
                 raise ValueError('Line {}: {}'.format(line_num, ve))
 
-            newtrans.append(t)
+            rows.append((date._date, src, dest, amount, tags, notes))
             line_num = line_num + 1
 
-        # commit transactions to ledger. this code cannot raise.
-        return self.addTransactions(newtrans, perspective)
+        return rows
+
+    def commitRows(self, rows, perspective=''):
+        """ Commit rows returned by parseRows to the ledger.
+
+        This function cannot raise for rows returned by parseRows.
+
+        Args:
+            rows: Rows returned by parseRows.
+            perspective: See Ledger.addTransaction.
+
+        Returns:
+            A list containing internal references to the new transactions.
+        """
+        self.num_adds += 1
+        self._batches.append(len(self.transactions))
+
+        # The transactions are built on this ledger's own accounts, so
+        # unlike addTransactions they don't have to be copied again.
+        newtrans = []
+        for date, src, dest, amount, tags, notes in rows:
+            t = Transaction(date, self._account(src), self._account(dest), amount, tags, notes)
+            newtrans.append(self._add(t, perspective, self.num_adds))
+
+        return newtrans
 
     def addTransactions(self, transactions, perspective=''):
         """ Add list of transactions.
@@ -292,6 +852,7 @@ class Ledger:
             A list containing internal references to the new transactions.
         """
         self.num_adds += 1
+        self._batches.append(len(self.transactions))
         return [self.addTransaction(t, perspective, self.num_adds) for t in transactions]
 
     def addTransaction(self, t, perspective='', block=0):
@@ -336,17 +897,182 @@ class Ledger:
         dest = self.addAccount(t.dest)
         t = Transaction(t.date, src, dest, t.amount, t.tags, t.notes)
 
+        return self._add(t, perspective, block)
+
+    def _add(self, t, perspective, block):
+        """ Commit a transaction unless it's a duplicate.
+
+        t must already reference this ledger's accounts. See addTransaction.
+        """
         orig, t = self.dupes.checkDupe(t, perspective, block)
         if orig is not None:
+            self._index = None
+            self._stale_tags = True
+            new = {x for x in t.tags if x and x not in orig.tags}
+            if new and self._tags is not None:
+                self._retagged.append((orig, new))
             orig.addTags(t.tags)
         else:
-            self.transactions.append(t)
-            t.src.addTransaction(t)
-            if t.src is not t.dest:
-                t.dest.addTransaction(t)
+            self._commit(t)
 
         return t
 
+    def _commit(self, t):
+        """ Append a transaction and update its accounts' balances.
+
+        t must already reference this ledger's accounts.
+        """
+        self._index = None
+        self.transactions.append(t)
+        if self._tags is not None:
+            self._tags.append(t.tags)
+
+        key = date_key(t.date._date)
+        last = self._last_keys
+        if key < last.get(None, key):
+            self._sorted = False
+        last[None] = key
+        for name in (t.src.name, t.dest.name):
+            if key < last.get(name, key):
+                self._unsorted.add(name)
+            last[name] = key
+
+        # Otherwise they're rebuilt on demand.
+        if self._columns is not None:
+            self._columns.append(t.date._date, t.src.name, t.dest.name, t.amount, t.tags, t.notes)
+        t.src.addTransaction(t)
+        if t.src is not t.dest:
+            t.dest.addTransaction(t)
+
+    def removeTransaction(self, t):
+        """ Remove a transaction from the ledger.
+
+        Its amounts are subtracted from the balances of its accounts. If
+        other sources reported the same transaction, see addTransaction,
+        then the next of them to have been added is committed in its place.
+        If t is one of those duplicates instead, then only the tags it added
+        are removed from the committed transaction.
+
+        Accounts left with no transactions are removed.
+
+        Args:
+            t: A reference to a transaction within the ledger, as returned
+                by addTransaction or any of the load methods.
+
+        Raises:
+            KeyError if t isn't within the ledger. Transactions of ledgers
+            from fromColumns can't be removed.
+        """
+        if id(t) not in self.dupes.refs:
+            raise KeyError(t)
+
+        self._retract([t])
+
+    def retractSource(self, perspective):
+        """ Remove every transaction added with a perspective.
+
+        eg. to apply an edited CSV again without reloading the others:
+
+            ledger.retractSource('asset.checking')
+            ledger.loadCsv('asset.checking.csv', hints)
+
+        See removeTransaction. CSVs are loaded with the base name of the
+        file as their perspective, and they're forgotten too, see
+        loadCsvTail.
+
+        Args:
+            perspective: See addTransaction.
+
+        Returns:
+            A list of the removed references, in no particular order.
+        """
+        ts = list(self.dupes.perspectives.get(perspective, {}).values())
+        self._retract(ts)
+
+        for path in list(self.sources):
+            if os.path.splitext(os.path.basename(path))[0] == perspective:
+                del self.sources[path]
+
+        return ts
+
+    def _retract(self, ts):
+        """ Remove transactions within the duplicate tracker. See
+        removeTransaction.
+        """
+        groups = {}
+        for t in ts:
+            group, orig = self.dupes.remove(t)
+            groups.setdefault(id(group), (group, orig))
+
+        accounts = set()
+        dropped = []
+        for group, orig in groups.values():
+            if group.orig is not orig:
+                dropped.append(orig)
+                accounts.update((orig.src, orig.dest))
+
+        self._drop(dropped)
+
+        for group, orig in groups.values():
+            if group.orig is None:
+                continue
+            elif group.orig is not orig:
+                group.orig.tags = group.merged_tags()
+                self._commit(group.orig)
+            else:
+                tags = group.merged_tags()
+                if tags != orig.tags:
+                    orig.tags = tags
+                    self._index = None
+                    self._stale_tags = True
+                    self._tags = None
+                    self._retagged = []
+
+        for account in accounts:
+            if not account.transactions and self.accounts.get(account.name) is account:
+                del self.accounts[account.name]
+                self.tree.remove(account)
+                self._last_keys.pop(account.name, None)
+
+    def _drop(self, ts):
+        """ Remove committed transactions and reverse their balances.
+        """
+        if not ts:
+            return
+
+        ids = {id(t) for t in ts}
+        rows = [i for i, t in enumerate(self.transactions) if id(t) in ids]
+        self.transactions[:] = [t for t in self.transactions if id(t) not in ids]
+
+        accounts = {}
+        for t in ts:
+            accounts.setdefault(t.src.name, (t.src, []))[1].append(t)
+            if t.dest is not t.src:
+                accounts.setdefault(t.dest.name, (t.dest, []))[1].append(t)
+
+        for name, (account, removed) in accounts.items():
+            account.removeTransactions(removed)
+            if account.transactions:
+                self._last_keys[name] = date_key(account.transactions[-1].date._date)
+            else:
+                self._last_keys.pop(name, None)
+
+        if self.transactions:
+            self._last_keys[None] = date_key(self.transactions[-1].date._date)
+        else:
+            self._last_keys.pop(None, None)
+
+        self._batches = [x - bisect_left(rows, x) for x in self._batches]
+        self._spans = {}
+
+        if self._columns is not None:
+            self._columns.delete(rows)
+
+        self._index = None
+        self._tags = None
+        self._retagged = []
+        self._notes = None
+
     def suggestAccount(self, s, thisname='void.void', hints=None):
         """ Parse a string and create an account reference from it.
 
@@ -361,6 +1087,45 @@ class Ledger:
         Raises:
             ValueError: No valid account could be created from s.
         """
+        return Account(self.resolveAccount(s, thisname, hints))
+
+    def resolveAccount(self, s, thisname='void.void', hints=None):
+        """ Resolve a string to the name of the account it suggests.
+
+        Statements repeat the same payees over and over, so every result
+        is remembered, including strings with no valid suggestion. Results
+        are keyed by s, thisname and hints, and are forgotten if more
+        files are loaded into hints.
+
+        Args:
+            See suggestAccount.
+
+        Returns:
+            The full name of the suggested account.
+
+        Raises:
+            ValueError: No valid account could be created from s.
+        """
+        key = (s, thisname, hints, len(hints.files) if hints else 0)
+
+        try:
+            name, error = self._resolved[key]
+        except KeyError:
+            try:
+                name, error = self._suggestAccount(s, thisname, hints).name, None
+            except ValueError as ve:
+                name, error = None, str(ve)
+
+            self._resolved[key] = name, error
+
+        if error is not None:
+            raise ValueError(error)
+
+        return name
+
+    def _suggestAccount(self, s, thisname, hints):
+        """ Uncached suggestAccount.
+        """
         s = s.strip()
         s = thisname if s == 'this' else s
         s = 'void.void' if s == 'void' else s
@@ -397,7 +1162,14 @@ class Ledger:
         Returns:
             A reference to the account added/modified within this ledger.
         """
-        if account.name not in self.accounts:
-            self.accounts[account.name] = Account(account.name)
+        return self._account(account.name)
 
-        return self.accounts[account.name]
+    def _account(self, name):
+        """ Internal reference to the account named name, creating it if needed.
+        """
+        try:
+            return self.accounts[name]
+        except KeyError:
+            account = self.accounts[name] = Account(name)
+            self.tree.add(account)
+            return account
@@ -0,0 +1,113 @@
+""" NotesIndex class for substring searches of notes.
+"""
+
+from array import array
+
+
+def _grams(s):
+    """ Distinct trigrams of a str. """
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+class NotesIndex:
+    """ Trigram index over the notes of columns.
+
+    Ledgers share a few notes between many transactions, and columns
+    intern them, so the index is over distinct notes, see Columns.texts.
+    Every trigram of each note's casefolded text maps to the note, and
+    each note to the rows that use it.
+
+    A search only checks the notes that have every trigram of what it's
+    searching for, then returns their rows. Notes and rows appended to
+    the columns are indexed by update.
+
+    Building the trigrams takes much longer than checking every note once,
+    so they're only built for the second search. A ledger that's searched
+    once, eg. by a single --filter, costs about as much as a scan.
+    """
+
+    # Transforms of notes that search can narrow by casefolded trigrams.
+    transforms = {
+        None: lambda s: s,
+        'lower': str.lower,
+        'casefold': str.casefold,
+    }
+
+    def __init__(self, columns):
+        """ Index the notes of columns.
+
+        Args:
+            columns: Columns, eg. Ledger.columns().
+        """
+        self.columns = columns
+
+        # trigram => array of ids of notes that contain it, ascending.
+        # None until the second search.
+        self.grams = None
+
+        # Note id => array of rows with that note, ascending.
+        self.rows = []
+
+        # Number of rows indexed.
+        self.size = 0
+
+        self.searched = False
+
+    def update(self):
+        """ Index notes and rows appended to the columns since the last
+        update, if the index was built.
+        """
+        if self.grams is None:
+            return
+
+        texts = self.columns.texts
+        for i in range(len(self.rows), len(texts)):
+            self.rows.append(array('q'))
+            for gram in _grams(texts[i].casefold()):
+                try:
+                    self.grams[gram].append(i)
+                except KeyError:
+                    self.grams[gram] = array('i', [i])
+
+        notes = self.columns.notes
+        for row in range(self.size, len(notes)):
+            self.rows[notes[row]].append(row)
+
+        self.size = len(notes)
+
+    def search(self, s, transform=None):
+        """ Rows whose notes contain a substring.
+
+        Args:
+            s: Substring to search for.
+            transform: Name of a key of NotesIndex.transforms, which is
+                applied to each note before searching it for s, eg. 'lower'
+                to search notes.lower().
+
+        Returns:
+            A set of the rows where s in transform(notes).
+        """
+        transform = self.transforms[transform]
+        texts = self.columns.texts
+
+        if self.grams is None:
+            if not self.searched:
+                self.searched = True
+                ids = {i for i, x in enumerate(texts) if s in transform(x)}
+                return {row for row, i in enumerate(self.columns.notes) if i in ids}
+
+            self.grams = {}
+            self.update()
+
+        grams = [self.grams.get(x, ()) for x in _grams(s.casefold())]
+        if not grams:
+            ids = range(len(self.rows))
+        else:
+            grams.sort(key=len)
+            ids = set(grams[0])
+            for x in grams[1:]:
+                if not ids:
+                    break
+                ids.intersection_update(x)
+
+        return {row for i in ids if s in transform(texts[i]) for row in self.rows[i]}
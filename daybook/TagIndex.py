@@ -0,0 +1,131 @@
+""" TagIndex class for looking up transactions by tag.
+"""
+
+from array import array
+from bisect import insort
+
+
+class TagIndex:
+    """ Inverted index of tags to the positions of the transactions tagged
+    with them.
+
+    Unlike Index, a tag index is kept up to date as a ledger commits
+    transactions and merges the tags of duplicates, see Ledger.tags. It is
+    only rebuilt after the ledger is reordered.
+    """
+
+    def __init__(self):
+        # Number of transactions indexed.
+        self.size = 0
+
+        # tag => array of positions, ascending.
+        self.positions = {}
+
+    @classmethod
+    def fromColumns(cls, columns):
+        """ Index the tags column of columns.
+
+        Args:
+            columns: Columns, eg. Ledger.columns(). Their tags must be
+                current.
+
+        Returns:
+            A new TagIndex over the rows of columns.
+        """
+        ret = cls()
+        ret.size = len(columns)
+
+        # Rows share a few distinct sets of tags, so group by set first.
+        rows = {}
+        for i, x in enumerate(columns.tags):
+            try:
+                rows[x].append(i)
+            except KeyError:
+                rows[x] = array('q', [i])
+
+        tagsets = columns.tagsets
+        for x, ps in rows.items():
+            for tag in tagsets[x]:
+                if tag in ret.positions:
+                    ret.positions[tag].extend(ps)
+                else:
+                    ret.positions[tag] = array('q', ps)
+
+        for tag, ps in ret.positions.items():
+            ret.positions[tag] = array('q', sorted(ps))
+
+        return ret
+
+    def append(self, tags):
+        """ Index the tags of the next transaction.
+
+        Args:
+            tags: Iterable of tags.
+        """
+        for tag in tags:
+            try:
+                self.positions[tag].append(self.size)
+            except KeyError:
+                self.positions[tag] = array('q', [self.size])
+
+        self.size += 1
+
+    def addTags(self, i, tags):
+        """ Index tags added to an indexed transaction.
+
+        Args:
+            i: Position of the transaction.
+            tags: Iterable of tags the transaction didn't have yet.
+        """
+        for tag in tags:
+            if tag in self.positions:
+                insort(self.positions[tag], i)
+            else:
+                self.positions[tag] = array('q', [i])
+
+    def tagged(self, tag):
+        """ Positions of transactions tagged with tag.
+
+        Returns:
+            A set of positions.
+        """
+        return set(self.positions.get(tag, ()))
+
+    def untagged(self, tag):
+        """ Positions of transactions not tagged with tag.
+
+        Returns:
+            A set of positions.
+        """
+        return set(range(self.size)).difference(self.positions.get(tag, ()))
+
+    def select(self, all=(), any=(), none=()):
+        """ Positions of transactions by a combination of tags.
+
+        eg. ledger.tags().select(all=['tax-deductible'], none=['refund'])
+
+        Args:
+            all: Tags that every transaction must have.
+            any: Tags of which every transaction must have at least one,
+                unless empty.
+            none: Tags that no transaction may have.
+
+        Returns:
+            A sorted list of positions.
+        """
+        ret = None
+        for tag in all:
+            ps = self.positions.get(tag, ())
+            ret = set(ps) if ret is None else ret.intersection(ps)
+
+        if any:
+            ps = set().union(*[self.positions.get(tag, ()) for tag in any])
+            ret = ps if ret is None else ret & ps
+
+        if ret is None:
+            ret = set(range(self.size))
+
+        for tag in none:
+            ret.difference_update(self.positions.get(tag, ()))
+
+        return sorted(ret)
@@ -2,16 +2,25 @@
 """
 
 import copy
+import copyreg
 from datetime import datetime
 
 from superdate import SuperDate
 
 from daybook.Account import Account
 from daybook.Amount import Amount
+from daybook.util.dates import parse_date
+
+
+# SuperDate can't be pickled on its own, so reduce it to its plain date.
+copyreg.pickle(SuperDate, lambda d: (SuperDate, (d._date,)))
 
 
 class Transaction:
 
+    # Ledgers hold many transactions, so they have no __dict__.
+    __slots__ = ('date', 'src', 'dest', 'amount', 'tags', 'notes', '_hash')
+
     def __init__(self, date, src, dest, amount, tags=None, notes=''):
 
         if type(src) is not Account or type(dest) is not Account:
@@ -20,24 +29,32 @@ class Transaction:
         if type(amount) is not Amount:
             raise ValueError('amount must be of type Amount')
 
-        self.date = SuperDate(date)
+        self.date = parse_date(date)
         self.src = src
         self.dest = dest
         self.amount = copy.copy(amount)
         self.tags = set(tags) if tags else set()
         self.notes = notes
 
-        # Makes filtering in ledger easier
-        # eg. 'expense' in t.accounts way better than any(['expense' in x for x in ...
-        self.accounts = f'{src.name} {dest.name}'
-        self.quantity = max(abs(self.amount.src_amount), abs(self.amount.dest_amount))
+    def __getstate__(self):
+        """ Pickle without the cached hash, since str hashes vary between
+        processes.
+        """
+        return None, {k: getattr(self, k) for k in self.__slots__ if k != '_hash'}
 
-        # this key information shouln't ever be modified.
-        self._hash = hash('{}{}{}{}'.format(
-            self.date,
-            self.src.name,
-            self.dest.name,
-            self.amount))
+    @property
+    def accounts(self):
+        """ Names of both accounts.
+
+        Makes filtering in ledger easier
+        eg. 'expense' in t.accounts way better than any(['expense' in x for x in ...
+        """
+        return f'{self.src.name} {self.dest.name}'
+
+    @property
+    def quantity(self):
+        """ Higher absolute value of currency exchanged. """
+        return max(abs(self.amount.src_amount), abs(self.amount.dest_amount))
 
     def __str__(self):
         """ Return transaction as a complete csv row.
@@ -47,14 +64,22 @@ class Transaction:
             self.src.name,
             self.dest.name,
             self.amount,
-            ':'.join(self.tags),
+            ':'.join(sorted(self.tags)),
             self.notes)
 
     def __lt__(self, other):
         return self.date < other.date
 
     def __hash__(self):
-        return self._hash
+        # this key information shouln't ever be modified.
+        try:
+            return self._hash
+        except AttributeError:
+            a = self.amount
+            self._hash = hash((
+                self.date._date, self.src.name, self.dest.name,
+                a.src_currency, a.src_units, a.dest_currency, a.dest_units, a.scale))
+            return self._hash
 
     def __eq__(self, other):
         return (
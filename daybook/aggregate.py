@@ -0,0 +1,201 @@
+""" Sum amounts over columns of transactions.
+
+Sums are grouped by account or account type, by currency and optionally
+by period. If numpy is installed then each sum is a single vectorized
+pass over the columns as 64 bit integers, otherwise the rows are summed
+in Python.
+
+Amounts are exact integer units (see Amount), so sums are exact too.
+For a ledger's own columns, the sum for an account is equal to its
+balance, not merely close to it.
+"""
+
+from datetime import date
+
+from daybook.Amount import _pow10, add_units, from_units
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+periods = ['day', 'month', 'year']
+
+
+def _period_start(ordinal, period):
+    """ First day of the period containing the day ordinal.
+    """
+    d = date.fromordinal(ordinal)
+    if period == 'month':
+        return d.replace(day=1)
+    elif period == 'year':
+        return d.replace(month=1, day=1)
+
+    return d
+
+
+def _groups(columns, by):
+    """ Group id of each account id, and the name of each group.
+    """
+    if by == 'account':
+        return list(range(len(columns.accounts))), columns.accounts
+    elif by == 'type':
+        ids = {}
+        groups = [ids.setdefault(x.split('.')[0], len(ids)) for x in columns.accounts]
+        names = sorted(ids, key=ids.get)
+        return groups, names
+
+    raise ValueError('Can\'t group by "{}". Expected "account" or "type".'.format(by))
+
+
+def _sum(columns, by, period):
+    """ Sum amounts by (period, group, currency).
+
+    Returns:
+        A dict of (period index, group name, currency) => (units, scale)
+        in order of first use, the period start dates by period index.
+    """
+    if period is not None and period not in periods:
+        raise ValueError('Invalid period "{}". Expected one of {}.'.format(period, periods))
+
+    groups, names = _groups(columns, by)
+    currencies = columns.currencies
+    ncurr = max(len(currencies), 1)
+    ngroups = max(len(names), 1)
+
+    if np is not None:
+        ret = _sum_numpy(columns, period, groups, names, ngroups, ncurr)
+        if ret is not None:
+            return ret
+
+    starts = {}
+    pids = {}
+    totals = {}
+    for i in range(len(columns)):
+        p = 0
+        if period is not None:
+            day = columns.day[i]
+            if day not in pids:
+                start = _period_start(day, period)
+                pids[day] = starts.setdefault(start, len(starts))
+            p = pids[day]
+
+        scale = columns.scale[i]
+        for g, c, units in [
+                (groups[columns.src[i]], columns.src_currency[i], columns.src_units[i]),
+                (groups[columns.dest[i]], columns.dest_currency[i], columns.dest_units[i])]:
+            key = (p, names[g], currencies[c])
+            totals[key] = add_units(totals.get(key, (0, scale)), units, scale)
+
+    return totals, sorted(starts, key=starts.get) if period is not None else [None]
+
+
+def _sum_numpy(columns, period, groups, names, ngroups, ncurr):
+    """ See _sum. Returns None if the sums could overflow 64 bits.
+    """
+    n = len(columns)
+    groups = np.array(groups, dtype=np.int64)
+
+    pids = np.zeros(n, dtype=np.int64)
+    starts = [None]
+    if period is not None:
+        days, inverse = np.unique(np.frombuffer(columns.day, dtype=np.intc), return_inverse=True)
+        ids = {}
+        day_pids = np.array([ids.setdefault(_period_start(int(x), period), len(ids)) for x in days], dtype=np.int64)
+        pids = day_pids[inverse.reshape(-1)]
+        starts = sorted(ids, key=ids.get)
+
+    # Interleave src and dest so totals are ordered like the currencies
+    # of account balances.
+    keys = np.empty(2 * n, dtype=np.int64)
+    units = np.empty(2 * n, dtype=np.int64)
+    for side, (accounts, currs, amounts) in enumerate([
+            (columns.src, columns.src_currency, columns.src_units),
+            (columns.dest, columns.dest_currency, columns.dest_units)]):
+        accounts = np.frombuffer(accounts, dtype=np.intc)
+        currs = np.frombuffer(currs, dtype=np.intc)
+        keys[side::2] = (pids * ngroups + groups[accounts]) * ncurr + currs
+        units[side::2] = np.frombuffer(amounts, dtype=np.int64)
+    scales = np.repeat(np.frombuffer(columns.scale, dtype=np.int8).astype(np.int64), 2)
+
+    uniq, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    # Units of each key are summed at the key's largest scale.
+    key_scales = np.zeros(len(uniq), dtype=np.int64)
+    np.maximum.at(key_scales, inverse, scales)
+    factors = np.array(_pow10, dtype=np.int64)[key_scales[inverse] - scales]
+
+    if (np.abs(units).astype(np.float64) * factors).sum() >= 2.0 ** 62:
+        return None
+
+    sums = np.zeros(len(uniq), dtype=np.int64)
+    np.add.at(sums, inverse, units * factors)
+
+    # In order of first use, like the currencies of account balances.
+    order = np.argsort(first, kind='stable')
+
+    currencies = columns.currencies
+    totals = {}
+    for key, total, scale in zip(uniq[order].tolist(), sums[order].tolist(), key_scales[order].tolist()):
+        rest, c = divmod(key, ncurr)
+        p, g = divmod(rest, ngroups)
+        totals[(p, names[g], currencies[c])] = total, scale
+
+    return totals, starts
+
+
+def balances(columns, by='account', exact=False):
+    """ Sum amounts per account or account type, and currency.
+
+    eg.
+
+        totals = balances(ledger.columns())
+        totals['asset.checking']['usd']
+
+    Args:
+        columns: Columns to sum, eg. Ledger.columns().
+        by: 'account' to group by full account name, or 'type' to group
+            by account type.
+        exact: Return totals as (units, scale) pairs rather than floats.
+            See Amount.to_units.
+
+    Returns:
+        A dict of name => {currency: total}. Only currencies that were
+        used by a name are included.
+
+    Raises:
+        ValueError if by is invalid.
+    """
+    totals, _ = _sum(columns, by, None)
+
+    ret = {}
+    for (_, name, currency), total in totals.items():
+        ret.setdefault(name, {})[currency] = total if exact else from_units(*total)
+
+    return ret
+
+
+def period_balances(columns, period='month', by='account'):
+    """ Sum amounts per period, account or account type, and currency.
+
+    Args:
+        columns: Columns to sum, eg. Ledger.columns().
+        period: 'day', 'month' or 'year'.
+        by: See balances.
+
+    Returns:
+        A dict of the first day of each period => the sums of that period
+        as returned by balances. Periods without transactions are omitted.
+
+    Raises:
+        ValueError if period or by is invalid.
+    """
+    totals, starts = _sum(columns, by, period)
+
+    ret = {}
+    for (p, name, currency), total in totals.items():
+        ret.setdefault(starts[p], {}).setdefault(name, {})[currency] = from_units(*total)
+
+    return dict(sorted(ret.items()))
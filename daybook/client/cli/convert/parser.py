@@ -2,12 +2,21 @@ import os
 from argparse import RawDescriptionHelpFormatter
 from pathlib import Path
 
-from daybook.client.cli.convert.main import convert_filter
-from daybook.util.importer import import_modules
+from daybook.config import user_cachedir
+from daybook.util.manifest import load_manifest
 
 
 presets_base = f'{Path.home()}/.local/usr/share/daybook/presets'
 default_presets = f'{presets_base}/convert'
+manifest_cache = f'{user_cachedir}/converters.json'
+
+
+def _convert_filter(module):
+    """ See convert_filter. Imported here, since the converter's main
+    module imports everything a conversion needs.
+    """
+    from daybook.client.cli.convert.main import convert_filter
+    convert_filter(module)
 
 
 def add_converter_subparsers(subparsers):
@@ -17,12 +26,11 @@ def add_converter_subparsers(subparsers):
 
     paths = os.environ['DAYBOOK_CONVERTERS'].split(':')
 
-    keys = ['help', 'description']
-    converters = import_modules(paths, convert_filter, keys)
-    converters = {k: converters[k] for k in sorted(converters)}
+    converters = load_manifest(
+        paths, ['help', 'description', 'headings'], ['convert_row'], _convert_filter, manifest_cache)
 
-    for name, tupe in converters.items():
-        help, description = tupe
+    for name, (_, members) in converters.items():
+        help, description = members['help'], members['description']
         description = '\n'.join([help, '', description])
         sp = subparsers.add_parser(
             name, help=help, description=description,
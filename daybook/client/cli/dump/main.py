@@ -1,17 +1,33 @@
 """ Entry point for the "dump" subcommand.
 """
 
+import os
 import sys
 
+from daybook import ledgerfile
 from daybook.client.load import load_from_args
+from daybook.client.server import ask
 
 
 def main(args):
     """ Print transactions as a raw csv string to stdout.
+
+    Or write them to a ledger file if --ledger-file was given. The
+    transactions come from a server if one is running.
     """
     try:
+        ledger_file = os.path.abspath(args.ledger_file) if args.ledger_file else None
+        response = ask(args, 'dump', ledger_file=ledger_file)
+        if response is not None:
+            if not ledger_file:
+                print(response['output'])
+            return
+
         ledger = load_from_args(args)
-        print(ledger.dump())
-    except (FileNotFoundError, ValueError) as e:
+        if args.ledger_file:
+            ledgerfile.save(args.ledger_file, ledger)
+        else:
+            print(ledger.dump())
+    except (OSError, ValueError) as e:
         print(e)
         sys.exit(1)
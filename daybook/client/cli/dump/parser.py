@@ -1,4 +1,4 @@
-from daybook.client.parsergroups import create_csv_opts, create_filter_opts
+from daybook.client.parsergroups import create_csv_opts, create_filter_opts, create_server_opts
 
 
 def add_subparser(subparsers):
@@ -10,10 +10,15 @@ def add_subparser(subparsers):
     """
     csv_opts = create_csv_opts()
     filter_opts = create_filter_opts()
+    server_opts = create_server_opts()
 
     sp = subparsers.add_parser(
         'dump',
         help='Dump transactions to stdout as a raw csv.',
-        description='If any CSVs are specified, then this command will '
-                    'use those transactions instead of daybookd.',
-        parents=[csv_opts, filter_opts])
+        description='If a server started by "daybook serve" is running, then '
+                    'this command will use its ledger. Otherwise the CSVs '
+                    'are loaded locally.',
+        parents=[csv_opts, filter_opts, server_opts])
+    sp.add_argument(
+        '--ledger-file', metavar='FILE',
+        help='Write transactions to FILE as a binary ledger file instead.')
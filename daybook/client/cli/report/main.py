@@ -1,11 +1,13 @@
 """ Entry point for the "report" subcommand.
 """
+import inspect
 import os
 import sys
 from pathlib import Path
 
 from daybook.Budget import load_budgets
 from daybook.client.load import load_from_args
+from daybook.client.server import ask
 from daybook.util.importer import find_module
 
 
@@ -39,6 +41,18 @@ def main(args):
         print(e)
         sys.exit(1)
 
+    # Ask a server for the report, if one is running.
+    try:
+        budgets = [os.path.abspath(x) for x in args.budgets] if args.budgets else None
+        response = ask(args, 'report', reporter=os.path.abspath(inspect.getfile(report_fun)), budgets=budgets)
+    except (ConnectionRefusedError, ValueError) as e:
+        print(e)
+        sys.exit(1)
+
+    if response is not None:
+        print(response['output'])
+        return
+
     # Else load transactions and print report.
     try:
         ledger = load_from_args(args)
@@ -2,13 +2,22 @@ import os
 from argparse import RawDescriptionHelpFormatter
 from pathlib import Path
 
-from daybook.client.parsergroups import create_csv_opts, create_filter_opts
-from daybook.client.cli.report.main import report_filter
-from daybook.util.importer import import_modules
+from daybook.client.parsergroups import create_csv_opts, create_filter_opts, create_server_opts
+from daybook.config import user_cachedir
+from daybook.util.manifest import load_manifest
 
 
 presets_base = f'{Path.home()}/.local/usr/share/daybook/presets'
 default_presets = f'{presets_base}/report'
+manifest_cache = f'{user_cachedir}/reporters.json'
+
+
+def _report_filter(module):
+    """ See report_filter. Imported here, since the reporter's main
+    module imports everything a report needs.
+    """
+    from daybook.client.cli.report.main import report_filter
+    report_filter(module)
 
 
 def add_reporter_subparsers(subparsers, parents):
@@ -18,12 +27,11 @@ def add_reporter_subparsers(subparsers, parents):
 
     paths = os.environ['DAYBOOK_REPORTERS'].split(':')
 
-    keys = ['help', 'description']
-    reporters = import_modules(paths, report_filter, keys)
-    reporters = {k: reporters[k] for k in sorted(reporters)}
+    reporters = load_manifest(
+        paths, ['help', 'description'], ['report'], _report_filter, manifest_cache)
 
-    for name, tupe in reporters.items():
-        help, description = tupe
+    for name, (_, members) in reporters.items():
+        help, description = members['help'], members['description']
         description = '\n'.join([help, '', description])
         sp = subparsers.add_parser(
             name, help=help, description=description,
@@ -35,6 +43,7 @@ def add_reporter_subparsers(subparsers, parents):
 def add_subparser(subparsers):
     csv_opts = create_csv_opts()
     filter_opts = create_filter_opts()
+    server_opts = create_server_opts()
 
     desc = f"""
     The report subcommand generates reports by calling a reporter module.
@@ -57,4 +66,4 @@ def add_subparser(subparsers):
         dest='reporter',
         description='Available reporters. Each has its own [-h, --help] statement.')
 
-    add_reporter_subparsers(reporters, [csv_opts, filter_opts])
+    add_reporter_subparsers(reporters, [csv_opts, filter_opts, server_opts])
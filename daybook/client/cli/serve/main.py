@@ -0,0 +1,16 @@
+""" Entry point for the "serve" subcommand.
+"""
+
+import sys
+
+from daybook.client.server import serve
+
+
+def main(args):
+    """ Load a ledger and answer dumps and reports from it until interrupted.
+    """
+    try:
+        serve(args)
+    except (OSError, ValueError) as e:
+        print(e)
+        sys.exit(1)
@@ -0,0 +1,18 @@
+from daybook.client.parsergroups import create_csv_opts, create_server_opts
+
+
+def add_subparser(subparsers):
+    """ Create parser for the serve subcommand.
+    """
+    csv_opts = create_csv_opts()
+    server_opts = create_server_opts()
+
+    sp = subparsers.add_parser(
+        'serve',
+        help='Keep a ledger loaded for other commands.',
+        description='Load CSVs once, and answer dump and report commands '
+                    'from the ledger until interrupted.',
+        parents=[csv_opts, server_opts])
+    sp.add_argument(
+        '--poll', metavar='SECONDS', type=float, default=2,
+        help='Check for changed CSVs and hints files every SECONDS, or never if 0. Defaults to 2.')
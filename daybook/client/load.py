@@ -2,9 +2,15 @@
 """
 
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
+from daybook import ledgerfile
+from daybook.Filter import Query
 from daybook.Hints import Hints
 from daybook.Ledger import Ledger
+from daybook.client import snapshot
+from daybook.config import user_cachedir
 
 
 def readdir_(d):
@@ -70,7 +76,14 @@ def group_csvs(root, hints=None):
     return ret
 
 
-def load_from_local(csvs, primary_currency, duplicate_window, hints=None):
+def _parse_csv(task):
+    """ Parse a single CSV in a worker process. See load_from_local.
+    """
+    csv, primary_currency, hints = task
+    return Ledger(primary_currency).parseCsv(csv, hints)
+
+
+def load_from_local(csvs, primary_currency, duplicate_window, hints=None, cachedir=None, jobs=1):
     """ Create a ledger from local csvs.
 
     The "CSVs" can be dirs or individual CSVs. Each will be paired with
@@ -85,6 +98,12 @@ def load_from_local(csvs, primary_currency, duplicate_window, hints=None):
         hints: If provided, then use this singular hints file for each
             CSV, rather than the hints file which otherwise have been
             paired with the CSV.
+        cachedir: If provided, then reuse the ledger snapshot in this
+            directory if none of the CSVs or hints files changed, or if
+            rows were only appended to CSVs. Save a new snapshot otherwise.
+        jobs: Number of processes used to parse CSVs. The parsed rows
+            are still committed in the original order, so the ledger is
+            identical to one loaded by a single process.
 
     Returns:
         A ledger loaded from local CSVs.
@@ -102,42 +121,110 @@ def load_from_local(csvs, primary_currency, duplicate_window, hints=None):
     if not levels:
         raise ValueError('No CSVs found in specified locations.')
 
+    if cachedir:
+        path = snapshot.snapshot_path(cachedir, levels, primary_currency, duplicate_window, hints)
+        prints = snapshot.fingerprints(levels, hints)
+        old, ledger = snapshot.load_snapshot(path)
+
+        if ledger is not None and old != prints:
+            ledger = snapshot.update_snapshot(ledger, levels, old, prints, hints)
+            if ledger is not None:
+                snapshot.save_snapshot(path, prints, ledger)
+
+        if ledger is not None:
+            return ledger
+
     ledger = Ledger(primary_currency, duplicate_window)
-    for level in levels:
-        ledger.loadCsvs(level['csvs'], hints or level['hints'])
+    tasks = [(csv, primary_currency, hints or level['hints']) for level in levels for csv in level['csvs']]
+
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(jobs) as pool:
+            parsed = pool.map(_parse_csv, tasks, chunksize=max(1, len(tasks) // (jobs * 4)))
+            for (csv, _, _), (rows, source) in zip(tasks, parsed):
+                ledger.commitCsv(csv, rows, source)
+    else:
+        for level in levels:
+            ledger.loadCsvs(level['csvs'], hints or level['hints'])
+
+    if cachedir:
+        snapshot.save_snapshot(path, prints, ledger)
 
     return ledger
 
 
-def load_from_args(args):
-    """ Choose from where to load based on args.
+def load_ledger(args):
+    """ Load the whole ledger args point to.
 
-    Currently just loads from CSVs but if we add a server or support for
-    stdin then maybe we want to load from there.
+    Loads from CSVs, or from a single ledger file in their place. See
+    daybook.ledgerfile.
 
     Args:
         args: daybook args namespace
 
     Returns:
-        A filtered Ledger.
+        An unfiltered Ledger.
 
     Raises:
         FileNotFoundError: Any of the CSVs did not exist.
         ValueError: Any of the CSVs contained an invalid entry or args didn't
             contain enough information.
     """
-    ledger = None
+    if args.csvs and any(ledgerfile.is_ledgerfile(x) for x in args.csvs):
+        if len(args.csvs) > 1:
+            raise ValueError('A ledger file can\'t be loaded along with other CSVs.')
 
-    hints = Hints(args.hints) if args.hints else None
+        return ledgerfile.load(args.csvs[0], args.primary_currency)
 
-    if args.csvs:
-        ledger = load_from_local(
+    elif args.csvs:
+        return load_from_local(
             args.csvs,
             args.primary_currency,
             args.duplicate_window,
-            hints).filtered(args.filter)
+            Hints(args.hints) if args.hints else None,
+            None if args.no_cache else user_cachedir,
+            args.jobs)
 
-    else:
-        raise ValueError('No CSVs specified.')
+    raise ValueError('No CSVs specified.')
+
+
+def filter_ledger(ledger, query):
+    """ Filter a ledger, unless nothing would be filtered out.
+
+    Creating the transactions of a ledger file is most of the cost of
+    loading it, and copying a whole ledger is wasted work, so the ledger
+    itself is returned if the query matches every transaction.
+
+    Args:
+        ledger: Ledger to filter.
+        query: Query to filter by.
+
+    Returns:
+        ledger, or a filtered copy of it.
+    """
+    if query.matchesAll():
+        return ledger
+
+    return ledger.filtered(query)
+
+
+def load_from_args(args):
+    """ Choose from where to load based on args.
+
+    See load_ledger.
+
+    Args:
+        args: daybook args namespace
+
+    Returns:
+        A filtered Ledger.
+
+    Raises:
+        See load_ledger.
+    """
+    query = Query(args.filter)
+    ledger = filter_ledger(load_ledger(args), query)
+
+    if args.explain:
+        print(query.explain(), file=sys.stderr)
 
     return ledger
@@ -3,7 +3,7 @@
 
 import argparse
 
-from daybook.Ledger import Account
+from daybook.Account import Account
 
 
 def create_csv_opts():
@@ -20,6 +20,12 @@ def create_csv_opts():
         help='Day range in which duplicate transactions will be flagged.')
     group.add_argument(
         '--hints', help='Override default loaded hints file for each CSV.')
+    group.add_argument(
+        '--no-cache', action='store_true',
+        help='Parse every CSV instead of reusing the cached ledger snapshot.')
+    group.add_argument(
+        '-j', '--jobs', metavar='N', type=int, default=1,
+        help='Parse CSVs in N processes.')
 
     return parser
 
@@ -34,9 +40,28 @@ def create_filter_opts():
         metavar='FILTER',
         default='True',
         help='Eval transactions against a python3 conditional.'),
+    group.add_argument(
+        '--explain', action='store_true',
+        help='Print which indexes answered the filter to stderr.')
+
+    return parser
+
+
+def create_server_opts():
+    parser = argparse.ArgumentParser(add_help=False)
+    group = parser.add_argument_group(
+        'server options',
+        'Options for using a ledger served by "daybook serve".')
+    group.add_argument(
+        '--socket', metavar='PATH',
+        help='Unix socket of the server. Defaults to ~/.cache/daybook/daybook.sock.')
+    group.add_argument(
+        '--no-server', action='store_true',
+        help='Load CSVs locally even if a server is running.')
 
     return parser
 
 
 csv_opts = create_csv_opts()
 filter_opts = create_filter_opts()
+server_opts = create_server_opts()
@@ -0,0 +1,380 @@
+""" Resident ledger server, and the client side of it.
+
+``daybook serve`` loads a ledger once and keeps it in memory. Other
+daybook commands ask it for dumps and reports over a Unix domain socket,
+instead of each loading the ledger themselves.
+
+A request and its response are each a single line of JSON. The request
+holds the command, the load parameters of the client (see load_params),
+its filter and the command's arguments. The response holds the
+command's output, or an error.
+"""
+
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from daybook import ledgerfile
+from daybook.Budget import load_budgets
+from daybook.Filter import Query
+from daybook.Hints import Hints
+from daybook.client.load import filter_ledger, group_csvs, load_ledger
+from daybook.client.watch import Watcher
+from daybook.config import user_socket
+from daybook.util.importer import import_module
+
+
+def load_params(args):
+    """ Parameters that decide which ledger args load.
+
+    Args:
+        args: daybook args namespace
+
+    Returns:
+        A dict that can be sent as JSON. csvs and hints are absolute
+        paths, or None if not given.
+    """
+    return {
+        'csvs': [os.path.abspath(x) for x in args.csvs] if args.csvs else None,
+        'hints': os.path.abspath(args.hints) if args.hints else None,
+        'primary_currency': args.primary_currency,
+        'duplicate_window': args.duplicate_window,
+    }
+
+
+def _log(msg):
+    print(msg)
+    sys.stdout.flush()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        try:
+            response = self.server.answer(json.loads(self.rfile.readline()))
+        except Exception as e:
+            # A bad request or a broken reporter mustn't stop the server.
+            response = {'error': str(e) or type(e).__name__}
+
+        self.wfile.write(json.dumps(response).encode() + b'\n')
+
+
+class LedgerServer(socketserver.UnixStreamServer):
+    """ Answers requests from a ledger held in memory.
+
+    Requests are answered one at a time, in the order they arrive. Between
+    requests, the server polls the files the ledger was loaded from, and
+    reloads it if any changed, see reload.
+    """
+
+    def __init__(self, path, ledger, args):
+        """ Bind a server to a socket.
+
+        Args:
+            path: Path of the socket to create.
+            ledger: Ledger to answer from.
+            args: daybook args namespace the ledger was loaded with.
+                args.poll is the number of seconds between polls, or 0 to
+                never reload.
+        """
+        self.ledger = ledger
+        self.args = args
+        self.params = load_params(args)
+
+        self.watcher = Watcher(args.csvs, args.hints) if args.poll else None
+        self._polled = time.monotonic()
+
+        # Thread loading the ledger from scratch, and its result.
+        self._loader = None
+        self._loaded = None
+
+        # Files changed while the loader ran.
+        self._changed = {}
+
+        super().__init__(path, _Handler)
+
+    def service_actions(self):
+        """ Poll for changes, and swap in a reloaded ledger once it's ready.
+        """
+        if self._loader is not None and not self._loader.is_alive():
+            self._loader = None
+            if isinstance(self._loaded, Exception):
+                _log('Reload failed, still serving the previous ledger: {}'.format(self._loaded))
+            else:
+                self.ledger = self._loaded
+                _log('Reloaded {} transactions.'.format(len(self.ledger.transactions)))
+            self._loaded = None
+
+        if self.watcher is None or time.monotonic() - self._polled < self.args.poll:
+            return
+
+        self._polled = time.monotonic()
+        self._changed.update(self.watcher.poll())
+        if self._changed and self._loader is None:
+            changed, self._changed = self._changed, {}
+            self.reload(changed)
+
+    def reload(self, changed):
+        """ Bring the ledger up to date with changed files.
+
+        Changed CSVs are applied to the ledger in place, between requests.
+        Rows appended to a CSV are added, and otherwise the transactions
+        loaded from it are retracted and it's loaded again, see
+        Ledger.retractSource. Duplicates it shares with other CSVs may then
+        be committed from the other CSV instead.
+
+        Any other change, eg. to a hints file, loads the ledger from
+        scratch in a thread, while requests are still answered from the
+        current ledger. It's replaced once the thread is done.
+
+        Args:
+            changed: Dict of changed files, see Watcher.poll.
+        """
+        csvs = {}
+        if all(x.endswith('.csv') for x in changed):
+            for level in self._levels():
+                for csv in level['csvs']:
+                    csvs[os.path.abspath(csv)] = csv, level['hints']
+
+        sources = self.ledger.sources
+        if csvs and all(x in csvs if c == 'added' else x in sources for x, c in changed.items()):
+            try:
+                count = self._reloadCsvs(csvs, changed)
+            except (OSError, ValueError) as e:
+                _log('Failed to load {}: {}'.format(', '.join(sorted(changed)), e))
+            else:
+                _log('Loaded {} transactions from {}.'.format(count, ', '.join(sorted(changed))))
+            return
+
+        _log('Reloading after changes to {}.'.format(', '.join(sorted(changed))))
+        self._loader = threading.Thread(target=self._load, daemon=True)
+        self._loader.start()
+
+    def _reloadCsvs(self, csvs, changed):
+        """ Apply changed CSVs to the ledger in place. See reload.
+
+        Args:
+            csvs: Absolute path of each CSV being served => (path, Hints).
+            changed: Dict of changed CSVs, see Watcher.poll.
+
+        Returns:
+            The number of transactions loaded.
+        """
+        def perspective(path):
+            return os.path.splitext(os.path.basename(path))[0]
+
+        count = 0
+        for path, change in sorted(changed.items()):
+            if change == 'modified':
+                added = self.ledger.loadCsvTail(*csvs[path])
+                if added is not None:
+                    count += len(added)
+                    continue
+
+            # CSVs with the same base name share a perspective, so they're
+            # all retracted and loaded again. They're parsed first, so that
+            # an invalid row leaves the ledger as it was.
+            name = perspective(path)
+            parsed = [(csv, self.ledger.parseCsv(csv, hints)) for x, (csv, hints) in csvs.items()
+                      if perspective(x) == name]
+
+            self.ledger.retractSource(name)
+            for csv, (rows, source) in parsed:
+                count += len(self.ledger.commitCsv(csv, rows, source))
+
+        return count
+
+    def _levels(self):
+        """ The levels of the CSVs being served, see group_csvs.
+        """
+        levels = []
+        for csv in self.args.csvs:
+            levels.extend(group_csvs(csv))
+
+        if self.args.hints:
+            hints = Hints(self.args.hints)
+            for level in levels:
+                level['hints'] = hints
+
+        return levels
+
+    def _load(self):
+        try:
+            self._loaded = load_ledger(self.args)
+        except Exception as e:
+            self._loaded = e
+
+    def answer(self, request):
+        """ Run a request.
+
+        Args:
+            request: Request dict. See ask.
+
+        Returns:
+            A response dict.
+        """
+        theirs = request['load']
+        keys = ['primary_currency', 'duplicate_window']
+        if theirs['csvs'] is not None:
+            keys += ['csvs', 'hints']
+
+        if any(self.params[k] != theirs[k] for k in keys):
+            return {
+                'mismatch': True,
+                'error': 'The server at {} loaded different CSVs or settings.'.format(self.server_address)}
+
+        query = Query(request['filter'])
+        ledger = filter_ledger(self.ledger, query)
+        command = request['command']
+
+        if command == 'dump':
+            output = None
+            if request.get('ledger_file'):
+                ledgerfile.save(request['ledger_file'], ledger)
+            else:
+                output = ledger.dump()
+
+        elif command == 'report':
+            report, = import_module(request['reporter'], keys=['report'])
+            budgets = request.get('budgets')
+            output = report(ledger, load_budgets(budgets) if budgets else None)
+
+        else:
+            raise ValueError('Unknown command "{}".'.format(command))
+
+        return {'output': output, 'explain': query.explain() if request.get('explain') else None}
+
+
+def _connect(path):
+    """ Connect to the socket at path.
+
+    Raises:
+        FileNotFoundError or ConnectionRefusedError if no server is
+        listening there.
+    """
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        s.connect(path)
+    except OSError:
+        s.close()
+        raise
+
+    return s
+
+
+def start_server(args):
+    """ Load the ledger args point to and bind a server for it.
+
+    A socket left behind by a server that's no longer running is replaced.
+
+    Args:
+        args: daybook args namespace. args.socket is the path of the
+            socket, or None for the default.
+
+    Returns:
+        A LedgerServer. Call serve_forever on it, and server_close and
+        remove the socket when done.
+
+    Raises:
+        OSError if another server is running on the socket, or it couldn't
+        be created.
+        See load_ledger.
+    """
+    path = args.socket or user_socket
+
+    if os.path.exists(path):
+        try:
+            _connect(path).close()
+        except (FileNotFoundError, ConnectionRefusedError):
+            os.unlink(path)
+        else:
+            raise OSError('A server is already running on {}.'.format(path))
+
+    ledger = load_ledger(args)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    # Only the user may connect.
+    umask = os.umask(0o077)
+    try:
+        return LedgerServer(path, ledger, args)
+    finally:
+        os.umask(umask)
+
+
+def serve(args):
+    """ Serve the ledger args point to until interrupted.
+
+    Args:
+        args: See start_server.
+
+    Raises:
+        See start_server.
+    """
+    server = start_server(args)
+
+    # Remove the socket when stopped by eg. systemd too.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    try:
+        _log('Serving {} transactions on {}.'.format(len(server.ledger.transactions), server.server_address))
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.unlink(server.server_address)
+
+
+def ask(args, command, **kwargs):
+    """ Ask a server to run a command.
+
+    Args:
+        args: daybook args namespace. The server is at args.socket, or the
+            default socket. args.no_server skips asking.
+        command: 'dump' or 'report'.
+        kwargs: Arguments of the command. Paths must be absolute.
+            dump: ledger_file, to write a ledger file instead.
+            report: reporter, path of the reporter. budgets, list of paths
+                to budget files.
+
+    Returns:
+        The response, a dict with the output of the command and explain,
+        the explanation of the filter if asked for. Or None if args has
+        CSVs and no server could answer, so they should be loaded locally.
+
+    Raises:
+        ConnectionRefusedError if args has no CSVs and no server could
+            answer.
+        ValueError if the server failed to run the command.
+    """
+    path = getattr(args, 'socket', None) or user_socket
+    request = dict(kwargs, command=command, load=load_params(args), filter=args.filter, explain=args.explain)
+
+    response = None
+    if not getattr(args, 'no_server', False):
+        try:
+            with _connect(path) as s:
+                s.sendall(json.dumps(request).encode() + b'\n')
+                with s.makefile('rb') as f:
+                    response = json.loads(f.readline())
+        except (FileNotFoundError, ConnectionRefusedError):
+            pass
+
+    if response is None or response.get('mismatch'):
+        if args.csvs:
+            return None
+
+        raise ConnectionRefusedError(
+            response['error'] if response else 'No CSVs specified, and no server is running on {}.'.format(path))
+
+    if 'error' in response:
+        raise ValueError(response['error'])
+
+    if response['explain']:
+        print(response['explain'], file=sys.stderr)
+
+    return response
@@ -0,0 +1,213 @@
+""" Persistent snapshot cache for ledgers loaded from local CSVs.
+
+Loading a ledger means parsing every row of every CSV. If none of the
+CSVs or hints files changed since the previous run, then the finished
+ledger can be unpickled from a snapshot instead.
+
+There is at most one snapshot per set of load parameters; the list of
+CSVs and hints files in load order, the primary currency and the
+duplicate window. A snapshot stores the fingerprint of every file it
+was built from and is only used if all of them still match, or if the
+only changes were rows appended to the end of CSVs.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+
+import daybook
+from daybook import __version__
+from daybook.Ledger import Ledger
+
+
+# Bump if the layout of snapshot files changes.
+_FORMAT = 1
+
+
+def _code_digest():
+    """ Digest the source of the modules that define pickled classes.
+
+    Snapshots built by a different version of these classes may not
+    unpickle correctly, so they are keyed by it.
+    """
+    h = hashlib.sha256()
+    root = os.path.dirname(daybook.__file__)
+    for d in [root, '{}/util'.format(root)]:
+        for f in sorted(os.listdir(d)):
+            if f.endswith('.py'):
+                with open('{}/{}'.format(d, f), 'rb') as f:
+                    h.update(f.read())
+
+    return h.hexdigest()
+
+
+def fingerprint(path):
+    """ Fingerprint a file by its path, size, mtime and content.
+
+    Args:
+        path: Path to the file.
+
+    Returns:
+        A tuple of the absolute path, size, mtime in ns and sha256 digest.
+
+    Raises:
+        OSError if the file couldn't be read.
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+
+    return os.path.abspath(path), st.st_size, st.st_mtime_ns, h.hexdigest()
+
+
+def _level_files(levels, hints=None):
+    """ List (csvs, hints files) for each level in load order.
+    """
+    ret = []
+    for level in levels:
+        h = hints or level['hints']
+        ret.append((level['csvs'], h.files if h else []))
+
+    return ret
+
+
+def snapshot_path(cachedir, levels, primary_currency, duplicate_window, hints=None):
+    """ Path of the snapshot for a set of load parameters.
+
+    Args:
+        cachedir: Directory containing snapshots.
+        levels: List of levels as returned by group_csvs.
+        primary_currency: Primary currency of the ledger.
+        duplicate_window: Duplicate window of the ledger.
+        hints: Hints that override the hints of each level.
+
+    Returns:
+        Path to the snapshot file. It may not exist.
+    """
+    files = [
+        ([os.path.abspath(x) for x in csvs], [os.path.abspath(x) for x in hfiles])
+        for csvs, hfiles in _level_files(levels, hints)]
+
+    key = repr((_FORMAT, __version__, _code_digest(), files, primary_currency, duplicate_window))
+    key = hashlib.sha256(key.encode()).hexdigest()
+
+    return '{}/{}.snapshot'.format(cachedir, key)
+
+
+def fingerprints(levels, hints=None):
+    """ Fingerprint every CSV and hints file of each level.
+
+    Args:
+        levels: List of levels as returned by group_csvs.
+        hints: Hints that override the hints of each level.
+
+    Returns:
+        A list with one (csv fingerprints, hints fingerprints) pair per level.
+
+    Raises:
+        OSError if any file couldn't be read.
+    """
+    return [
+        ([fingerprint(x) for x in csvs], [fingerprint(x) for x in hfiles])
+        for csvs, hfiles in _level_files(levels, hints)]
+
+
+def load_snapshot(path):
+    """ Load a snapshot.
+
+    Args:
+        path: Path to the snapshot.
+
+    Returns:
+        The fingerprints the snapshot was built from and its ledger, or
+        (None, None) if there was no readable snapshot. Snapshots are only
+        a cache, so one that fails to load in any way, eg. a truncated
+        or foreign pickle, is treated as missing.
+    """
+    try:
+        with open(path, 'rb') as f:
+            snapshot = pickle.load(f)
+
+        prints, ledger = snapshot['fingerprints'], snapshot['ledger']
+        if not isinstance(ledger, Ledger) or not isinstance(prints, list):
+            return None, None
+    except Exception:
+        return None, None
+
+    return prints, ledger
+
+
+def update_snapshot(ledger, levels, old, new, hints=None):
+    """ Bring a snapshot's ledger up to date with CSVs that only grew.
+
+    Only the rows appended to each CSV since the snapshot was built are
+    loaded, see Ledger.loadCsvTail. If any hints file changed, any CSV was
+    modified in any way other than appending rows, or the appended rows
+    could be duplicates of another CSV's transactions, then the ledger has
+    to be loaded from scratch instead.
+
+    Args:
+        ledger: Ledger loaded from the snapshot. It is updated in place.
+        levels: List of levels as returned by group_csvs.
+        old: Fingerprints the snapshot was built from.
+        new: Current fingerprints of levels.
+        hints: Hints that override the hints of each level.
+
+    Returns:
+        The updated ledger, or None if the ledger must be fully reloaded.
+
+    Raises:
+        ValueError: Any appended row was invalid.
+    """
+    if len(old) != len(new):
+        return None
+
+    grown = []
+    for level, (ocsvs, ohints), (ncsvs, nhints) in zip(levels, old, new):
+        if ohints != nhints or [x[0] for x in ocsvs] != [x[0] for x in ncsvs]:
+            return None
+
+        for csv, o, n in zip(level['csvs'], ocsvs, ncsvs):
+            if o == n:
+                continue
+            elif n[1] <= o[1]:
+                return None
+
+            grown.append((csv, hints or level['hints']))
+
+    for csv, h in grown:
+        if ledger.loadCsvTail(csv, h) is None:
+            return None
+
+    return ledger
+
+
+def save_snapshot(path, prints, ledger):
+    """ Save a ledger as a snapshot.
+
+    The snapshot is written atomically. Failing to write it is not an
+    error; the next run will just have to parse the CSVs again.
+
+    Args:
+        path: Path to the snapshot.
+        prints: Fingerprints of the files the ledger was loaded from.
+        ledger: The ledger to save.
+    """
+    snapshot = {'fingerprints': prints, 'ledger': ledger}
+    cachedir = os.path.dirname(path)
+
+    try:
+        os.makedirs(cachedir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=cachedir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(snapshot, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError:
+        pass
@@ -0,0 +1,75 @@
+""" Watch the CSVs and hints files a ledger was loaded from.
+"""
+
+import os
+
+
+def stat_files(csvs, hints=None):
+    """ Stat every file a ledger loaded from csvs depends on.
+
+    Files are found like group_csvs finds them, without reading any
+    hints files.
+
+    Args:
+        csvs: CSVs, directories or a ledger file, as given to --csvs.
+        hints: Path of a hints file that overrides the others.
+
+    Returns:
+        A dict of absolute path => (size, mtime in ns).
+    """
+    paths = []
+    for root in csvs:
+        if os.path.isdir(root):
+            for d, _, files in os.walk(root):
+                paths.extend(os.path.join(d, x) for x in files if x.endswith('.csv') or x == 'hints')
+        else:
+            paths.append(root)
+            paths.append(os.path.join(os.path.dirname(root), 'hints'))
+
+    if hints:
+        paths.append(hints)
+
+    ret = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+
+        ret[os.path.abspath(path)] = st.st_size, st.st_mtime_ns
+
+    return ret
+
+
+class Watcher:
+    """ Polls files for changes by their sizes and mtimes.
+    """
+
+    def __init__(self, csvs, hints=None):
+        """ Start watching the files of a ledger.
+
+        Args:
+            See stat_files.
+        """
+        self.csvs = csvs
+        self.hints = hints
+        self.files = stat_files(csvs, hints)
+
+    def poll(self):
+        """ Find the files that changed since the last poll.
+
+        Returns:
+            A dict of path => 'added', 'removed' or 'modified'.
+        """
+        files = stat_files(self.csvs, self.hints)
+        ret = {}
+        for path in self.files.keys() | files.keys():
+            if path not in files:
+                ret[path] = 'removed'
+            elif path not in self.files:
+                ret[path] = 'added'
+            elif files[path] != self.files[path]:
+                ret[path] = 'modified'
+
+        self.files = files
+        return ret
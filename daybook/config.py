@@ -11,6 +11,8 @@ from daybook.configs.default import create_default_ini
 
 user_confdir = '{}/.config/daybook'.format(Path.home())
 user_conf = '{}/daybook.ini'.format(user_confdir)
+user_cachedir = '{}/.cache/daybook'.format(Path.home())
+user_socket = '{}/daybook.sock'.format(user_cachedir)
 
 
 def get_defaults():
@@ -0,0 +1,233 @@
+""" Binary ledger files that load without parsing.
+
+A ledger file holds a ledger's columns (see Columns) as they are laid out
+in memory, so opening one maps the file and uses it in place. Pages are
+only read as they're used, and are shared by every process that has the
+same file open.
+
+Layout:
+
+    magic            8 bytes, MAGIC
+    version          uint32, VERSION
+    header length    uint32
+    header           UTF-8 JSON of the load parameters, the byte order
+                     and item size of each column, dictionary tables of
+                     account names, currencies and tags and the position
+                     of every block relative to the first.
+    blocks           Every column of Columns.layout, then the offsets of
+                     each note and the UTF-8 notes themselves. Blocks start
+                     at multiples of 8 bytes, the first right after the
+                     header.
+"""
+
+import json
+import mmap
+import os
+import stat
+import struct
+import sys
+import tempfile
+from array import array
+
+from daybook.Columns import Columns
+from daybook.Ledger import Ledger
+
+
+MAGIC = b'\x89DAYBOOK'
+
+# Bump if the layout changes.
+VERSION = 2
+
+_prefix = struct.Struct('<8sII')
+
+
+class _Texts:
+    """ Notes decoded from a block of UTF-8 on demand.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def is_ledgerfile(path):
+    """ Check if a path is a ledger file.
+
+    Args:
+        path: Path to check. It may not exist.
+
+    Returns:
+        True if path is a regular file starting with MAGIC.
+    """
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def save(path, ledger):
+    """ Write a ledger to a ledger file.
+
+    The file is replaced atomically.
+
+    Args:
+        path: Path of the ledger file.
+        ledger: Ledger to write.
+
+    Raises:
+        OSError if the file couldn't be written.
+    """
+    columns = ledger.columns()
+
+    texts = [x.encode() for x in columns.texts]
+    offsets = array('q', [0])
+    for x in texts:
+        offsets.append(offsets[-1] + len(x))
+
+    blocks = [(name, getattr(columns, name)) for name in Columns.layout]
+    blocks.append(('text_offsets', offsets))
+    blocks.append(('texts', b''.join(texts)))
+
+    header = {
+        'primary_currency': ledger.primary_currency,
+        'duplicate_window': ledger.duplicate_window,
+        'rows': len(columns),
+        'byteorder': sys.byteorder,
+        'itemsizes': {k: array(v).itemsize for k, v in Columns.layout.items()},
+        'accounts': columns.accounts,
+        'currencies': columns.currencies,
+        'tagsets': [sorted(x) for x in columns.tagsets],
+        'blocks': {},
+    }
+
+    pos = 0
+    for name, block in blocks:
+        size = len(memoryview(block).cast('B'))
+        header['blocks'][name] = [pos, size]
+        pos = _align(pos + size)
+
+    data = json.dumps(header, separators=(',', ':')).encode()
+    start = _align(_prefix.size + len(data))
+
+    d = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=d, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_prefix.pack(MAGIC, VERSION, len(data)))
+            f.write(data)
+            for name, block in blocks:
+                f.seek(start + header['blocks'][name][0])
+                f.write(block)
+            f.truncate(start + pos)
+        os.chmod(tmp, _mode(path))
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _mode(path):
+    """ Permissions for a new ledger file at path.
+
+    mkstemp creates files only the owner can read. Ledger files are
+    written where the user asked, so they get the mode of the file they
+    replace, or the default mode for new files otherwise.
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def open_columns(path):
+    """ Map the columns of a ledger file.
+
+    Args:
+        path: Path to the ledger file.
+
+    Returns:
+        The file's Columns and header. The columns are read-only views of
+        the mapped file until rows are appended to them.
+
+    Raises:
+        OSError if the file couldn't be opened.
+        ValueError if it isn't a ledger file this version of daybook can
+        read.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < _prefix.size:
+            raise ValueError('{} is not a ledger file.'.format(path))
+
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, length = _prefix.unpack_from(mm)
+    if magic != MAGIC:
+        raise ValueError('{} is not a ledger file.'.format(path))
+    elif version != VERSION:
+        raise ValueError('{} is a version {} ledger file, expected {}.'.format(path, version, VERSION))
+
+    try:
+        header = json.loads(str(mm[_prefix.size:_prefix.size + length], 'utf-8'))
+    except ValueError:
+        raise ValueError('{} has an invalid header.'.format(path))
+
+    itemsizes = {k: array(v).itemsize for k, v in Columns.layout.items()}
+    if header['byteorder'] != sys.byteorder or header['itemsizes'] != itemsizes:
+        raise ValueError('{} was written by a machine with a different architecture.'.format(path))
+
+    view = memoryview(mm)
+    start = _align(_prefix.size + length)
+
+    def block(name, typecode='B'):
+        pos, size = header['blocks'][name]
+        pos += start
+        if pos + size > len(view):
+            raise ValueError('{} is truncated.'.format(path))
+
+        return view[pos:pos + size].cast(typecode)
+
+    columns = {name: block(name, typecode) for name, typecode in Columns.layout.items()}
+    if any(len(x) != header['rows'] for x in columns.values()):
+        raise ValueError('{} has columns of different lengths.'.format(path))
+
+    texts = _Texts(block('text_offsets', 'q'), block('texts'))
+    columns = Columns.fromBuffers(
+        columns, header['accounts'], header['currencies'], header['tagsets'], texts, mm)
+
+    return columns, header
+
+
+def load(path, primary_currency=None):
+    """ Load a ledger from a ledger file.
+
+    Args:
+        path: Path to the ledger file.
+        primary_currency: Overrides the primary currency the ledger was
+            written with.
+
+    Returns:
+        A Ledger. See Ledger.fromColumns.
+
+    Raises:
+        See open_columns.
+    """
+    columns, header = open_columns(path)
+    return Ledger.fromColumns(
+        columns, primary_currency or header['primary_currency'], header['duplicate_window'])
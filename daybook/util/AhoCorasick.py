@@ -0,0 +1,84 @@
+""" Multi-pattern substring matching.
+"""
+
+from collections import deque
+
+
+class AhoCorasick:
+    """ Find which of many patterns occur in a string in a single pass.
+
+    Every pattern is given a rank. Searching a string returns the lowest
+    rank of all the patterns it contains, in time linear to the length of
+    the string no matter how many patterns there are.
+    """
+
+    def __init__(self, patterns):
+        """ Compile patterns into an automaton.
+
+        Args:
+            patterns: Iterable of (pattern, rank) pairs. Patterns may repeat
+                with different ranks; the lowest rank is kept.
+        """
+        # Per state: transitions by character, failure state and lowest
+        # rank of any pattern ending at this state or its failure states.
+        self.goto = [{}]
+        self.fail = [0]
+        self.rank = [None]
+
+        for pattern, rank in patterns:
+            state = 0
+            for c in pattern:
+                nxt = self.goto[state].get(c)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][c] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.rank.append(None)
+                state = nxt
+
+            self.rank[state] = self._min(self.rank[state], rank)
+
+        # Breadth first, so failure states are always finished first.
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for c, nxt in self.goto[state].items():
+                f = self.fail[state]
+                while f and c not in self.goto[f]:
+                    f = self.fail[f]
+
+                self.fail[nxt] = self.goto[f].get(c, 0)
+                self.rank[nxt] = self._min(self.rank[nxt], self.rank[self.fail[nxt]])
+                queue.append(nxt)
+
+    @staticmethod
+    def _min(a, b):
+        return b if a is None or (b is not None and b < a) else a
+
+    def search(self, s):
+        """ Find the lowest ranked pattern within s.
+
+        Args:
+            s: String to search.
+
+        Returns:
+            The lowest rank of the patterns that are substrings of s, or
+            None if s contains none of them.
+        """
+        goto = self.goto
+        fail = self.fail
+        ranks = self.rank
+
+        best = ranks[0]
+        state = 0
+        for c in s:
+            while state and c not in goto[state]:
+                state = fail[state]
+
+            state = goto[state].get(c, 0)
+            rank = ranks[state]
+            if rank is not None and (best is None or rank < best):
+                best = rank
+
+        return best
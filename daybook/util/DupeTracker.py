@@ -1,21 +1,32 @@
 """ Classes to determine duplicate transactions.
 """
 
-from collections import defaultdict, OrderedDict
+from collections import defaultdict
 from datetime import timedelta
 
 
 class _DupeGroup:
-    def __init__(self):
+
+    __slots__ = ('seq', 'orig', 'dates', 'transactions', 'block', 'second_empty', 'own_tags')
+
+    def __init__(self, seq=0):
+        self.seq = seq  # Position of this group within its bucket.
         self.orig = None  # Save first transaction entered.
-        self.dates = set()  # Should contain 2 entries at most.
-        self.transactions = OrderedDict()  # Keyed by perspective.
+        # Should contain 2 entries at most, so a tuple is smaller than a
+        # set. Membership is still tested with a set, since SuperDates that
+        # compare equal can hash differently.
+        self.dates = ()
+        self.transactions = {}  # Keyed by perspective, in insertion order.
         self.block = 0
 
         # If the original transaction was empty persepctive, then this
         # holds a duplicate empty perspective.
         self.second_empty = None
 
+        # Tags of the original transaction before the tags of its
+        # duplicates were added to it. None until it has duplicates.
+        self.own_tags = None
+
     def should_own(self, transaction, perspective, window, block):
         """ Check if a transaction should be a member of this group.
 
@@ -50,7 +61,7 @@ class _DupeGroup:
 
         in_range = abs(t.date - self.orig.date) <= timedelta(days=window)
 
-        return t.date in self.dates or (len(self.dates) == 1 and in_range)
+        return t.date in set(self.dates) or (len(self.dates) == 1 and in_range)
 
     def add(self, transaction, perspective, block):
         """ Add a transaction to this group.
@@ -69,6 +80,9 @@ class _DupeGroup:
         t = transaction
         old_orig = self.orig
 
+        if old_orig is not None and self.own_tags is None:
+            self.own_tags = frozenset(old_orig.tags)
+
         if perspective == '':
             self.block = block
             if '' in self.transactions:
@@ -81,35 +95,63 @@ class _DupeGroup:
                 return old_orig, t
 
         self.transactions[perspective] = t
-        self.dates.add(t.date)
+        if t.date not in set(self.dates):
+            self.dates += (t.date,)
 
         self.orig = self.orig or t
 
         return old_orig, t
 
-    def find_perspectives(self, transaction):
-        """ Return the perspectives of a transaction reference.
+    def remove(self, transaction, perspective):
+        """ Remove a transaction from this group.
 
-        The original perspective and the perspective of the provided
-        reference are returned. If the provided reference is not in
-        self.transactions, then (None, None) is returned.
+        If it was the original transaction, then the next transaction of
+        the group, in the order they were added, becomes the original.
 
         Args:
-            transaction: Transaction reference within this structure.
+            transaction: Transaction to remove.
+            perspective: Perspective it was added with.
+        """
+        t = transaction
 
-        Returns:
-            The original and actual perspectives of the reference.
+        if t is self.second_empty:
+            self.second_empty = None
+            return
+
+        if perspective == '' and self.second_empty is not None:
+            # Keeps its place in the order of perspectives.
+            self.transactions[''] = self.second_empty
+            self.second_empty = None
+        else:
+            del self.transactions[perspective]
+
+        dates = ()
+        for x in self.transactions.values():
+            if x.date not in set(dates):
+                dates += (x.date,)
+        self.dates = dates
+
+        if t is self.orig:
+            self.orig = next(iter(self.transactions.values()), None)
+            self.own_tags = frozenset(self.orig.tags) if self.orig is not None else None
+
+    def merged_tags(self):
+        """ Tags of the original transaction merged with its duplicates'.
         """
-        p_orig = list(self.transactions.keys())[0]
+        ret = set(self.orig.tags if self.own_tags is None else self.own_tags)
+        for x in self.members():
+            ret.update(y for y in x.tags if y)
 
-        if transaction is self.second_empty:
-            return p_orig, ''
+        return ret
 
-        for p, t in self.transactions.items():
-            if t is transaction:
-                return p_orig, p
+    def members(self):
+        """ Transactions of this group other than the original.
+        """
+        ret = [x for x in self.transactions.values() if x is not self.orig]
+        if self.second_empty is not None:
+            ret.append(self.second_empty)
 
-        return None, None
+        return ret
 
 
 class DupeTracker:
@@ -121,6 +163,42 @@ class DupeTracker:
         # Each bucket contains a list of Groups.
         self.buckets = defaultdict(list)
 
+        # Groups of each bucket by the day ordinal of every date within
+        # them, so a group is still found after its original is removed
+        # and another transaction of the group becomes the original.
+        self.days = {}
+
+        # A group only owns transactions within the window of one of its
+        # dates. Give or take a day for dates with times.
+        self.span = int(abs(window)) + 1 if window is not False else 0
+
+        # id of every transaction within a group => (group, perspective)
+        self.refs = {}
+
+        # perspective => {id: transaction} of every transaction within a
+        # group that was added with that perspective.
+        self.perspectives = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['refs']
+        del state['perspectives']
+        return state
+
+    def __setstate__(self, state):
+        """ Rebuild the reverse maps, since ids don't survive pickling.
+        """
+        self.__dict__.update(state)
+        self.refs = {}
+        self.perspectives = {}
+        for bucket in self.buckets.values():
+            for group in bucket:
+                for p, t in group.transactions.items():
+                    self._remember(group, t, p)
+
+                if group.second_empty is not None:
+                    self._remember(group, group.second_empty, '')
+
     def checkDupe(self, transaction, perspective, block):
         """ Determine if a transaction is a duplicate.
 
@@ -146,15 +224,141 @@ class DupeTracker:
             then orig will be None.
         """
         t = transaction
+        key = self._hash(t)
+
+        if self.window is not False:
+            for group in self._candidates(key, t.date.toordinal()):
+                if group.should_own(t, perspective, self.window, block):
+                    filed = self._filed(group)
+                    ret = self._add(group, t, perspective, block)
+                    self._refile(key, group, filed)
+                    return ret
+
+        bucket = self.buckets[key]
+        group = _DupeGroup(bucket[-1].seq + 1 if bucket else 0)
+        bucket.append(group)
+        ret = self._add(group, t, perspective, block)
+        self._refile(key, group, set())
 
-        bucket = self.buckets[self._hash(t)]
-        for group in bucket:
-            if group.should_own(t, perspective, self.window, block):
-                return group.add(t, perspective, block)
+        return ret
 
-        group = _DupeGroup()
-        bucket.append(group)
-        return group.add(t, perspective, block)
+    def _add(self, group, transaction, perspective, block):
+        """ Add a transaction to a group and remember where it went.
+        """
+        orig, t = group.add(transaction, perspective, block)
+
+        # t is either the transaction that was just added, or one that was
+        # already in the group and is remembered already.
+        if id(t) not in self.refs:
+            self._remember(group, t, perspective)
+
+        return orig, t
+
+    def _filed(self, group):
+        """ Day ordinals a group is filed under in self.days.
+        """
+        return {x.toordinal() for x in group.dates}
+
+    def _refile(self, key, group, filed):
+        """ File a group under the days of its dates again.
+
+        Args:
+            key: Bucket of the group.
+            group: Group whose dates changed.
+            filed: Days it was filed under before, see _filed.
+        """
+        days = self.days.setdefault(key, {})
+        now = self._filed(group)
+
+        for day in filed - now:
+            days[day].remove(group)
+            if not days[day]:
+                del days[day]
+
+        for day in now - filed:
+            days.setdefault(day, []).append(group)
+
+    def _remember(self, group, transaction, perspective):
+        self.refs[id(transaction)] = group, perspective
+        try:
+            self.perspectives[perspective][id(transaction)] = transaction
+        except KeyError:
+            self.perspectives[perspective] = {id(transaction): transaction}
+
+    def remove(self, transaction):
+        """ Forget a transaction, as if it had never been checked.
+
+        If it was the original transaction of its group, then the next
+        transaction of the group becomes the original, see
+        _DupeGroup.remove.
+
+        Args:
+            transaction: A reference to a transaction within this
+                structure, as returned by checkDupe.
+
+        Returns:
+            The transaction's group, and the group's original transaction
+            before the removal. The group's orig is None if it was left
+            empty.
+
+        Raises:
+            KeyError if transaction isn't within this structure.
+        """
+        t = transaction
+        group, perspective = self.refs.pop(id(t))
+
+        ts = self.perspectives[perspective]
+        del ts[id(t)]
+        if not ts:
+            del self.perspectives[perspective]
+
+        orig = group.orig
+        filed = self._filed(group)
+        group.remove(t, perspective)
+
+        key = self._hash(orig)
+        self._refile(key, group, filed)
+
+        if group.orig is None:
+            bucket = self.buckets[key]
+            bucket.remove(group)
+            if not bucket:
+                del self.buckets[key]
+                del self.days[key]
+
+        return group, orig
+
+    def isolated(self, transaction):
+        """ Whether no group could own a transaction, or the transaction
+        any group's transactions, whatever its perspective.
+
+        Unlike checkDupe, the transaction isn't added.
+
+        Args:
+            transaction: Transaction to check. Only its date, account
+                names and amount are used.
+        """
+        t = transaction
+        return self.window is False or not self._candidates(self._hash(t), t.date.toordinal())
+
+    def _candidates(self, key, day):
+        """ Groups of a bucket that could own a transaction dated day.
+
+        Groups are returned in the order they were created, so the same
+        group claims a transaction as if the whole bucket were searched.
+        """
+        if key not in self.days:
+            return []
+
+        days = self.days[key]
+        lo, hi = day - self.span, day + self.span
+
+        if hi - lo < len(days):
+            groups = {g.seq: g for d in range(lo, hi + 1) if d in days for g in days[d]}
+        else:
+            groups = {g.seq: g for d, gs in days.items() if lo <= d <= hi for g in gs}
+
+        return [groups[x] for x in sorted(groups)]
 
     def getPerspectives(self, transactions):
         """ List the perspectives of associated transactions.
@@ -174,15 +378,14 @@ class DupeTracker:
         act = []
 
         for t in transactions:
-            bucket = self.buckets[self._hash(t)]
+            try:
+                group, a = self.refs[id(t)]
+            except KeyError:
+                continue
 
-            for group in bucket:
-                o, a = group.find_perspectives(t)
-                if [o, a] != [None, None]:
-                    oref.append(group.orig)
-                    oper.append(o)
-                    act.append(a)
-                    break
+            oref.append(group.orig)
+            oper.append(next(iter(group.transactions)))
+            act.append(a)
 
         return oref, oper, act
 
@@ -192,4 +395,5 @@ class DupeTracker:
         DupeTracker omits transaction dates as part of their hashes.
         """
         t = transaction
-        return '{}{}{}'.format(t.src.name, t.dest.name, t.amount)
+        a = t.amount
+        return (t.src.name, t.dest.name, a.src_currency, a.src_units, a.dest_currency, a.dest_units, a.scale)
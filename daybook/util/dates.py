@@ -0,0 +1,125 @@
+""" Fast, memoized parsing of CSV date strings.
+
+SuperDate tries ISO format, then a list of strptime formats and finally
+a natural language parser for every string it's given. Statements
+repeat the same few hundred dates thousands of times, so parse_date
+recognizes the most common formats directly and remembers what each
+string parsed to.
+"""
+
+import re
+from datetime import date, datetime, timedelta, timezone
+
+from superdate import SuperDate
+
+
+# Maximum number of strings remembered by parse_date.
+memo_size = 1 << 16
+
+_memo = {}
+_memo_day = None
+
+_keys = {}
+
+# Range of date_key per day. More than the microseconds in a day.
+day_span = 1 << 37
+
+_iso = re.compile(r'(\d{4})-(\d\d)-(\d\d)')
+_ymd = re.compile(r'(\d{4})/(\d\d?)/(\d\d?)')
+_mdy = re.compile(r'(\d\d?)/(\d\d?)/(\d{4})')
+
+
+def _fast(s):
+    """ Parse Y-m-d, Y/m/d and m/d/Y. Return None for anything else.
+
+    Invalid dates in these formats also return None, since SuperDate
+    may still make sense of them. eg. d/m/Y if the month is > 12.
+    """
+    m = _iso.fullmatch(s) or _ymd.fullmatch(s)
+    if m:
+        y, mo, d = m.groups()
+    else:
+        m = _mdy.fullmatch(s)
+        if not m:
+            return None
+        mo, d, y = m.groups()
+
+    try:
+        return date(int(y), int(mo), int(d))
+    except ValueError:
+        return None
+
+
+def parse_date(date_):
+    """ Create a SuperDate, quickly.
+
+    SuperDates are returned as is and strings are memoized. The memo is
+    cleared daily so relative dates like "yesterday" stay correct, and
+    whenever it holds memo_size strings.
+
+    Args:
+        date_: String, date, datetime or SuperDate to parse.
+
+    Returns:
+        A SuperDate. It may be shared with other callers, which is safe
+        since SuperDates are immutable.
+
+    Raises:
+        ValueError if date_ could not be parsed.
+    """
+    global _memo_day
+
+    if type(date_) is SuperDate:
+        return date_
+    elif type(date_) is not str:
+        return SuperDate(date_)
+
+    today = date.today()
+    if today != _memo_day or len(_memo) >= memo_size:
+        _memo.clear()
+        _memo_day = today
+
+    try:
+        return _memo[date_]
+    except KeyError:
+        pass
+
+    d = _fast(date_)
+    d = SuperDate(d if d is not None else date_)
+    _memo[date_] = d
+
+    return d
+
+
+def date_key(d):
+    """ Integer sort key of a date or datetime.
+
+    Keys order dates the way SuperDates do, except that they're a total
+    order. A date without a time sorts before every time of that day,
+    rather than comparing equal to them. Timezone aware datetimes are
+    ordered by their UTC time.
+
+    Args:
+        d: date or datetime, eg. SuperDate._date.
+
+    Returns:
+        The day's ordinal times day_span, plus one more than the
+        microseconds since midnight for datetimes.
+    """
+    try:
+        return _keys[d]
+    except KeyError:
+        pass
+
+    if type(d) is datetime:
+        utc = d.astimezone(timezone.utc).replace(tzinfo=None) if d.tzinfo is not None else d
+        midnight = datetime(utc.year, utc.month, utc.day)
+        key = utc.toordinal() * day_span + (utc - midnight) // timedelta(microseconds=1) + 1
+    else:
+        key = d.toordinal() * day_span
+
+    if len(_keys) >= memo_size:
+        _keys.clear()
+    _keys[d] = key
+
+    return key
@@ -0,0 +1,204 @@
+""" Plugin manifests, read without importing the plugins.
+
+Reporters and converters are plugins: python files in the directories of
+DAYBOOK_REPORTERS and DAYBOOK_CONVERTERS. Building the command line parser
+only needs each plugin's help and description, so they're read from the
+plugins' syntax trees instead of importing them, which would also import
+everything they import. The plugin that's actually run is imported by its
+subcommand.
+"""
+
+import ast
+import json
+import os
+import tempfile
+
+
+# Markers of members found by read_members.
+_DEFINED = object()
+_UNKNOWN = object()
+
+
+def _bound(node):
+    """ Names bound anywhere within a statement. '*' for star imports.
+    """
+    for x in ast.walk(node):
+        if isinstance(x, ast.Name) and isinstance(x.ctx, ast.Store):
+            yield x.id
+        elif isinstance(x, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            yield x.name
+        elif isinstance(x, (ast.Import, ast.ImportFrom)):
+            for alias in x.names:
+                yield alias.asname or alias.name.partition('.')[0]
+
+
+def read_members(pyfile, literals=(), defined=()):
+    """ Read members of a module without importing it.
+
+    Only the top level statements of the module are read. Members that are
+    bound anywhere else, eg. within an if statement, can't be read.
+
+    Args:
+        pyfile: Path to python3 code to read.
+        literals: Names of members that must be assigned a str literal.
+        defined: Names of members that must be defined by a def, class or
+            import, eg. a reporter's report function.
+
+    Returns:
+        A dict of the name => value of each of literals, or None if any
+        member couldn't be read. The module may still have them, eg. if it
+        builds its help at import time, so it has to be imported to tell.
+
+    Raises:
+        OSError if pyfile couldn't be read.
+    """
+    with open(pyfile, 'rb') as f:
+        source = f.read()
+
+    try:
+        tree = ast.parse(source, pyfile)
+    except (SyntaxError, ValueError):
+        return None
+
+    found = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and all(isinstance(x, ast.Name) for x in node.targets):
+            try:
+                value = ast.literal_eval(node.value)
+            except (TypeError, ValueError, RecursionError):
+                value = _UNKNOWN
+
+            for x in node.targets:
+                found[x.id] = value
+
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            found[node.name] = _DEFINED
+
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for name in _bound(node):
+                found[name] = _DEFINED
+
+        else:
+            for name in _bound(node):
+                found[name] = _UNKNOWN
+
+        if '*' in found:
+            return None
+
+    if any(found.get(x) is not _DEFINED for x in defined):
+        return None
+
+    if any(type(found.get(x)) is not str for x in literals):
+        return None
+
+    return {x: found[x] for x in literals}
+
+
+def _import_members(pyfile, literals, filter):
+    """ Read members of a module by importing it. See load_manifest.
+
+    Returns:
+        A dict of the name => value of each of literals, or None if the
+        module was invalid.
+    """
+    # The importer pulls in the modules needed to load a ledger, which
+    # only plugins that couldn't be read statically should cost.
+    from daybook.util.importer import import_module
+
+    try:
+        values = import_module(pyfile, filter, list(literals))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    return dict(zip(literals, values))
+
+
+def _load_cache(cachefile, spec):
+    try:
+        with open(cachefile) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(cache, dict) or cache.get('spec') != spec:
+        return {}
+
+    return cache.get('plugins', {})
+
+
+def _save_cache(cachefile, spec, plugins):
+    """ Write a cache atomically. Failing to is not an error.
+    """
+    cachedir = os.path.dirname(os.path.abspath(cachefile))
+
+    try:
+        os.makedirs(cachedir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=cachedir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'spec': spec, 'plugins': plugins}, f)
+            os.replace(tmp, cachefile)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError:
+        pass
+
+
+def load_manifest(paths, literals=(), defined=(), filter=lambda x: True, cachefile=None):
+    """ Find the plugins in paths and read their members.
+
+    Members are read with read_members. Plugins it can't read are imported
+    instead, and must pass filter like with import_modules. Either way,
+    the members of each plugin are cached by the plugin's size and mtime,
+    so only new and changed plugins are read again.
+
+    If two plugins have the same name then the one found earlier in the
+    paths takes precedence.
+
+    Args:
+        paths: List of dirs to check.
+        literals: See read_members.
+        defined: See read_members.
+        filter: See import_module.
+        cachefile: Path of a JSON file to cache members in, or None.
+
+    Returns:
+        A dict of plugin name => (path, dict of its literals), sorted by
+        name. The name is the basename of the plugin without .py.
+
+    Raises:
+        ValueError if any path wasn't a directory.
+        Whatever importing a plugin raises, other than what filter does.
+    """
+    spec = [list(literals), list(defined)]
+    cache = _load_cache(cachefile, spec) if cachefile else {}
+
+    plugins = {}
+    manifest = {}
+    for path in paths:
+        if not os.path.isdir(path):
+            raise ValueError('"{}" is not a directory.'.format(path))
+
+        for f in sorted(os.listdir(path)):
+            name = f.split('.py')[0]
+            pyfile = os.path.abspath(os.path.join(path, f))
+            if not f.endswith('.py') or name in manifest or not os.path.isfile(pyfile):
+                continue
+
+            st = os.stat(pyfile)
+            entry = cache.get(pyfile)
+            if entry is None or entry[:2] != [st.st_size, st.st_mtime_ns]:
+                members = read_members(pyfile, literals, defined)
+                if members is None:
+                    members = _import_members(pyfile, literals, filter)
+                entry = [st.st_size, st.st_mtime_ns, members]
+
+            plugins[pyfile] = entry
+            if entry[2] is not None:
+                manifest[name] = pyfile, entry[2]
+
+    if cachefile and plugins != cache:
+        _save_cache(cachefile, spec, plugins)
+
+    return {k: manifest[k] for k in sorted(manifest)}
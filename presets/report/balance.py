@@ -1,5 +1,7 @@
 from prettytable import PrettyTable
 
+from daybook import aggregate
+
 
 help = 'Total balance report.'
 
@@ -16,12 +18,13 @@ def report(ledger, budget):
     pt.field_names = ['Account', 'Balance']
     pt.align['Account'] = 'l'
     pt.align['Balance'] = 'r'
+    totals = aggregate.balances(ledger.columns())
     for name in sorted(ledger.accounts):
-        account = ledger.accounts[name]
+        account = totals.get(name, {})
         balances = []
-        for cur in sorted(account.balances):
-            balance = account.balances[cur]
-            balances.append('{}: {}'.format(cur, round(balance, 2)))
+        for cur in sorted(account):
+            balance = account[cur]
+            balances.append('{}: {}'.format(cur, balance))
 
         pt.add_row([name, '\n'.join(balances)])
 
@@ -3,6 +3,8 @@ from collections import defaultdict
 
 from prettytable import PrettyTable
 
+from daybook import aggregate
+
 
 help = 'Budget report'
 
@@ -19,9 +21,10 @@ def report(ledger, budget):
     unaccounted = {}
 
     # Compute differences
+    totals = aggregate.balances(ledger.columns())
     for name in sorted(ledger.accounts):
         account = ledger.accounts[name]
-        balance = account.balances[ledger.primary_currency]
+        balance = totals.get(name, {}).get(ledger.primary_currency, 0)
 
         deltas[account.name] += balance
 
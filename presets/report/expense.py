@@ -3,6 +3,8 @@ from collections import defaultdict
 import datetime
 from prettytable import PrettyTable
 
+from daybook import aggregate
+
 help = 'Basic expense report.'
 
 
@@ -13,16 +15,17 @@ Show income vs expenses for all loaded transactions.
 
 def report(ledger, budget):
     ret = []
+    totals = aggregate.balances(ledger.columns())
 
     # income table
     pt = PrettyTable()
     pt.field_names = ['Account', 'Balance']
     pt.align = 'l'
     for name in sorted([x for x in ledger.accounts if ledger.accounts[x].type == 'income']):
-        account = ledger.accounts[name]
+        account = totals.get(name, {})
         balances = []
-        for cur in sorted(account.balances):
-            balance = account.balances[cur]
+        for cur in sorted(account):
+            balance = account[cur]
             balances.append('{}: {}'.format(cur, -balance))
 
         pt.add_row([name, '\n'.join(balances)])
@@ -35,10 +38,10 @@ def report(ledger, budget):
     pt.field_names = ['Account', 'Balance']
     pt.align = 'l'
     for name in sorted([x for x in ledger.accounts if ledger.accounts[x].type == 'expense']):
-        account = ledger.accounts[name]
+        account = totals.get(name, {})
         balances = []
-        for cur in sorted(account.balances):
-            balance = account.balances[cur]
+        for cur in sorted(account):
+            balance = account[cur]
             balances.append('{}: {}'.format(cur, balance))
 
         pt.add_row([name, '\n'.join(balances)])
@@ -52,11 +55,10 @@ def report(ledger, budget):
     pt.align = 'l'
 
     balances = defaultdict(lambda: 0)
-    for name in sorted(ledger.accounts):
-        account = ledger.accounts[name]
-        if (account.type in ['expense', 'income']):
-            for cur in account.balances:
-                balance = account.balances[cur]
+    for type_ in ['expense', 'income']:
+        node = ledger.tree.get(type_)
+        if node is not None:
+            for cur, balance in node.balances.items():
                 balances[cur] -= balance
 
     for cur, balance in balances.items():
@@ -1,3 +1,4 @@
+import pickle
 import unittest
 from datetime import datetime
 
@@ -152,6 +153,44 @@ class TestAccount(unittest.TestCase):
         with self.assertRaises(ValueError):
             a = Account('asss.a')
 
+    def test_pickle(self):
+        """ Accounts should pickle with their balances, but not transactions.
+        """
+        a = Account('asset.a')
+        b = Account('expense.b')
+        a.addTransaction(Transaction(datetime.today(), a, b, amount))
+
+        c = pickle.loads(pickle.dumps(a))
+        self.assertEqual('asset.a', c.name)
+        self.assertEqual('asset', c.type)
+        self.assertEqual({'jpy': -10}, c.balances)
+        self.assertEqual('jpy', c.last_currency)
+        self.assertEqual([], c.transactions)
+        self.assertEqual(1, len(a.transactions))
+
+    def test_slots(self):
+        """ Accounts, amounts and transactions shouldn't have a __dict__.
+        """
+        a = Account('asset.a')
+        t = Transaction(datetime.today(), a, a, amount)
+        for x in [a, amount, t]:
+            self.assertFalse(hasattr(x, '__dict__'))
+
+    def test_derived_fields(self):
+        """ Derived fields of transactions should follow their amounts.
+        """
+        a = Account('asset.a')
+        b = Account('expense.b')
+        t = Transaction('2021-01-01', a, b, Amount('usd', -3, 'jpy', 400))
+
+        self.assertEqual('asset.a expense.b', t.accounts)
+        self.assertEqual(400, t.quantity)
+
+        u = Transaction('2021-01-01', Account('asset.a'), Account('expense.b'), Amount('usd', -3, 'jpy', 400))
+        self.assertEqual(t, u)
+        self.assertEqual(hash(t), hash(u))
+        self.assertEqual(hash(t), hash(pickle.loads(pickle.dumps(t))))
+
 
 if __name__ == '__main__':
     unittest.main()
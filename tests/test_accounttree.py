@@ -0,0 +1,115 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+from daybook import ledgerfile
+from daybook.Account import Account
+from daybook.AccountTree import AccountTree
+from daybook.Amount import Amount
+from daybook.Ledger import Ledger
+from daybook.Transaction import Transaction
+from daybook.client.load import load_from_local
+
+
+pcurr = 'usd'
+resources = '{}/resources'.format(os.path.dirname(__file__))
+
+
+def rollup(ledger):
+    """ Balances of every prefix of every account, summed from the accounts.
+    """
+    ret = {'': {}}
+    for name, account in ledger.accounts.items():
+        fields = name.split('.')
+        for i in range(len(fields) + 1):
+            balances = ret.setdefault('.'.join(fields[:i]), {})
+            for currency, balance in account.balances.items():
+                balances[currency] = round(balances.get(currency, 0) + balance, 6)
+
+    return ret
+
+
+def rounded(tree):
+    return {k: {c: round(b, 6) for c, b in v.items()} for k, v in tree.rollup().items()}
+
+
+class TestAccountTree(unittest.TestCase):
+
+    def setUp(self):
+        csvs = ['{}/multi-csv'.format(resources), '{}/multi-csv-tags'.format(resources)]
+        self.ledger = load_from_local(csvs, pcurr, 5)
+
+    def test_rollup(self):
+        """ Every node should total the accounts under it.
+        """
+        self.assertEqual(rollup(self.ledger), rounded(self.ledger.tree))
+
+        self.ledger.load(
+            'date,src,dest,amount\n'
+            '2020-01-01,asset.cash,expense.food.grocery,"usd -5 cad 6.1"\n'
+            '2020-01-02,asset.cash,expense.food,-2.5\n', 'asset.cash')
+        self.assertEqual(rollup(self.ledger), rounded(self.ledger.tree))
+
+        food = self.ledger.tree['expense.food']
+        self.assertEqual(
+            {'usd': 2.5, 'cad': 6.1},
+            {k: round(v, 6) for k, v in self.ledger.tree['expense.food.*'].balances.items()})
+        self.assertIs(self.ledger.accounts['expense.food'], food.account)
+        self.assertIsNone(self.ledger.tree['expense'].account)
+        self.assertEqual(['expense.food', 'expense.food.grocery'], [x.name for x in food.accounts()])
+
+    def test_lookup(self):
+        """ Missing nodes should be None, or raise KeyError.
+        """
+        tree = self.ledger.tree
+        self.assertIn('asset', tree)
+        self.assertNotIn('expense.doesnt-exist', tree)
+        self.assertIsNone(tree.get('asset.doesnt-exist.either'))
+        with self.assertRaises(KeyError):
+            tree['doesnt-exist']
+
+        names = [x.name for x in tree]
+        self.assertEqual('', names[0])
+        self.assertEqual(sorted(self.ledger.accounts), [x.name for x in tree.accounts()])
+
+    def test_add_after(self):
+        """ Accounts added with balances should add them to the tree.
+        """
+        account = Account('asset.cash')
+        account.addTransaction(Transaction('2020-01-01', Account('void.void'), account, Amount('usd', -3, 'usd', 3)))
+
+        tree = AccountTree()
+        tree.add(account)
+        self.assertEqual({'usd': 3}, tree['asset'].balances)
+
+        account.addUnits('usd', 25, 1)
+        self.assertEqual({'usd': 5.5}, tree.balances)
+
+    def test_ledgers(self):
+        """ Trees should be kept by ledger files, filters, pickles and clears.
+        """
+        expected = rollup(self.ledger)
+
+        with tempfile.TemporaryDirectory() as d:
+            path = '{}/ledger'.format(d)
+            ledgerfile.save(path, self.ledger)
+            self.assertEqual(expected, rounded(ledgerfile.load(path).tree))
+
+        ledger = pickle.loads(pickle.dumps(self.ledger))
+        self.assertEqual(expected, rounded(ledger.tree))
+        ledger.load('date,src,dest,amount\n2020-01-01,asset.cash,expense.new,-1\n', 'asset.cash')
+        self.assertEqual(rollup(ledger), rounded(ledger.tree))
+
+        filtered = self.ledger.filtered(lambda t: 'food' in t.accounts)
+        self.assertEqual(rollup(filtered), rounded(filtered.tree))
+
+        self.ledger.clear()
+        self.assertEqual({'': {}}, self.ledger.tree.rollup())
+
+        ledger = Ledger(pcurr)
+        self.assertEqual({'': {}}, ledger.tree.rollup())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import os
+import random
+import unittest
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from daybook import aggregate
+from daybook.Ledger import Ledger
+
+
+pcurr = 'usd'
+resources = '{}/resources'.format(os.path.dirname(__file__))
+
+# Sum with numpy if it's installed, and always without.
+nps = [x for x in [aggregate.np] if x is not None] + [None]
+
+
+class TestAggregate(unittest.TestCase):
+
+    def setUp(self):
+        path = '{}/multi-csv'.format(resources)
+        self.ledger = Ledger(pcurr, 5)
+        self.ledger.loadCsvs(['{}/{}'.format(path, x) for x in sorted(os.listdir(path))])
+        self.ledger.load(
+            'date,src,dest,amount\n'
+            '2020-01-31,asset.cash,expense.food,"usd -5 cad 6.1"\n'
+            '2020-02-01,asset.cash,expense.food,"cad -1.3 eur 1"\n'
+            '2020-02-03,income.gift,asset.cash,"eur -2 eur 2"\n', 'asset.cash')
+
+    def test_balances(self):
+        """ Sums should equal account balances, currencies in the same order.
+        """
+        for np in nps:
+            with self.subTest(numpy=np is not None), mock.patch.object(aggregate, 'np', np):
+                totals = aggregate.balances(self.ledger.columns())
+                for name, account in self.ledger.accounts.items():
+                    self.assertEqual(list(account.balances.items()), list(totals.get(name, {}).items()))
+
+    def test_balances_by_type(self):
+        """ Sums by type should add up the accounts of each type.
+        """
+        exp = {}
+        for account in self.ledger.accounts.values():
+            for cur, balance in account.balances.items():
+                d = exp.setdefault(account.type, {})
+                d[cur] = d.get(cur, 0) + balance
+
+        for np in nps:
+            with self.subTest(numpy=np is not None), mock.patch.object(aggregate, 'np', np):
+                totals = aggregate.balances(self.ledger.columns(), 'type')
+                self.assertEqual(sorted(exp), sorted(totals))
+                for type_, balances in exp.items():
+                    for cur, balance in balances.items():
+                        self.assertAlmostEqual(balance, totals[type_][cur])
+
+    def test_period_balances(self):
+        """ Sums per month should match filtered ledgers.
+        """
+        for np in nps:
+            with self.subTest(numpy=np is not None), mock.patch.object(aggregate, 'np', np):
+                months = aggregate.period_balances(self.ledger.columns(), 'month')
+                self.assertEqual(sorted(months), list(months))
+
+                for start, totals in months.items():
+                    end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+                    sub = self.ledger.filtered(lambda t: start <= t.date._date < end)
+
+                    self.assertEqual(
+                        {n: dict(a.balances) for n, a in sub.accounts.items()},
+                        totals)
+
+                self.assertEqual(
+                    [date(2019, 1, 1), date(2020, 1, 1)],
+                    list(aggregate.period_balances(self.ledger.columns(), 'year')))
+                self.assertEqual(
+                    {'asset': {'eur': 2.0}, 'income': {'eur': -2.0}},
+                    aggregate.period_balances(self.ledger.columns(), 'day', 'type')[date(2020, 2, 3)])
+
+    def test_exact(self):
+        """ 20 years of cents and satoshis should add up exactly.
+        """
+        random.seed(0)
+        exp = {'usd': Decimal(0), 'btc': Decimal(0)}
+        lines = ['date,src,dest,amount']
+        day = date(2000, 1, 1)
+        for i in range(20 * 365):
+            cents = '{}.{:02d}'.format(random.randint(0, 99), random.randint(0, 99))
+            sats = '0.{:08d}'.format(random.randint(1, 99999999))
+            lines.append('{},asset.cash,expense.food,usd -{}'.format(day, cents))
+            lines.append('{},asset.wallet,expense.food,btc -{}'.format(day, sats))
+            exp['usd'] += Decimal(cents)
+            exp['btc'] += Decimal(sats)
+            day += timedelta(days=1)
+
+        ledger = Ledger(pcurr, False)
+        ledger.load('\n'.join(lines))
+        food = ledger.accounts['expense.food']
+        self.assertEqual({k: float(v) for k, v in exp.items()}, food.balances)
+
+        for np in nps:
+            with self.subTest(numpy=np is not None), mock.patch.object(aggregate, 'np', np):
+                self.assertEqual(food.balances, aggregate.balances(ledger.columns())['expense.food'])
+                self.assertEqual(
+                    {'usd': (int(exp['usd'] * 100), 2), 'btc': (int(exp['btc'] * 10 ** 8), 8)},
+                    aggregate.balances(ledger.columns(), exact=True)['expense.food'])
+
+    def test_overflow(self):
+        """ Sums too large for 64 bits should still be exact.
+        """
+        ledger = Ledger(pcurr, False)
+        ledger.load(
+            'date,src,dest,amount\n'
+            '2020-01-01,asset.a,expense.b,-9000000000000000\n'
+            '2020-01-02,asset.a,expense.b,-9000000000000000\n'
+            '2020-01-03,asset.a,expense.b,-0.000000000000000001\n')
+
+        units = 18 * 10 ** 33 + 1
+        for np in nps:
+            with self.subTest(numpy=np is not None), mock.patch.object(aggregate, 'np', np):
+                self.assertEqual(
+                    {pcurr: (units, 18)}, aggregate.balances(ledger.columns(), exact=True)['expense.b'])
+                self.assertEqual(
+                    ledger.accounts['expense.b'].balances, aggregate.balances(ledger.columns())['expense.b'])
+
+    def test_empty(self):
+        """ Empty columns have no sums.
+        """
+        for np in nps:
+            with self.subTest(numpy=np is not None), mock.patch.object(aggregate, 'np', np):
+                self.assertEqual({}, aggregate.balances(Ledger(pcurr).columns()))
+                self.assertEqual({}, aggregate.period_balances(Ledger(pcurr).columns()))
+
+    def test_invalid(self):
+        """ Invalid groupings and periods should raise ValueError.
+        """
+        with self.assertRaises(ValueError):
+            aggregate.balances(self.ledger.columns(), 'currency')
+
+        with self.assertRaises(ValueError):
+            aggregate.period_balances(self.ledger.columns(), 'week')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 
-from daybook.Amount import Amount
+from daybook.Amount import Amount, to_units
 
 
 class TestAmount(unittest.TestCase):
@@ -251,6 +251,63 @@ class TestAmount(unittest.TestCase):
         self.assertEqual(-1, a.src_amount)
         self.assertEqual(1, a.dest_amount)
 
+    def test_to_units(self):
+        """ Numbers should convert to exact units of their last decimal place.
+        """
+        for x, exp in [
+                ('-12.50', (-125, 1)),
+                ('+3', (3, 0)),
+                (3, (3, 0)),
+                (0.1, (1, 1)),
+                (-0.0, (0, 0)),
+                ('.5', (5, 1)),
+                ('1e3', (1000, 0)),
+                ('1.5E-3', (15, 4)),
+                ('1_000.25', (100025, 2)),
+                ('1.0000000000000000005', (1, 0)),
+                ('0.0000000000000000025', (2, 18)),
+                ('0.0000000000000000035', (4, 18)),
+                # Rounded once, not a place at a time.
+                ('0.00000000000000000146', (1, 18)),
+                ('-0.00000000000000000146', (-1, 18)),
+                ('0.0000000000000000014999', (1, 18)),
+                ('922337203685477580.75', (922337203685477581, 0)),
+                ('92233720368547758.0749', (9223372036854775807, 2))]:
+            with self.subTest(x=x):
+                self.assertEqual(exp, to_units(x))
+
+        for x in ['', 'usd', 'nan', '-inf', '1.2.3', '1' * 20, None, []]:
+            with self.subTest(x=x), self.assertRaises(ValueError):
+                to_units(x)
+
+    def test_exact(self):
+        """ Amounts should be exact, but read as floats.
+        """
+        a = Amount.createFromStr('usd 0.1 btc -0.00000001', 'usd')
+        self.assertEqual((10000000, -1, 8), (a.src_units, a.dest_units, a.scale))
+        self.assertIs(float, type(a.src_amount))
+        self.assertEqual(0.1, a.src_amount)
+        self.assertEqual(-1e-8, a.dest_amount)
+        self.assertEqual('usd:0.1 btc:-1e-08', str(a))
+
+        self.assertEqual(Amount('usd', -0.3, 'usd', '0.30'), Amount('usd', '-.3', 'usd', 0.3))
+        self.assertEqual(
+            Amount('usd', -0.3, 'usd', 0.3),
+            Amount.fromUnits('usd', -3000, 'usd', 3000, 4))
+        self.assertNotEqual(Amount('usd', -0.1, 'usd', 0.1), Amount('usd', -(0.3 - 0.2), 'usd', 0.3 - 0.2))
+
+    def test_too_large(self):
+        """ Units that don't fit 64 bits at the amount's scale should raise.
+        """
+        with self.assertRaises(ValueError):
+            Amount('usd', 9223372036854775807, 'eur', '-0.5')
+
+        with self.assertRaises(ValueError):
+            Amount.createFromStr('usd -1e18 eur 0.000000000000000001', 'usd')
+
+        a = Amount('usd', 922337203685477580, 'eur', '-0.7')
+        self.assertEqual((9223372036854775800, -7, 1), (a.src_units, a.dest_units, a.scale))
+
 
 if __name__ == '__main__':
     unittest.main()
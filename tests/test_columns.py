@@ -0,0 +1,100 @@
+import os
+import unittest
+from datetime import date, datetime, timedelta, timezone
+
+from daybook.Amount import Amount
+from daybook.Columns import Columns
+from daybook.Ledger import Ledger
+
+
+pcurr = 'usd'
+resources = '{}/resources'.format(os.path.dirname(__file__))
+
+
+class TestColumns(unittest.TestCase):
+
+    def setUp(self):
+        path = '{}/multi-csv'.format(resources)
+        self.ledger = Ledger(pcurr)
+        self.ledger.loadCsvs(['{}/{}'.format(path, x) for x in sorted(os.listdir(path))])
+
+    def test_round_trip(self):
+        """ Materialized transactions should match the ledger's.
+        """
+        columns = self.ledger.columns()
+
+        self.assertEqual(len(self.ledger.transactions), len(columns))
+        for t, c in zip(self.ledger.transactions, columns):
+            self.assertEqual(t, c)
+            self.assertEqual(t.tags, c.tags)
+            self.assertEqual(t.notes, c.notes)
+            self.assertEqual(str(t.date), str(c.date))
+
+        # Rows can be committed to a ledger as is.
+        ledger = Ledger(pcurr)
+        ledger.commitRows(list(columns.rows()))
+        for name, account in self.ledger.accounts.items():
+            self.assertEqual(account.balances, ledger.accounts[name].balances)
+
+    def test_maintained(self):
+        """ The ledger's columns should follow its transactions.
+        """
+        path = '{}/multi-csv'.format(resources)
+        ledger = Ledger(pcurr, 5)
+        for x in sorted(os.listdir(path)):
+            ledger.loadCsv('{}/{}'.format(path, x))
+            columns = ledger.columns()
+            self.assertEqual(list(Columns.fromTransactions(ledger.transactions).rows()), list(columns.rows()))
+
+        # Tags of duplicates are merged into the originals.
+        self.assertTrue(any(len(t.tags) > 1 for t in ledger.transactions))
+        self.assertIs(columns, ledger.columns())
+
+        ledger.sort()
+        self.assertEqual(list(Columns.fromTransactions(ledger.transactions).rows()), list(ledger.columns().rows()))
+
+    def test_filter(self):
+        """ Only filtered transactions should be copied.
+        """
+        columns = self.ledger.columns("'asset.my-checking' in t.accounts")
+        exp = self.ledger.getTransactions("'asset.my-checking' in t.accounts")
+
+        self.assertEqual(exp, list(columns))
+
+    def test_interned(self):
+        """ Repeated values should be stored once.
+        """
+        columns = Columns()
+        for i in range(10):
+            columns.append(date(2021, 1, 1 + i), 'asset.a', 'expense.b', Amount(pcurr, -1, pcurr, 1), {'x', 'y'}, 'n')
+
+        self.assertEqual(['asset.a', 'expense.b'], columns.accounts)
+        self.assertEqual([pcurr], columns.currencies)
+        self.assertEqual([frozenset({'x', 'y'})], columns.tagsets)
+        self.assertEqual(['n'], columns.texts)
+        self.assertIs(columns[0].src, columns[9].src)
+
+    def test_exact_values(self):
+        """ Times should survive as they were.
+        """
+        columns = Columns()
+        columns.append(datetime(2021, 1, 2, 3, 4, 5, 6), 'asset.a', 'asset.a', Amount(pcurr, 0, pcurr, 0))
+        columns.append(date(2021, 1, 2), 'asset.a', 'expense.b', Amount(pcurr, -0.5, 'cad', 0.7))
+
+        self.assertEqual('2021-01-02 03:04:05.000006', str(columns[0].date))
+        self.assertEqual('2021-01-02', str(columns[1].date))
+        self.assertEqual('usd:0.0 usd:0.0', str(columns[0].amount))
+        self.assertEqual('usd:-0.5 cad:0.7', str(columns[1].amount))
+
+    def test_timezone(self):
+        """ Timezones should be kept as UTC offsets.
+        """
+        tz = timezone(timedelta(hours=-5, minutes=-30))
+        columns = Columns()
+        columns.append(datetime(2021, 1, 2, 23, 30, tzinfo=tz), 'asset.a', 'asset.a', Amount(pcurr, 0, pcurr, 0))
+
+        self.assertEqual(datetime(2021, 1, 2, 23, 30, tzinfo=tz), columns.date(0))
+        self.assertEqual('2021-01-02 23:30:00-05:30', str(columns[0].date))
+
+if __name__ == '__main__':
+    unittest.main()
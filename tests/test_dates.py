@@ -0,0 +1,69 @@
+import unittest
+from datetime import date, datetime, timedelta, timezone
+
+from superdate import SuperDate
+
+from daybook.util.dates import date_key, parse_date
+
+
+class TestParseDate(unittest.TestCase):
+
+    def test_same_as_superdate(self):
+        """ parse_date should agree with SuperDate, fast path or not.
+        """
+        strs = [
+            '2021-01-05', '2021/1/5', '2021/01/05', '1/5/2021', '01/05/2021',
+            '13/01/2021', '2021-1-5', '2024-02-29', '11/11/11',
+            '03-17-2016 21:02', '2021/01/12 00:00:01', 'March 3 2019']
+
+        for s in strs:
+            with self.subTest(s=s):
+                exp = SuperDate(s)._date
+                act = parse_date(s)._date
+                self.assertEqual(exp, act)
+                self.assertIs(type(exp), type(act))
+
+    def test_invalid(self):
+        """ Unparseable strings should still raise ValueError.
+        """
+        with self.assertRaises(ValueError):
+            parse_date('not a date')
+
+        with self.assertRaises(ValueError):
+            parse_date('2021/02/30')
+
+    def test_memo(self):
+        """ Repeated strings and SuperDates should not be re-parsed.
+        """
+        d = parse_date('2021/06/30')
+        self.assertIs(d, parse_date('2021/06/30'))
+        self.assertIs(d, parse_date(d))
+
+        self.assertEqual(date(2021, 6, 30), parse_date(date(2021, 6, 30)))
+        self.assertEqual(datetime(2021, 6, 30, 1), parse_date(datetime(2021, 6, 30, 1)))
+
+
+class TestDateKey(unittest.TestCase):
+
+    def test_order(self):
+        """ Keys should order dates, then times, then the next day.
+        """
+        tz = timezone(timedelta(hours=2))
+        dates = [
+            date(2019, 12, 31),
+            datetime(2020, 1, 1, 1, 30, tzinfo=tz),
+            date(2020, 1, 1),
+            datetime(2020, 1, 1),
+            datetime(2020, 1, 1, 0, 0, 0, 1),
+            datetime(2020, 1, 1, 3, tzinfo=tz),
+            datetime(2020, 1, 1, 23, 59, 59, 999999),
+            date(2020, 1, 2),
+        ]
+        keys = [date_key(x) for x in dates]
+        self.assertEqual(sorted(keys), keys)
+        self.assertEqual(len(set(keys)), len(keys))
+        self.assertEqual(date_key(datetime(2020, 1, 1, 1)), date_key(datetime(2020, 1, 1, 3, tzinfo=tz)))
+
+
+if __name__ == '__main__':
+    unittest.main()
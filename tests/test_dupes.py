@@ -0,0 +1,220 @@
+import pickle
+import random
+import unittest
+from datetime import date, datetime, timedelta
+
+from daybook.Account import Account
+from daybook.Amount import Amount
+from daybook.Ledger import Ledger
+from daybook.Transaction import Transaction
+from daybook.util.DupeTracker import DupeTracker, _DupeGroup
+
+
+pcurr = 'usd'
+
+
+class LinearDupeTracker(DupeTracker):
+    """ The original DupeTracker, which searches every group of a bucket.
+    """
+
+    def checkDupe(self, transaction, perspective, block):
+        t = transaction
+
+        bucket = self.buckets[self._hash(t)]
+        for group in bucket:
+            if group.should_own(t, perspective, self.window, block):
+                return group.add(t, perspective, block)
+
+        group = _DupeGroup()
+        bucket.append(group)
+        return group.add(t, perspective, block)
+
+    def remove(self, transaction):
+        t = transaction
+
+        bucket = self.buckets[self._hash(t)]
+        for group in bucket:
+            if t is group.second_empty:
+                found = ''
+            else:
+                found = next((p for p, x in group.transactions.items() if x is t), None)
+
+            if found is not None:
+                group.remove(t, found)
+                if group.orig is None:
+                    bucket.remove(group)
+                return
+
+        raise KeyError(t)
+
+    def getPerspectives(self, transactions):
+        oref = []
+        oper = []
+        act = []
+
+        for t in transactions:
+            for group in self.buckets[self._hash(t)]:
+                p_orig = list(group.transactions.keys())[0]
+                if t is group.second_empty:
+                    found = ''
+                else:
+                    found = next((p for p, x in group.transactions.items() if x is t), None)
+
+                if found is not None:
+                    oref.append(group.orig)
+                    oper.append(p_orig)
+                    act.append(found)
+                    break
+
+        return oref, oper, act
+
+    def _hash(self, transaction):
+        t = transaction
+        return '{}{}{}'.format(t.src.name, t.dest.name, t.amount)
+
+
+def random_batches(rng, n):
+    """ Batches of transactions that share accounts, amounts and dates.
+    """
+    accounts = ['asset.checking', 'expense.rent', 'income.job']
+    start = date(2021, 1, 1)
+
+    batches = []
+    for _ in range(n):
+        batch = []
+        for _ in range(rng.randint(1, 8)):
+            d = start + timedelta(days=rng.randint(0, 30))
+            if rng.random() < 0.2:
+                d = datetime(d.year, d.month, d.day, rng.randint(0, 23))
+
+            src, dest = rng.sample(accounts, 2)
+            amount = rng.choice([1.5, 2.0, 10.25])
+            batch.append(Transaction(d, Account(src), Account(dest), Amount(pcurr, -amount, pcurr, amount)))
+
+        batches.append((rng.choice(['', '', 'a', 'b', 'c']), batch))
+
+    return batches
+
+
+class TestDupeTracker(unittest.TestCase):
+
+    def test_matches_linear_search(self):
+        """ Duplicates should be identical to searching every group.
+        """
+        rng = random.Random(0)
+
+        for window in [0, 1, 3, 7, 100, False]:
+            for _ in range(30):
+                batches = random_batches(rng, rng.randint(1, 40))
+
+                results = []
+                for tracker in [DupeTracker, LinearDupeTracker]:
+                    ledger = Ledger(pcurr, window)
+                    ledger.dupes = tracker(window)
+
+                    added = []
+                    for perspective, batch in batches:
+                        ts = ledger.addTransactions(batch, perspective)
+                        added.extend((t, perspective) for t in ts)
+
+                    positions = {id(t): i for i, t in enumerate(ledger.transactions)}
+                    refs = [positions.get(id(t)) for t, _ in added]
+                    dupes = [
+                        (positions.get(id(t)), o, a)
+                        for t, o, a in ledger.reportDupes([t for t, _ in added])]
+
+                    results.append((ledger.dump(), refs, dupes))
+
+                self.assertEqual(results[1], results[0], window)
+
+    def test_remove_then_check(self):
+        """ Duplicates should still match searching every group after
+        transactions are removed, and originals replaced.
+        """
+        rng = random.Random(3)
+
+        for window in [0, 1, 3, 7]:
+            for _ in range(30):
+                batches = random_batches(rng, rng.randint(2, 40))
+                trackers = [DupeTracker(window), LinearDupeTracker(window)]
+
+                checked = []
+                for block, (perspective, batch) in enumerate(batches):
+                    if block == len(batches) // 2:
+                        for t in rng.sample(checked, len(checked) // 2):
+                            for tracker in trackers:
+                                tracker.remove(t)
+                        checked = []
+
+                    for t in batch:
+                        (orig, x), (lorig, lx) = [y.checkDupe(t, perspective, block) for y in trackers]
+                        self.assertIs(lorig, orig)
+                        self.assertIs(lx, x)
+                        if all(x is not y for y in checked):
+                            checked.append(x)
+
+    def test_pickle(self):
+        """ Duplicates should still be reported after unpickling.
+        """
+        rng = random.Random(1)
+
+        ledger = Ledger(pcurr, 3)
+        for perspective, batch in random_batches(rng, 40):
+            ledger.addTransactions(batch, perspective)
+
+        copy = pickle.loads(pickle.dumps(ledger))
+
+        self.assertEqual(len(ledger.dupes.refs), len(copy.dupes.refs))
+        self.assertEqual(
+            {k: len(v) for k, v in ledger.dupes.perspectives.items()},
+            {k: len(v) for k, v in copy.dupes.perspectives.items()})
+
+        exp = ledger.dupes.getPerspectives(ledger.transactions)
+        act = copy.dupes.getPerspectives(copy.transactions)
+        self.assertEqual(len(ledger.transactions), len(act[0]))
+        self.assertEqual([t.date for t in exp[0]], [t.date for t in act[0]])
+        self.assertEqual(exp[1:], act[1:])
+
+    def test_retract(self):
+        """ Ledgers should stay consistent as sources are retracted.
+        """
+        rng = random.Random(2)
+
+        for window in [0, 3, False]:
+            for _ in range(20):
+                ledger = Ledger(pcurr, window)
+                added = []
+                for perspective, batch in random_batches(rng, rng.randint(1, 40)):
+                    added.extend(ledger.addTransactions(batch, perspective))
+                ledger.columns()
+
+                for perspective in rng.sample(['', 'a', 'b', 'c'], 4):
+                    ledger.retractSource(perspective)
+
+                    # Every group's original should be committed, once.
+                    origs = [g.orig for b in ledger.dupes.buckets.values() for g in b]
+                    self.assertEqual(sorted(map(id, ledger.transactions)), sorted(map(id, origs)))
+                    self.assertNotIn(perspective, ledger.dupes.perspectives)
+                    for key, days in ledger.dupes.days.items():
+                        filed = {}
+                        for day, groups in days.items():
+                            for g in groups:
+                                filed.setdefault(g.seq, set()).add(day)
+                        self.assertEqual(
+                            {g.seq: {x.toordinal() for x in g.dates} for g in ledger.dupes.buckets[key]}, filed)
+
+                    expected = ledger.filtered()
+                    self.assertEqual(expected.dump(), ledger.dump())
+                    self.assertEqual(
+                        {k: v.balances for k, v in expected.accounts.items()},
+                        {k: v.balances for k, v in ledger.accounts.items()})
+                    self.assertEqual(
+                        list(expected.columns().rows()), list(ledger.columns().rows()))
+
+                self.assertEqual([], ledger.transactions)
+                self.assertEqual({}, ledger.dupes.refs)
+                self.assertEqual({}, ledger.dupes.buckets)
+
+
+if __name__ == '__main__':
+    unittest.main()
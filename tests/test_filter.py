@@ -0,0 +1,170 @@
+import unittest
+
+from daybook.Filter import Query, compile_filter
+from daybook.Ledger import Ledger
+
+
+pcurr = 'usd'
+
+
+class TestFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.ledger = Ledger(pcurr)
+        self.ledger.load(
+            'date,src,dest,amount,tags\n'
+            '2021/01/01,asset.checking,expense.food,-10,lunch\n'
+            '2021/02/01,income.employer,asset.checking,-100,\n'
+            '2021/03/01,asset.checking,expense.rent,-50,home:rent\n')
+
+    def test_accounts(self):
+        """ Filters should be able to search accounts.
+        """
+        f = compile_filter("'expense' in t.accounts")
+        ts = [t for t in self.ledger.transactions if f(t)]
+        self.assertEqual(['expense.food', 'expense.rent'], [t.dest.name for t in ts])
+
+    def test_dates(self):
+        """ Filters should be able to compare dates to strings.
+        """
+        ts = self.ledger.getTransactions("t.date > '2021/01/15' and t.date < '2021/02/15'")
+        self.assertEqual(1, len(ts))
+        self.assertEqual('income.employer', ts[0].src.name)
+
+    def test_namespace(self):
+        """ Filters may use builtins and daybook classes, but not modules.
+        """
+        self.assertEqual(1, len(self.ledger.getTransactions("len(t.tags) > 1")))
+        self.assertEqual(3, len(self.ledger.getTransactions("t.date > SuperDate('2020/01/01')")))
+
+        f = compile_filter('os.getcwd()')
+        with self.assertRaises(NameError):
+            f(self.ledger.transactions[0])
+
+    def test_invalid(self):
+        """ A filter that isn't an expression should raise ValueError.
+        """
+        for expr in ['t.date >', 'x = 1', 'import os']:
+            with self.assertRaises(ValueError):
+                compile_filter(expr)
+
+    def test_callable(self):
+        """ Callables should pass straight through.
+        """
+        f = lambda t: True
+        self.assertIs(f, compile_filter(f))
+
+
+class TestQuery(unittest.TestCase):
+
+    def setUp(self):
+        self.ledger = Ledger(pcurr)
+        self.ledger.load(
+            'date,src,dest,amount,tags\n'
+            '2021/03/01,asset.checking,expense.rent,-50,home:rent\n'
+            '2021/01/01,asset.checking,expense.food,-10,lunch\n'
+            '2021/02/01 12:00,income.employer,asset.checking,-100,\n'
+            '2021/02/02,asset.savings,expense.food,-12,lunch:home\n'
+            '2021/02/01,asset.checking,expense.food,-1,\n')
+
+    def assertSameAsScan(self, expr):
+        """ The query should match checking every transaction.
+        """
+        f = compile_filter(expr)
+        exp = [t for t in self.ledger.transactions if f(t)]
+
+        query = Query(expr)
+        act = query.run(self.ledger)
+
+        self.assertEqual(len(exp), len(act))
+        for e, a in zip(exp, act):
+            self.assertIs(e, a)
+
+        return query
+
+    def test_equivalence(self):
+        """ Indexed queries should find the same transactions as a scan.
+        """
+        exprs = [
+            "t.date > '2021/02/01'",
+            "t.date >= '2021/02/01'",
+            "t.date < '2021/02/01'",
+            "t.date <= '2021/02/01'",
+            "t.date == '2021/02/01'",
+            "'2021/01/15' < t.date <= '2021/02/01'",
+            "'2021/02/01' == t.date",
+            "'expense' in t.accounts",
+            "'food' in t.accounts",
+            "'checking expense' in t.accounts",
+            "'check' in t.src.name",
+            "t.dest.name == 'expense.food'",
+            "'expense.food' == t.dest.name",
+            "t.src.type == 'asset'",
+            "'home' in t.tags",
+            "'home' in t.tags and 'lunch' in t.tags",
+            "'home' in t.tags or 'lunch' in t.tags",
+            "'home' in t.tags or t.amount.dest_amount > 10",
+            "t.date > '2021/01/15' and t.amount.dest_amount > 10",
+            "not 'home' in t.tags",
+            "'home' not in t.tags",
+            "not 'home' not in t.tags",
+            "not 'home' in t.tags and 'lunch' in t.tags",
+            "t.date >= '2021/02/01' and 'lunch' in t.tags and 'home' not in t.tags",
+            "not 'home' in t.accounts",
+            "'food' in t.notes",
+            "'Food' in t.notes.lower()",
+            "'food' in t.notes.casefold() and t.date > '2021/01/15'",
+            "'fo' in t.notes or 'rent' in t.notes",
+            "'food' in t.notes.upper()",
+            "'nothing' in t.notes",
+            "'nothing' in t.tags",
+            "True",
+        ]
+
+        for expr in exprs:
+            with self.subTest(expr=expr):
+                self.assertSameAsScan(expr)
+
+    def test_explain(self):
+        """ Explain should describe which indexes were used.
+        """
+        query = self.assertSameAsScan("t.date > '2021/02/01' and 'home' in t.tags")
+        self.assertEqual(2, query.scanned)
+        self.assertEqual(5, query.total)
+        self.assertEqual(2, query.matched)
+        self.assertIn('date index', query.explain())
+        self.assertIn('tag index', query.explain())
+
+        query = self.assertSameAsScan("'food' in t.notes.lower()")
+        self.assertEqual(3, query.scanned)
+        self.assertIn("notes index for 'food' in t.notes.lower()", query.explain())
+
+        query = self.assertSameAsScan("'check' in t.src.name")
+        self.assertLess(query.scanned, query.total)
+        self.assertIn("account index for 'check' in t.src.name", query.explain())
+
+        query = self.assertSameAsScan("'food' in t.dest.name")
+        self.assertLess(query.scanned, query.total)
+        self.assertIn("account index for 'food' in t.dest.name", query.explain())
+
+        query = self.assertSameAsScan("t.amount.dest_amount > 10")
+        self.assertEqual(5, query.scanned)
+        self.assertIn('full scan', query.explain())
+
+    def test_index_rebuilt(self):
+        """ The index should follow changes to the ledger.
+        """
+        self.assertEqual(2, len(self.ledger.getTransactions("'home' in t.tags")))
+
+        self.ledger.load(
+            'date,src,dest,amount,tags\n'
+            '2021/04/01,asset.checking,expense.rent,-50,home\n')
+
+        self.assertEqual(3, len(self.ledger.getTransactions("'home' in t.tags")))
+
+        self.ledger.sort()
+        self.assertSameAsScan("t.date < '2021/02/02' and 'expense' in t.accounts")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,10 @@
 import os
+import random
+import tempfile
 import unittest
 
 from daybook.Hints import Hints
+from daybook.util.AhoCorasick import AhoCorasick
 
 
 resources = '{}/resources'.format(os.path.dirname(__file__))
@@ -33,6 +36,48 @@ class TestHints(unittest.TestCase):
         hints.load('{}/empty-hints'.format(resources))
         self.assertTrue(not hints.hints)
 
+    def test_first_key_wins(self):
+        """ The first key in file order should win when several match.
+        """
+        with tempfile.NamedTemporaryFile('w') as f:
+            f.write('expense.b = MART\nexpense.a = WALMART\n')
+            f.flush()
+
+            hints = Hints(f.name)
+            self.assertEqual('expense.b', hints.suggest('WALMART #1'))
+            self.assertEqual('expense.b', hints.suggest('WALMART #1'))
+
+            # Loading more lines into an existing key keeps its position.
+            hints.load('{}/hints'.format(resources))
+            self.assertEqual('expense.grocery', hints.suggest('TARGET'))
+            self.assertEqual('expense.b', hints.suggest('WALMART Store'))
+            self.assertEqual('expense.computer', hints.suggest('micro-center'))
+
+
+class TestAhoCorasick(unittest.TestCase):
+
+    def test_matches_linear_search(self):
+        """ The lowest ranked substring should match a linear search.
+        """
+        rng = random.Random(0)
+        word = lambda n: ''.join(rng.choice('abc') for _ in range(rng.randint(1, n)))
+
+        for _ in range(50):
+            patterns = [(word(4), rng.randint(0, 20)) for _ in range(rng.randint(0, 30))]
+            matcher = AhoCorasick(patterns)
+
+            for _ in range(20):
+                s = word(12)
+                ranks = [rank for p, rank in patterns if p in s]
+                self.assertEqual(min(ranks) if ranks else None, matcher.search(s), (patterns, s))
+
+    def test_empty_pattern(self):
+        """ An empty pattern is a substring of everything.
+        """
+        self.assertEqual(1, AhoCorasick([('', 1), ('x', 2)]).search(''))
+        self.assertEqual(0, AhoCorasick([('', 1), ('x', 0)]).search('x'))
+        self.assertEqual(None, AhoCorasick([]).search('x'))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,8 +1,13 @@
 import os
+import random
+import tempfile
 import unittest
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from unittest import mock
 
+import daybook.Ledger
 from daybook.Amount import Amount
+from daybook.Columns import Columns
 from daybook.Ledger import Ledger, suggest_notes
 from daybook.Hints import Hints
 from daybook.Transaction import Transaction
@@ -181,6 +186,110 @@ class TestLedger(unittest.TestCase):
         self.assertEqual(0, len(ledger.accounts))
         self.assertEqual(0, len(ledger.transactions))
 
+    def test_resolve_account_cache(self):
+        """ Account strings should be resolved once, including failures.
+        """
+        ledger = Ledger(pcurr)
+        hints = Hints('{}/hints'.format(resources))
+
+        calls = []
+        uncached = ledger._suggestAccount
+        ledger._suggestAccount = lambda *args: calls.append(args) or uncached(*args)
+
+        for _ in range(3):
+            self.assertEqual('expense.grocery', ledger.resolveAccount('ALDI 123 aldi', 'x.y', hints))
+            self.assertEqual('asset.x', ledger.resolveAccount('this', 'asset.x', hints))
+            with self.assertRaises(ValueError):
+                ledger.resolveAccount('nothing to suggest', 'x.y', hints)
+
+        self.assertEqual(3, len(calls))
+
+        # Loading more hints may change the outcome.
+        with tempfile.NamedTemporaryFile('w', suffix='.hints') as f:
+            f.write('expense.misc = nothing\n')
+            f.flush()
+            hints.load(f.name)
+
+            self.assertEqual('expense.misc', ledger.resolveAccount('nothing to suggest', 'x.y', hints))
+
+        # Results are still new references.
+        self.assertIsNot(ledger.suggestAccount('a.b'), ledger.suggestAccount('a.b'))
+
+    def test_sort(self):
+        """ Sorting should be stable, and skip lists that are in order.
+        """
+        random.seed(0)
+        days = ['2020-01-{:02d}'.format(random.randint(1, 28)) for _ in range(200)]
+        csv = 'date,src,dest,amount,notes\n{}'
+
+        ledger = Ledger(pcurr, False)
+
+        # A descending export, an ascending one and a shuffled one.
+        lines = ['{},asset.a,expense.a,-1,{}'.format(d, i) for i, d in enumerate(sorted(days, reverse=True))]
+        ledger.load(csv.format('\n'.join(lines)))
+        lines = ['{},asset.a,expense.b,-1,{}'.format(d, i) for i, d in enumerate(sorted(days))]
+        ledger.load(csv.format('\n'.join(lines)))
+        lines = ['{},asset.b,expense.c,-1,{}'.format(d, i) for i, d in enumerate(days)]
+        lines.insert(100, '2020-01-15 10:00,asset.b,expense.c,-1,time')
+        ledger.load(csv.format('\n'.join(lines)))
+
+        def key(t):
+            return (t.date._date.toordinal(), getattr(t.date._date, 'hour', -1))
+
+        exp = sorted(ledger.transactions, key=key)
+        accounts = {k: sorted(v.transactions, key=key) for k, v in ledger.accounts.items()}
+
+        sort = mock.Mock(wraps=daybook.Ledger._sort)
+        with mock.patch.object(daybook.Ledger, '_sort', sort):
+            ledger.sort()
+
+            self.assertEqual(exp, ledger.transactions)
+            self.assertEqual([id(t) for t in exp], [id(t) for t in ledger.transactions])
+            for name, account in ledger.accounts.items():
+                self.assertEqual([id(t) for t in accounts[name]], [id(t) for t in account.transactions])
+
+            # expense.b was appended to in order.
+            sorted_ = {id(x.args[0]) for x in sort.call_args_list}
+            self.assertIn(id(ledger.accounts['expense.a'].transactions), sorted_)
+            self.assertNotIn(id(ledger.accounts['expense.b'].transactions), sorted_)
+
+            # Nothing is sorted again, and columns are kept.
+            columns = ledger.columns()
+            sort.reset_mock()
+            ledger.sort()
+            ledger.load(csv.format('2020-02-01,asset.a,expense.a,-1,'))
+            ledger.sort()
+            self.assertEqual(0, sort.call_count)
+            self.assertIs(columns, ledger.columns())
+
+    def test_balances_as_of(self):
+        """ Balances as of a date should match a ledger filtered up to it.
+        """
+        path = '{}/multi-csv'.format(resources)
+        ledger = Ledger(pcurr, 5)
+        ledger.loadCsvs(['{}/{}'.format(path, x) for x in sorted(os.listdir(path))])
+        ledger.load(
+            'date,src,dest,amount\n'
+            '2019-01-15 10:00,asset.cash,expense.food,"usd -5 cad 6.1"\n'
+            '2019-01-15,asset.cash,expense.food,-0.1\n'
+            '2019-01-15 20:00,asset.cash,expense.food,-0.2\n', 'asset.cash')
+
+        days = sorted({t.date._date for t in ledger.transactions if type(t.date._date) is date})
+        days = [days[0] - timedelta(days=1)] + days + [days[-1] + timedelta(days=1)]
+        for d in days:
+            sub = ledger.filtered(lambda t: t.date._date.toordinal() <= d.toordinal())
+            exp = {n: dict(a.balances) for n, a in sub.accounts.items()}
+            self.assertEqual(exp, ledger.balancesAsOf(d))
+
+        self.assertEqual(
+            {pcurr: 0.1, 'cad': 6.1},
+            ledger.balancesAsOf(datetime(2019, 1, 15, 12))['expense.food'])
+        self.assertEqual({pcurr: 0.1}, ledger.accounts['expense.food'].balanceAsOf('2019-01-15 9:00'))
+
+        # New transactions are included.
+        ledger.load('date,src,dest,amount\n2019-01-15,asset.cash,expense.food,-1\n', 'asset.cash')
+        self.assertEqual(1.1, ledger.accounts['expense.food'].balanceAsOf(datetime(2019, 1, 15, 9))[pcurr])
+
     def test_this_substitution(self):
         """Verify behavior for transactions on 'this'.
 
@@ -282,6 +391,143 @@ class TestLedger(unittest.TestCase):
         # May fail because tag order is non-deterministic.
         self.assertEqual(ledger1.dump(), ledger2.dump())
 
+    def test_load_csv_tail(self):
+        """ Only rows appended since the last load should be loaded.
+        """
+        with tempfile.TemporaryDirectory() as d:
+            csv = '{}/asset.checking.csv'.format(d)
+            with open(csv, 'w') as f:
+                f.write(
+                    'date,dest,amount\n'
+                    '2021/01/01,expense.food,-10\n')
+
+            ledger = Ledger(pcurr)
+            ledger.loadCsv(csv)
+            self.assertEqual([], ledger.loadCsvTail(csv))
+
+            with open(csv, 'a') as f:
+                f.write('2021/01/02,expense.food,-5\n')
+
+            trans = ledger.loadCsvTail(csv)
+            self.assertEqual(1, len(trans))
+            self.assertEqual(2, len(ledger.transactions))
+            self.assertEqual(-15, ledger.accounts['asset.checking'].balances['usd'])
+            self.assertEqual([], ledger.loadCsvTail(csv))
+
+            # A modified prefix can't be appended to.
+            with open(csv, 'w') as f:
+                f.write(
+                    'date,dest,amount\n'
+                    '2021/01/01,expense.food,-11\n'
+                    '2021/01/02,expense.food,-5\n'
+                    '2021/01/03,expense.food,-5\n')
+
+            self.assertIsNone(ledger.loadCsvTail(csv))
+            self.assertEqual(2, len(ledger.transactions))
+
+            # Nor can a CSV that was never loaded.
+            self.assertIsNone(Ledger(pcurr).loadCsvTail(csv))
+
+    def test_retract_source(self):
+        """ Retracting a CSV should leave the ledger as if it wasn't loaded.
+
+        Duplicates the CSV reported first are committed from the next
+        CSV that reported them.
+        """
+        path = '{}/multi-csv'.format(resources)
+        names = ['car-loan', 'my-checking', 'my-company-payroll']
+
+        for name in names:
+            ledger = Ledger(pcurr, 5)
+            ledger.loadCsvs(['{}/{}.csv'.format(path, x) for x in names])
+            ledger.columns()
+            ledger.tags()
+
+            retracted = ledger.retractSource(name)
+            self.assertTrue(retracted)
+            self.assertNotIn('{}/{}.csv'.format(path, name), ledger.sources)
+            self.assertEqual([], ledger.retractSource(name))
+
+            expected = Ledger(pcurr, 5)
+            expected.loadCsvs(['{}/{}.csv'.format(path, x) for x in names if x != name])
+
+            self.assertEqual(sorted(expected.dump().split('\n')), sorted(ledger.dump().split('\n')), name)
+            self.assertEqual(
+                {k: dict(v.balances) for k, v in expected.accounts.items()},
+                {k: dict(v.balances) for k, v in ledger.accounts.items()}, name)
+            self.assertEqual(expected.tree.rollup(), ledger.tree.rollup(), name)
+            self.assertEqual(list(Columns.fromTransactions(ledger.transactions).rows()), list(ledger.columns().rows()))
+            for account in ledger.accounts.values():
+                self.assertEqual(sorted(map(id, account.transactions)), sorted(
+                    id(t) for t in ledger.transactions if account in (t.src, t.dest)))
+
+            # Loading it again should count it once.
+            ledger.loadCsv('{}/{}.csv'.format(path, name))
+            self.assertEqual(4, len(ledger.transactions))
+            self.assertEqual(100, ledger.accounts['asset.my-checking'].balances['usd'])
+
+    def test_remove_transaction(self):
+        """ Removing a duplicate should remove only the tags it added.
+        """
+        path = '{}/multi-csv-tags'.format(resources)
+        ledger = Ledger(pcurr, 5)
+        orig, = ledger.loadCsv('{}/checking.csv'.format(path))
+        dupe, = ledger.loadCsv('{}/employer-payroll.csv'.format(path))
+        self.assertEqual([0], ledger.tags().select(['payment']))
+
+        ledger.removeTransaction(dupe)
+        self.assertEqual([orig], ledger.transactions)
+        self.assertEqual({'i', 'got', 'paid'}, orig.tags)
+        self.assertEqual([], ledger.tags().select(['payment']))
+        self.assertEqual([0], ledger.tags().select(['paid']))
+        self.assertEqual(-200, ledger.accounts['income.employer-payroll'].balances['usd'])
+
+        with self.assertRaises(KeyError):
+            ledger.removeTransaction(dupe)
+
+        ledger.removeTransaction(orig)
+        self.assertEqual([], ledger.transactions)
+        self.assertEqual({}, ledger.accounts)
+        self.assertEqual({}, ledger.tree.children)
+        self.assertEqual({'': {'usd': 0}}, ledger.tree.rollup())
+        self.assertEqual('date,src,dest,amount,tags,notes', ledger.dump())
+
+        # The ledger should carry on as usual.
+        ledger.loadCsv('{}/employer-payroll.csv'.format(path))
+        ledger.loadCsv('{}/checking.csv'.format(path))
+        self.assertEqual(1, len(ledger.transactions))
+        self.assertEqual({'i', 'got', 'paid', 'payment', 'tags'}, ledger.transactions[0].tags)
+        self.assertEqual(200, ledger.accounts['asset.checking'].balances['usd'])
+
+    def test_filtered(self):
+        """ A filtered ledger should match one re-loaded from a filtered dump.
+        """
+        path = '{}/multi-csv'.format(resources)
+        csvs = [
+            '{}/car-loan.csv'.format(path),
+            '{}/my-checking.csv'.format(path),
+            '{}/my-company-payroll.csv'.format(path),
+        ]
+
+        ledger = Ledger(pcurr)
+        ledger.loadCsvs(csvs)
+
+        for filter in ['True', "'asset.my-checking' in t.accounts", 'False']:
+            exp = Ledger(pcurr)
+            exp.load(ledger.dump(filter))
+            sub = ledger.filtered(filter)
+
+            self.assertEqual(exp.dump(), sub.dump())
+            self.assertEqual(sorted(exp.accounts), sorted(sub.accounts))
+            for name, account in exp.accounts.items():
+                self.assertEqual(account.balances, sub.accounts[name].balances)
+
+        # The sub-ledger should own its accounts and transactions.
+        sub = ledger.filtered()
+        self.assertIsNot(ledger.transactions[0], sub.transactions[0])
+        self.assertIsNot(ledger.accounts['asset.my-checking'], sub.accounts['asset.my-checking'])
+        self.assertIs(sub.transactions[0].src, sub.accounts[sub.transactions[0].src.name])
+
     def test_src_only(self):
         """ If only src is provided, then dest should be thisname.
         """
@@ -0,0 +1,140 @@
+import os
+import stat
+import tempfile
+import unittest
+from argparse import Namespace
+
+from daybook import ledgerfile
+from daybook.Ledger import Ledger
+from daybook.client.load import load_from_args, load_from_local
+
+
+pcurr = 'usd'
+resources = '{}/resources'.format(os.path.dirname(__file__))
+
+
+class TestLedgerFile(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = '{}/ledger'.format(self.tmp.name)
+
+        csvs = ['{}/multi-csv'.format(resources), '{}/multi-csv-tags'.format(resources)]
+        self.ledger = load_from_local(csvs, pcurr, 5)
+        self.ledger.load(
+            'date,src,dest,amount,tags,notes\n'
+            '2020-01-31 10:30,asset.cash,expense.food,"usd -5 cad 6.1",a:b,café ☕\n'
+            '2020-02-01 23:59:59+05:30,asset.cash,expense.food,"cad -1.3 eur 1",,\n', 'asset.cash')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        """ A ledger file should dump exactly like the ledger it was saved from.
+        """
+        ledgerfile.save(self.path, self.ledger)
+        self.assertTrue(ledgerfile.is_ledgerfile(self.path))
+
+        ledger = ledgerfile.load(self.path)
+        self.assertEqual(pcurr, ledger.primary_currency)
+        self.assertEqual(5, ledger.duplicate_window)
+        self.assertEqual(self.ledger.dump(), ledger.dump())
+
+    def test_mode(self):
+        """ Ledger files should get the default mode, or keep their mode.
+        """
+        umask = os.umask(0o022)
+        try:
+            ledgerfile.save(self.path, self.ledger)
+            self.assertEqual(0o644, stat.S_IMODE(os.stat(self.path).st_mode))
+
+            os.chmod(self.path, 0o640)
+            ledgerfile.save(self.path, self.ledger)
+            self.assertEqual(0o640, stat.S_IMODE(os.stat(self.path).st_mode))
+        finally:
+            os.umask(umask)
+
+    def test_lazy(self):
+        """ Balances should be ready before any transaction is created.
+        """
+        ledgerfile.save(self.path, self.ledger)
+        ledger = ledgerfile.load(self.path)
+
+        self.assertIsNone(ledger._transactions)
+        for name, account in self.ledger.accounts.items():
+            if account.transactions:
+                self.assertEqual(account.balances, ledger.accounts[name].balances)
+        self.assertIsNone(ledger._transactions)
+
+        self.assertEqual(self.ledger.balancesAsOf('2020-01-31'), ledger.balancesAsOf('2020-01-31'))
+        self.assertEqual(len(self.ledger.transactions), len(ledger.transactions))
+        for name, account in ledger.accounts.items():
+            exp = self.ledger.accounts[name]
+            self.assertEqual(len(exp.transactions), len(account.transactions))
+            self.assertEqual(exp.last_currency, account.last_currency)
+
+    def test_append(self):
+        """ A loaded ledger can be added to without changing the file.
+        """
+        ledgerfile.save(self.path, self.ledger)
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        ledger = ledgerfile.load(self.path)
+        ledger.load('date,src,dest,amount\n2021-01-01,asset.cash,expense.new,-1\n', 'asset.cash')
+
+        self.assertEqual(len(self.ledger.transactions) + 1, len(ledger.transactions))
+        self.assertEqual(len(ledger.transactions), len(ledger.columns()))
+        self.assertEqual(1, ledger.accounts['expense.new'].balances[pcurr])
+        with open(self.path, 'rb') as f:
+            self.assertEqual(data, f.read())
+
+    def test_empty(self):
+        """ An empty ledger should survive too.
+        """
+        ledgerfile.save(self.path, Ledger(pcurr))
+        self.assertEqual(Ledger(pcurr).dump(), ledgerfile.load(self.path).dump())
+
+    def test_invalid(self):
+        """ Files that aren't ledger files should raise ValueError.
+        """
+        csv = '{}/single.csv'.format(resources)
+        self.assertFalse(ledgerfile.is_ledgerfile(csv))
+        self.assertFalse(ledgerfile.is_ledgerfile('{}/doesnt-exist'.format(self.tmp.name)))
+        with self.assertRaises(ValueError):
+            ledgerfile.load(csv)
+
+        ledgerfile.save(self.path, self.ledger)
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        with open(self.path, 'wb') as f:
+            f.write(data[:-100])
+        with self.assertRaises(ValueError):
+            ledgerfile.load(self.path)
+
+        with open(self.path, 'wb') as f:
+            f.write(data[:8] + b'\xff' + data[9:])
+        with self.assertRaises(ValueError):
+            ledgerfile.load(self.path)
+
+    def test_load_from_args(self):
+        """ A ledger file can be given in place of CSVs.
+        """
+        ledgerfile.save(self.path, self.ledger)
+        args = Namespace(
+            csvs=[self.path], hints=None, filter='True', explain=False, primary_currency=pcurr,
+            duplicate_window=5, no_cache=True, jobs=1)
+
+        self.assertEqual(self.ledger.dump(), load_from_args(args).dump())
+
+        args.filter = "'food' in t.accounts"
+        self.assertEqual(self.ledger.dump(args.filter), load_from_args(args).dump())
+
+        args.csvs = [self.path, '{}/single.csv'.format(resources)]
+        with self.assertRaises(ValueError):
+            load_from_args(args)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import os
+import unittest
+
+from daybook.client.load import load_from_local
+
+
+pcurr = 'usd'
+resources = '{}/resources'.format(os.path.dirname(__file__))
+
+
+class TestLoad(unittest.TestCase):
+
+    def test_jobs(self):
+        """ Parsing in multiple processes should produce an identical ledger.
+        """
+        csvs = ['{}/multi-csv'.format(resources), '{}/multi-csv-tags'.format(resources)]
+
+        exp = load_from_local(csvs, pcurr, 5)
+        ledger = load_from_local(csvs, pcurr, 5, jobs=3)
+
+        self.assertEqual(exp.num_adds, ledger.num_adds)
+        self.assertEqual(exp.sources, ledger.sources)
+        self.assertEqual(len(exp.transactions), len(ledger.transactions))
+        for e, a in zip(exp.transactions, ledger.transactions):
+            self.assertEqual(e, a)
+            self.assertEqual(e.tags, a.tags)
+            self.assertEqual(e.notes, a.notes)
+
+        self.assertEqual(sorted(exp.accounts), sorted(ledger.accounts))
+        for name, account in exp.accounts.items():
+            self.assertEqual(account.balances, ledger.accounts[name].balances)
+
+
+if __name__ == '__main__':
+    unittest.main()
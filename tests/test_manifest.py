@@ -0,0 +1,147 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from daybook.client.cli.convert.main import convert_filter
+from daybook.client.cli.report.main import report_filter
+from daybook.util.importer import import_modules
+from daybook.util.manifest import load_manifest, read_members
+
+
+resources = f'{os.path.dirname(__file__)}/resources'
+presets = f'{os.path.dirname(os.path.dirname(os.path.abspath(__file__)))}/presets'
+
+reporters = [['help', 'description'], ['report'], report_filter]
+converters = [['help', 'description', 'headings'], ['convert_row'], convert_filter]
+
+
+class TestManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = f'{self.tmp.name}/cache.json'
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, source):
+        path = f'{self.tmp.name}/{name}'
+        with open(path, 'w') as f:
+            f.write(source)
+
+        return path
+
+    def test_matches_import(self):
+        """ Manifests should list the plugins import_modules would.
+        """
+        cases = [
+            ([f'{presets}/report', f'{resources}/report'], reporters),
+            ([f'{presets}/convert', f'{resources}/convert'], converters),
+        ]
+
+        for paths, (literals, defined, filter) in cases:
+            expected = import_modules(paths, filter, literals)
+            expected = {k: dict(zip(literals, v)) for k, v in expected.items()}
+
+            manifest = load_manifest(paths, literals, defined, filter)
+            self.assertEqual(expected, {k: v for k, (_, v) in manifest.items()})
+            self.assertEqual(sorted(manifest), list(manifest))
+
+            # The presets are read without importing them.
+            with mock.patch('daybook.util.manifest._import_members') as imported:
+                load_manifest(paths[:1], literals, defined, filter)
+            self.assertFalse(imported.called)
+
+    def test_read_members(self):
+        """ Only members bound plainly at the top level should be read.
+        """
+        path = self.write('plugin.py', (
+            'import sys\n'
+            'from os import path as p\n'
+            'help = "h"\n'
+            'description = """d"""\n'
+            'def report(ledger, budget):\n'
+            '    help = 1\n'))
+
+        self.assertEqual({'help': 'h', 'description': 'd'}, read_members(path, ['help', 'description'], ['report']))
+        self.assertEqual({}, read_members(path, [], ['sys', 'p']))
+        self.assertIsNone(read_members(path, ['help'], ['missing']))
+        self.assertIsNone(read_members(path, ['report']))
+
+        unreadable = [
+            'help = "h" + "i"\n',
+            'help = 5\n',
+            'help = "h"\nif True:\n    help = "i"\n',
+            'help = "h"\nfrom os import *\n',
+            'help = "h"\nhelp += "i"\n',
+            'help = (\n',
+        ]
+        for source in unreadable:
+            self.assertIsNone(read_members(self.write('plugin.py', source), ['help']), source)
+
+    def test_import_fallback(self):
+        """ Plugins that can't be read statically should be imported.
+        """
+        self.write('computed.py', (
+            'help = "computed " + "help"\n'
+            'description = ""\n'
+            'def report(ledger, budget):\n'
+            '    return ""\n'))
+        self.write('invalid.py', 'help = "h"\ndescription = "d"\nreport = None\n')
+        self.write('notes.txt', '')
+
+        manifest = load_manifest([self.tmp.name], *reporters, self.cache)
+        self.assertEqual(['computed'], list(manifest))
+        self.assertEqual({'help': 'computed help', 'description': ''}, manifest['computed'][1])
+        self.assertEqual(f'{self.tmp.name}/computed.py', manifest['computed'][0])
+
+    def test_cache(self):
+        """ Plugins should only be read again after they change.
+        """
+        path = self.write('plugin.py', 'help = "h"\ndescription = "d"\ndef report(l, b):\n    pass\n')
+
+        with mock.patch('daybook.util.manifest.read_members', wraps=read_members) as read:
+            manifest = load_manifest([self.tmp.name], *reporters, self.cache)
+            self.assertEqual(1, read.call_count)
+
+            self.assertEqual(manifest, load_manifest([self.tmp.name], *reporters, self.cache))
+            self.assertEqual(1, read.call_count)
+
+            # Converters have their own members.
+            self.assertEqual({}, load_manifest([self.tmp.name], *converters, self.cache))
+            self.assertEqual(2, read.call_count)
+            load_manifest([self.tmp.name], *reporters, self.cache)
+            self.assertEqual(3, read.call_count)
+
+            self.write('plugin.py', 'help = "changed"\ndescription = "d"\ndef report(l, b):\n    pass\n')
+            os.utime(path, ns=(0, 0))
+            manifest = load_manifest([self.tmp.name], *reporters, self.cache)
+            self.assertEqual(4, read.call_count)
+            self.assertEqual('changed', manifest['plugin'][1]['help'])
+
+        # A broken cache is rebuilt.
+        self.write('cache.json', '{')
+        self.assertEqual(manifest, load_manifest([self.tmp.name], *reporters, self.cache))
+        self.assertEqual(manifest, load_manifest([self.tmp.name], *reporters, self.cache))
+
+    def test_precedence(self):
+        """ Plugins found earlier in the paths should take precedence.
+        """
+        os.mkdir(f'{self.tmp.name}/a')
+        os.mkdir(f'{self.tmp.name}/b')
+        self.write('a/plugin.py', 'help = "a"\ndescription = ""\ndef report(l, b):\n    pass\n')
+        self.write('b/plugin.py', 'help = "b"\ndescription = ""\ndef report(l, b):\n    pass\n')
+        self.write('b/other.py', 'help = "b"\ndescription = ""\ndef report(l, b):\n    pass\n')
+
+        paths = [f'{self.tmp.name}/a', f'{self.tmp.name}/b']
+        manifest = load_manifest(paths, *reporters)
+        self.assertEqual(['other', 'plugin'], list(manifest))
+        self.assertEqual('a', manifest['plugin'][1]['help'])
+
+        with self.assertRaises(ValueError):
+            load_manifest([f'{self.tmp.name}/doesnt-exist'], *reporters)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+
+from daybook import ledgerfile
+from daybook.Ledger import Ledger
+
+
+pcurr = 'usd'
+
+
+class TestNotesIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.ledger = Ledger(pcurr)
+        self.ledger.load(
+            'date,src,dest,amount,notes\n'
+            '2021/03/01,asset.checking,expense.shop,-50,AMAZON MKTPLACE PMTS\n'
+            '2021/01/01,asset.checking,expense.shop,-10,Amazon.com order 1234\n'
+            '2021/02/01,asset.checking,expense.food,-12,Café Ωmega ΣΟΦΙΑΣ\n'
+            '2021/02/02,asset.checking,expense.food,-12,Café Ωmega ΣΟΦΙΑΣ\n'
+            '2021/02/03,asset.checking,expense.shop,-1,\n'
+            '2021/02/04,asset.checking,expense.shop,-1,STRASSE straße\n')
+
+        self.searches = [
+            ('AMAZON', None),
+            ('amazon', 'lower'),
+            ('amazon', None),
+            ('café', 'lower'),
+            ('σοφιας', 'lower'),
+            ('σοφιας', 'casefold'),
+            ('ΣΟΦ', None),
+            ('strasse', 'casefold'),
+            ('ß', None),
+            ('om', None),
+            ('', None),
+            ('zzz', None),
+        ]
+
+    def assertSameAsScan(self, ledger):
+        transforms = {None: lambda s: s, 'lower': str.lower, 'casefold': str.casefold}
+        for s, transform in self.searches:
+            with self.subTest(s=s, transform=transform):
+                exp = {i for i, t in enumerate(ledger.transactions) if s in transforms[transform](t.notes)}
+                self.assertEqual(exp, ledger.notes().search(s, transform))
+
+    def test_search(self):
+        """ Searches should find the same rows as a scan, before and after
+        the trigrams are built.
+        """
+        self.assertEqual({2, 3}, self.ledger.notes().search('Ωmega'))
+        self.assertIsNone(self.ledger.notes().grams)
+
+        self.assertSameAsScan(self.ledger)
+        self.assertIsNotNone(self.ledger.notes().grams)
+
+    def test_update(self):
+        """ The index should follow commits and sorts of the ledger.
+        """
+        notes = self.ledger.notes()
+        self.ledger.load(
+            'date,src,dest,amount,notes\n'
+            '2021/01/05,asset.checking,expense.shop,-3,amazon prime\n'
+            '2021/01/06,asset.checking,expense.food,-12,Café Ωmega ΣΟΦΙΑΣ\n')
+        self.assertIs(notes, self.ledger.notes())
+        self.assertSameAsScan(self.ledger)
+
+        self.ledger.sort()
+        self.assertIsNot(notes, self.ledger.notes())
+        self.assertSameAsScan(self.ledger)
+
+    def test_ledgerfile(self):
+        """ Notes of ledger files should be searched without copying them.
+        """
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'ledger')
+            ledgerfile.save(path, self.ledger)
+            ledger = ledgerfile.load(path)
+
+            self.assertSameAsScan(ledger)
+            self.assertIsNotNone(ledger.columns()._buffer)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,227 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from argparse import Namespace
+from unittest import mock
+
+from daybook.client import server
+from daybook.client.load import load_from_args
+
+
+pcurr = 'usd'
+resources = '{}/resources'.format(os.path.dirname(__file__))
+
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.socket = '{}/daybook.sock'.format(self.tmp.name)
+
+        csvs = ['{}/multi-csv'.format(resources), '{}/multi-csv-tags'.format(resources)]
+        self.args = Namespace(
+            csvs=csvs, hints=None, filter='True', explain=False, primary_currency=pcurr,
+            duplicate_window=5, no_cache=True, jobs=1, socket=self.socket, no_server=False, poll=0)
+
+        self.server = server.start_server(self.args)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.tmp.cleanup()
+
+    def test_dump(self):
+        """ Dumps from a server should match dumps loaded locally.
+        """
+        for filter in ['True', "'food' in t.notes", "'paystub' in t.tags"]:
+            with self.subTest(filter=filter):
+                self.args.filter = filter
+                self.assertEqual(load_from_args(self.args).dump(), server.ask(self.args, 'dump')['output'])
+
+        # Clients without CSVs use whatever the server loaded.
+        self.args.csvs = None
+        self.assertEqual(self.server.ledger.dump(self.args.filter), server.ask(self.args, 'dump')['output'])
+
+    def test_report(self):
+        """ Reports should run in the server.
+        """
+        reporter = '{}/report/report.py'.format(resources)
+        self.assertEqual('some report', server.ask(self.args, 'report', reporter=reporter)['output'])
+
+        with self.assertRaises(ValueError):
+            server.ask(self.args, 'report', reporter=reporter, budgets=['{}/doesnt-exist'.format(self.tmp.name)])
+
+        with self.assertRaises(ValueError):
+            server.ask(self.args, 'report', reporter='{}/doesnt-exist.py'.format(self.tmp.name))
+
+        # The server should still be running.
+        self.assertIsNotNone(server.ask(self.args, 'dump'))
+
+    def test_fallback(self):
+        """ Clients should load locally if the server can't answer.
+        """
+        self.args.csvs = ['{}/single.csv'.format(resources)]
+        self.assertIsNone(server.ask(self.args, 'dump'))
+
+        self.args.csvs = None
+        self.args.primary_currency = 'cad'
+        with self.assertRaises(ConnectionRefusedError):
+            server.ask(self.args, 'dump')
+
+        self.args.socket = '{}/other.sock'.format(self.tmp.name)
+        with self.assertRaises(ConnectionRefusedError):
+            server.ask(self.args, 'dump')
+
+        self.args.csvs = ['{}/single.csv'.format(resources)]
+        self.assertIsNone(server.ask(self.args, 'dump'))
+
+        self.args.socket = self.socket
+        self.args.no_server = True
+        self.assertIsNone(server.ask(self.args, 'dump'))
+
+    def test_socket(self):
+        """ A running server's socket can't be taken over, but a stale one is
+        replaced.
+        """
+        with self.assertRaises(OSError):
+            server.start_server(self.args)
+
+        self.assertEqual(0, os.stat(self.socket).st_mode & 0o077)
+
+        stale = Namespace(**vars(self.args))
+        stale.socket = '{}/stale.sock'.format(self.tmp.name)
+        old = server.start_server(stale)
+        old.server_close()
+
+        new = server.start_server(stale)
+        new.server_close()
+
+
+@mock.patch('daybook.client.server._log')
+class TestReload(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = '{}/ledger'.format(self.tmp.name)
+        shutil.copytree('{}/multi-csv'.format(resources), self.root)
+
+        self.args = Namespace(
+            csvs=[self.root], hints=None, filter='True', explain=False, primary_currency=pcurr,
+            duplicate_window=5, no_cache=True, jobs=1, socket='{}/daybook.sock'.format(self.tmp.name),
+            no_server=False, poll=1e-9)
+        self.server = server.start_server(self.args)
+
+    def tearDown(self):
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def write(self, name, data, mode='a'):
+        with open('{}/{}'.format(self.root, name), mode) as f:
+            f.write(data)
+
+    def wait(self):
+        """ Let a reload in the background finish and be swapped in.
+        """
+        if self.server._loader is not None:
+            self.server._loader.join()
+        self.server.service_actions()
+
+    def assertCurrent(self):
+        # CSVs loaded in place are committed after the others.
+        expected = sorted(load_from_args(self.args).dump().split('\n'))
+        self.assertEqual(expected, sorted(self.server.ledger.dump().split('\n')))
+
+    def test_append(self, log):
+        """ Appended rows should be added to the served ledger.
+        """
+        ledger = self.server.ledger
+        self.write('car-loan.csv', '2019/10/12,liability.car-loan,void,-5,,interest\n')
+        self.server.service_actions()
+
+        self.assertIsNone(self.server._loader)
+        self.assertIs(ledger, self.server.ledger)
+        self.assertCurrent()
+
+        # Invalid rows leave the ledger as it was.
+        self.write('car-loan.csv', '2019/10/13,liability.car-loan,void,oops,,\n')
+        self.server.service_actions()
+        self.assertIsNone(self.server._loader)
+        self.assertEqual(5, len(self.server.ledger.transactions))
+
+    def test_edit(self, log):
+        """ Edited, new and removed CSVs should be applied in place.
+        """
+        ledger = self.server.ledger
+        self.write('my-checking.csv', 'date,src,dest,amount\n2019/10/09,income.other,asset.my-checking,-1\n', 'w')
+        self.server.service_actions()
+
+        self.assertIsNone(self.server._loader)
+        self.assertIs(ledger, self.server.ledger)
+        self.assertCurrent()
+
+        os.mkdir('{}/sub'.format(self.root))
+        self.write('sub/new.csv', 'date,src,dest,amount\n2020/01/01,asset.cash,expense.new,-1\n', 'w')
+        self.server.service_actions()
+        self.assertCurrent()
+
+        os.unlink('{}/sub/new.csv'.format(self.root))
+        self.server.service_actions()
+        self.assertCurrent()
+        self.assertNotIn('expense.new', self.server.ledger.accounts)
+
+        self.assertIsNone(self.server._loader)
+        self.assertIs(ledger, self.server.ledger)
+
+        # Invalid rows leave the ledger as it was.
+        dump = ledger.dump()
+        self.write('car-loan.csv', 'date,src,dest,amount\n2019/10/09,nothing,asset.my-checking,-1\n', 'w')
+        self.server.service_actions()
+        self.assertEqual(dump, self.server.ledger.dump())
+        self.assertIn('Failed to load', log.call_args[0][0])
+
+    def test_hints(self, log):
+        """ Changed hints should reload the ledger in the background.
+        """
+        ledger = self.server.ledger
+        self.write('new.csv', 'date,src,dest,amount\n2020/01/01,asset.cash,new,-1\n', 'w')
+        self.write('hints', 'expense.new = new\n', 'w')
+        self.server.service_actions()
+
+        self.assertIs(ledger, self.server.ledger)
+        self.wait()
+        self.assertIsNot(ledger, self.server.ledger)
+        self.assertCurrent()
+        self.assertIn('expense.new', self.server.ledger.accounts)
+
+    def test_failed(self, log):
+        """ A failed reload should keep serving the previous ledger.
+        """
+        ledger = self.server.ledger
+        self.write('my-checking.csv', 'date,src,dest,amount\n2019/10/09,nothing,asset.my-checking,-1\n', 'w')
+        self.write('hints', '', 'w')
+        self.server.service_actions()
+        self.wait()
+
+        self.assertIs(ledger, self.server.ledger)
+        self.assertIn('Reload failed', log.call_args[0][0])
+
+    def test_no_poll(self, log):
+        """ Servers that don't poll shouldn't reload.
+        """
+        self.server.server_close()
+        os.unlink(self.args.socket)
+        self.args.poll = 0
+        self.server = server.start_server(self.args)
+
+        self.write('car-loan.csv', '2019/10/12,liability.car-loan,void,-5,,interest\n')
+        self.server.service_actions()
+        self.assertEqual(4, len(self.server.ledger.transactions))
+
+
+if __name__ == '__main__':
+    unittest.main()
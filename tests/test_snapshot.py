@@ -0,0 +1,196 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from daybook.Ledger import Ledger
+from daybook.client.load import group_csvs, load_from_local
+from daybook.client.snapshot import fingerprints, load_snapshot, save_snapshot, snapshot_path, update_snapshot
+
+
+pcurr = 'usd'
+resources = '{}/resources'.format(os.path.dirname(__file__))
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csvs = '{}/csvs'.format(self.tmp.name)
+        self.cache = '{}/cache'.format(self.tmp.name)
+        shutil.copytree('{}/multi-csv'.format(resources), self.csvs)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pickle_ledger(self):
+        """ A ledger should survive a pickle round trip.
+        """
+        ledger = Ledger(pcurr, 5)
+        ledger.loadCsvs(['{}/{}'.format(self.csvs, x) for x in sorted(os.listdir(self.csvs))])
+
+        copy = pickle.loads(pickle.dumps(ledger))
+
+        self.assertEqual(ledger.dump(), copy.dump())
+        for name, account in ledger.accounts.items():
+            self.assertEqual(account.balances, copy.accounts[name].balances)
+            self.assertEqual(len(account.transactions), len(copy.accounts[name].transactions))
+
+        for t in copy.transactions:
+            self.assertIs(t.src, copy.accounts[t.src.name])
+            self.assertIn(t, t.src.transactions)
+
+    def test_snapshot_reused(self):
+        """ An unchanged tree should load from the snapshot.
+        """
+        ledger1 = load_from_local([self.csvs], pcurr, 5, cachedir=self.cache)
+        self.assertEqual(1, len(os.listdir(self.cache)))
+
+        ledger2 = load_from_local([self.csvs], pcurr, 5, cachedir=self.cache)
+        self.assertEqual(ledger1.dump(), ledger2.dump())
+
+        # Make sure the ledger really comes from the snapshot.
+        levels = group_csvs(self.csvs)
+        path = snapshot_path(self.cache, levels, pcurr, 5)
+        save_snapshot(path, fingerprints(levels), Ledger('marker'))
+
+        ledger3 = load_from_local([self.csvs], pcurr, 5, cachedir=self.cache)
+        self.assertEqual('marker', ledger3.primary_currency)
+
+    def test_snapshot_invalidated(self):
+        """ Changing a CSV should invalidate the snapshot.
+        """
+        ledger1 = load_from_local([self.csvs], pcurr, 5, cachedir=self.cache)
+
+        with open('{}/my-checking.csv'.format(self.csvs), 'a') as f:
+            f.write('2021/05/05,asset.my-checking,expense.food,-3,,lunch\n')
+
+        ledger2 = load_from_local([self.csvs], pcurr, 5, cachedir=self.cache)
+        self.assertEqual(len(ledger1.transactions) + 1, len(ledger2.transactions))
+        self.assertEqual(1, len(os.listdir(self.cache)))
+
+    def test_snapshot_appended(self):
+        """ Rows appended to a CSV should be loaded into the snapshot.
+        """
+        levels = group_csvs(self.csvs)
+        path = snapshot_path(self.cache, levels, pcurr, 5)
+
+        marked = Ledger('marker', 5)
+        for level in levels:
+            marked.loadCsvs(level['csvs'])
+        save_snapshot(path, fingerprints(levels), marked)
+
+        with open('{}/my-checking.csv'.format(self.csvs), 'a') as f:
+            f.write('2021/05/05,asset.my-checking,expense.food,-3,,lunch\n')
+
+        ledger = load_from_local([self.csvs], pcurr, 5, cachedir=self.cache)
+        self.assertEqual('marker', ledger.primary_currency)
+        self.assertEqual(len(marked.transactions) + 1, len(ledger.transactions))
+        self.assertEqual(3, ledger.accounts['expense.food'].balances['marker'])
+
+        # The updated snapshot should be saved.
+        ledger = load_from_local([self.csvs], pcurr, 5, cachedir=self.cache)
+        self.assertEqual('marker', ledger.primary_currency)
+        self.assertEqual(len(marked.transactions) + 1, len(ledger.transactions))
+
+    def test_snapshot_appended_order(self):
+        """ Appending to a CSV other than the last should load the same
+        ledger as loading it from scratch.
+        """
+        csvs = ['{}/{}.csv'.format(self.csvs, x) for x in ['car-loan', 'my-checking', 'my-company-payroll']]
+        levels = [level for x in csvs for level in group_csvs(x)]
+        path = snapshot_path(self.cache, levels, pcurr, 5)
+
+        cases = [
+            # Loaded as a tail, before the other CSVs' transactions.
+            ('2019/10/10,asset.my-checking,expense.food,-3,,lunch\n', True),
+            # A duplicate of the other CSVs' payday would be the original.
+            ('2019/10/09,income.my-company-payroll,asset.my-checking,-200,,payday\n', False),
+            # So would a duplicate of their overpayment, with the new row's notes.
+            ('2019/10/12,liability.car-loan,asset.my-checking,-100,,twice\n', False),
+        ]
+
+        with open(csvs[0]) as f:
+            original = f.read()
+
+        for row, tail in cases:
+            with open(csvs[0], 'w') as f:
+                f.write(original)
+
+            ledger = load_from_local(csvs, pcurr, 5, cachedir=self.cache)
+            old = fingerprints(levels)
+
+            with open(csvs[0], 'w') as f:
+                f.write(original + row)
+
+            self.assertEqual(tail, update_snapshot(ledger, levels, old, fingerprints(levels)) is not None, row)
+
+            cached = load_from_local(csvs, pcurr, 5, cachedir=self.cache)
+            fresh = load_from_local(csvs, pcurr, 5)
+
+            self.assertEqual([str(t) for t in fresh.transactions], [str(t) for t in cached.transactions], row)
+            for name, account in fresh.accounts.items():
+                self.assertEqual([str(t) for t in account.transactions],
+                                 [str(t) for t in cached.accounts[name].transactions], name)
+                self.assertEqual(account.last_currency, cached.accounts[name].last_currency)
+            self.assertEqual(fresh.dump(), cached.dump(), row)
+            self.assertEqual(fresh.dump(), load_snapshot(path)[1].dump(), row)
+            self.assertEqual(fresh.sources, cached.sources)
+            if tail:
+                self.assertEqual(list(fresh._columns.rows()), list(ledger._columns.rows()))
+
+    def test_snapshot_unreadable(self):
+        """ Snapshots that fail to load in any way should be reloaded.
+        """
+        levels = group_csvs(self.csvs)
+        path = snapshot_path(self.cache, levels, pcurr, 5)
+        os.makedirs(self.cache)
+
+        for snapshot in [b'', b'garbage', pickle.dumps(None), pickle.dumps({}), pickle.dumps([1, 2]),
+                         pickle.dumps({'fingerprints': fingerprints(levels), 'ledger': 'marker'})]:
+            with open(path, 'wb') as f:
+                f.write(snapshot)
+
+            self.assertEqual((None, None), load_snapshot(path))
+
+            ledger = load_from_local([self.csvs], pcurr, 5, cachedir=self.cache)
+            self.assertEqual(pcurr, ledger.primary_currency)
+            self.assertEqual(fingerprints(levels), load_snapshot(path)[0])
+
+    def test_snapshot_modified(self):
+        """ Modifying existing rows of a CSV should force a full reload.
+        """
+        levels = group_csvs(self.csvs)
+        path = snapshot_path(self.cache, levels, pcurr, 5)
+        save_snapshot(path, fingerprints(levels), Ledger('marker', 5))
+
+        csv = '{}/car-loan.csv'.format(self.csvs)
+        with open(csv) as f:
+            s = f.read()
+
+        with open(csv, 'w') as f:
+            f.write(s.replace('-100', '-101') + '2021/05/05,asset.my-checking,expense.food,-3,,lunch\n')
+
+        ledger = load_from_local([self.csvs], pcurr, 5, cachedir=self.cache)
+        self.assertEqual(pcurr, ledger.primary_currency)
+
+    def test_snapshot_parameters(self):
+        """ Different load parameters should use different snapshots.
+        """
+        levels = [{'csvs': ['{}/my-checking.csv'.format(self.csvs)], 'hints': None}]
+
+        self.assertNotEqual(
+            snapshot_path(self.cache, levels, pcurr, 5),
+            snapshot_path(self.cache, levels, pcurr, 4))
+
+        self.assertNotEqual(
+            snapshot_path(self.cache, levels, pcurr, 5),
+            snapshot_path(self.cache, levels, 'mxn', 5))
+
+        prints = fingerprints(levels)
+        self.assertEqual(os.path.abspath(levels[0]['csvs'][0]), prints[0][0][0][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import pickle
+import unittest
+from unittest import mock
+
+from daybook.Columns import Columns
+from daybook.Ledger import Ledger
+from daybook.TagIndex import TagIndex
+
+
+pcurr = 'usd'
+
+
+def scan(ledger, all=(), any=(), none=()):
+    """ Positions select should find, by checking every transaction.
+    """
+    return [
+        i for i, t in enumerate(ledger.transactions)
+        if set(all) <= t.tags and (not any or t.tags & set(any)) and not t.tags & set(none)]
+
+
+class TestTagIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.ledger = Ledger(pcurr, 5)
+        self.ledger.load(
+            'date,src,dest,amount,tags\n'
+            '2023/03/01,asset.checking,expense.rent,-50,home:rent\n'
+            '2023/01/01,asset.checking,expense.doctor,-10,tax-deductible\n'
+            '2022/02/01,asset.checking,expense.doctor,-20,tax-deductible:refund\n'
+            '2023/02/02,asset.savings,expense.food,-12,lunch:home\n'
+            '2023/02/01,asset.checking,expense.food,-1,\n', 'asset.checking')
+
+        self.queries = [
+            {'all': ['home']},
+            {'all': ['home', 'lunch']},
+            {'any': ['rent', 'lunch']},
+            {'all': ['tax-deductible'], 'none': ['refund']},
+            {'none': ['home']},
+            {'all': ['nothing']},
+            {'any': ['home'], 'none': ['nothing']},
+            {},
+        ]
+
+    def assertSameAsScan(self):
+        for q in self.queries:
+            with self.subTest(**q):
+                self.assertEqual(scan(self.ledger, **q), self.ledger.tags().select(**q))
+
+    def test_select(self):
+        """ Combinations of tags should find the same positions as a scan.
+        """
+        self.assertSameAsScan()
+        self.assertEqual({0, 3}, self.ledger.tags().tagged('home'))
+        self.assertEqual({1, 2, 4}, self.ledger.tags().untagged('home'))
+
+    def test_kept_in_sync(self):
+        """ Commits and tags merged from duplicates should update the index
+        without rebuilding it.
+        """
+        self.ledger.tags()
+        with mock.patch.object(TagIndex, 'fromColumns', side_effect=AssertionError):
+            self.ledger.load(
+                'date,src,dest,amount,tags\n'
+                '2023/04/01,asset.checking,expense.rent,-50,home\n'
+                '2023/01/02,expense.doctor,asset.checking,10,receipt:tax-deductible\n', 'expense.doctor')
+            self.queries.append({'all': ['receipt']})
+            self.assertSameAsScan()
+
+        # The second row was a duplicate.
+        self.assertEqual(6, len(self.ledger.transactions))
+        self.assertEqual([1], self.ledger.tags().select(['receipt']))
+
+    def test_rebuilt(self):
+        """ The index should be rebuilt once the ledger is reordered.
+        """
+        self.ledger.tags()
+        self.ledger.sort()
+        self.assertSameAsScan()
+
+        ledger = pickle.loads(pickle.dumps(self.ledger))
+        self.assertEqual(self.ledger.tags().positions, ledger.tags().positions)
+
+        ledger = Ledger.fromColumns(self.ledger.columns(), pcurr)
+        self.assertEqual(self.ledger.tags().positions, ledger.tags().positions)
+        self.assertIsNone(ledger._transactions)
+
+    def test_empty(self):
+        """ Empty indexes should find nothing.
+        """
+        tags = TagIndex.fromColumns(Columns())
+        self.assertEqual([], tags.select())
+        self.assertEqual(set(), tags.tagged('home'))
+        self.assertEqual(set(), tags.untagged('home'))
+
+
+if __name__ == '__main__':
+    unittest.main()